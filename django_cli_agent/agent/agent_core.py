@@ -327,16 +327,17 @@
 
 #         return "\n".join(filtered_lines).strip()
 
-from agent.prompt import build_prompt
-from llm.model import LLM
-from rag.retriever import retrieve_context
+from agent.prompt import SYSTEM_PROMPT, build_user_message
+from llm.model import LLM, AsyncLLM, GenerationChunk, describe_stats
+from rag.retriever import retrieve_context, aretrieve_context
+from config import GENERATION_CACHE_MODES
 from agent.file_tools import (
     read_file,
     write_file,
     append_file,
     FileToolError,
-    set_workspace_root  # NEW: Import the setter function
 )
+import asyncio
 import re
 
 
@@ -359,13 +360,120 @@ class AgentCore:
                            - If provided: Uses custom path (Web UI mode)
         """
         self.llm = LLM()
+        self.async_llm = AsyncLLM(self.llm.model_name)
+        # Ollama timing stats of the last streamed generation
+        self.last_stats = {}
         
-        # Set workspace root dynamically
+        # Passed to every file tool call rather than set process-wide, so
+        # concurrent web requests each stay in their own project
+        self.workspace_root = workspace_root
         if workspace_root:
-            set_workspace_root(workspace_root)
             print(f"[DEBUG] Workspace set to: {workspace_root}")
 
-    def run(self, user_input: str) -> str:
+    def run(self, user_input: str, on_token=None) -> str:
+        """
+        Answer a request (and write code to files in ACTION MODE)
+        
+        Args:
+            user_input: The user's request
+            on_token: Optional callback called with each piece of the LLM
+                      output as it is generated
+        
+        Returns:
+            The full formatted response
+        """
+        if on_token is not None:
+            for chunk in self.run_stream(user_input):
+                if chunk.delta:
+                    on_token(chunk.delta)
+            return chunk.text
+        
+        state, response = self._prepare(user_input)
+        if state is None:
+            return response
+        
+        # STEP 6: Generate LLM response
+        raw = self.llm.generate(state["prompt"], use_cache=state["use_cache"], system=SYSTEM_PROMPT).strip()
+        return self._respond(state, raw)
+
+    def run_stream(self, user_input: str):
+        """
+        Streaming variant of run()
+        
+        Yields:
+            GenerationChunk per LLM token delta, then a final chunk
+            (done=True) whose text is the full formatted response - what
+            run() returns - after any file action has been executed
+        """
+        state, response = self._prepare(user_input)
+        if state is None:
+            yield GenerationChunk("", done=True, text=response)
+            return
+        
+        # STEP 6: Stream the LLM response
+        for chunk in self.llm.generate_stream(state["prompt"], use_cache=state["use_cache"], system=SYSTEM_PROMPT):
+            if chunk.done:
+                self.last_stats = chunk.stats or {}
+                print(f"[DEBUG] LLM: {describe_stats(self.last_stats)}")
+                yield chunk._replace(text=self._respond(state, chunk.text))
+            else:
+                yield chunk
+
+    async def arun_stream(self, user_input: str):
+        """
+        asyncio version of run_stream() (same chunks). Retrieval and
+        generation run on the event loop, and cancelling the consumer aborts
+        both; only file reads and file actions run in a worker thread.
+        """
+        state, response = await self._aprepare(user_input)
+        if state is None:
+            yield GenerationChunk("", done=True, text=response)
+            return
+        
+        # STEP 6: Stream the LLM response
+        stream = self.async_llm.generate_stream(state["prompt"], use_cache=state["use_cache"], system=SYSTEM_PROMPT)
+        try:
+            async for chunk in stream:
+                if chunk.done:
+                    self.last_stats = chunk.stats or {}
+                    print(f"[DEBUG] LLM: {describe_stats(self.last_stats)}")
+                    text = await asyncio.to_thread(self._respond, state, chunk.text)
+                    yield chunk._replace(text=text)
+                else:
+                    yield chunk
+        finally:
+            await stream.aclose()
+
+    def _prepare(self, user_input: str):
+        """
+        Everything before generation: mode, files, RAG context and prompt
+        
+        Returns:
+            tuple: (state dict, None), or (None, error response) when the
+            request cannot be answered
+        """
+        request, response = self._read_request_files(user_input)
+        if request is None:
+            return None, response
+        return self._build_state(request, *self._retrieve(user_input)), None
+
+    async def _aprepare(self, user_input: str):
+        """
+        Async _prepare(): the file reads run in a worker thread, retrieval
+        awaits aretrieve_context
+        """
+        request, response = await asyncio.to_thread(self._read_request_files, user_input)
+        if request is None:
+            return None, response
+        return self._build_state(request, *await self._aretrieve(user_input)), None
+
+    def _read_request_files(self, user_input: str):
+        """
+        Mode, target path and the files the request reads
+        
+        Returns:
+            tuple: (request dict, None), or (None, error response)
+        """
         # STEP 1: Detect mode and extract path FIRST
         mode = self._detect_mode(user_input)
         path = self._extract_path(user_input, mode)
@@ -391,7 +499,7 @@ class AgentCore:
                         source_file_path = potential_source
                         print(f"[DEBUG] Source file detected: {source_file_path}")
                         try:
-                            source_file_content = read_file(source_file_path)
+                            source_file_content = read_file(source_file_path, root=self.workspace_root)
                             print(f"[DEBUG] Source file read successfully: {len(source_file_content)} chars")
                         except FileToolError as e:
                             print(f"[DEBUG] Could not read source file: {e}")
@@ -401,32 +509,74 @@ class AgentCore:
         file_content = None
         if mode == "ANSWER" and path:
             try:
-                file_content = read_file(path)
+                file_content = read_file(path, root=self.workspace_root)
                 print(f"[DEBUG] File content read successfully: {len(file_content)} chars")
             except FileToolError as e:
                 print(f"[DEBUG] FileToolError: {e}")
-                return f"❌ Cannot read file: {e}"
+                return None, f"❌ Cannot read file: {e}"
             except Exception as e:
                 print(f"[DEBUG] Unexpected error: {e}")
-                return f"❌ Error reading file: {e}"
+                return None, f"❌ Error reading file: {e}"
+
+        return {
+            "user_input": user_input,
+            "mode": mode,
+            "path": path,
+            "file_content": file_content,
+            "source_file_content": source_file_content,
+            "source_file_path": source_file_path,
+        }, None
+
+    def _retrieve(self, user_input: str):
+        """STEP 4: Retrieve RAG context (context, sources, degraded legs)"""
+        try:
+            return self._retrieval_parts(retrieve_context(user_input, k=4))
+        except Exception:
+            return None, [], {}
 
-        # STEP 4: Retrieve RAG context
+    async def _aretrieve(self, user_input: str):
+        """Async _retrieve()"""
         try:
-            context, sources = retrieve_context(user_input, k=4)
+            return self._retrieval_parts(await aretrieve_context(user_input, k=4))
         except Exception:
-            context, sources = None, []
+            return None, [], {}
+
+    @staticmethod
+    def _retrieval_parts(retrieval):
+        context, sources = retrieval
+        return context, sources, getattr(retrieval, "degraded", {})
 
-        # STEP 5: Build prompt with file content if available
-        prompt = build_prompt(
-            user_input=user_input, 
+    def _build_state(self, request: dict, context, sources, degraded) -> dict:
+        """
+        STEP 5: Build prompt with file content if available (the fixed
+        SYSTEM_PROMPT is sent separately as the system message)
+        """
+        path, file_content = request["path"], request["file_content"]
+        prompt = build_user_message(
+            user_input=request["user_input"],
             context=context,
-            file_content=file_content or source_file_content,  # Use source file if no answer file
+            file_content=file_content or request["source_file_content"],  # Use source file if no answer file
             file_path=path,
-            source_file_path=source_file_path  # Pass source file info to prompt
+            source_file_path=request["source_file_path"]  # Pass source file info to prompt
         )
         
-        # STEP 6: Generate LLM response
-        raw = self.llm.generate(prompt).strip()
+        return {
+            "mode": request["mode"],
+            "path": path,
+            "file_content": file_content,
+            "sources": sources,
+            "degraded": degraded,
+            "workspace_root": self.workspace_root,
+            "prompt": prompt,
+            # Identical prompts in this mode are answered from the generation cache
+            "use_cache": request["mode"] in GENERATION_CACHE_MODES,
+        }
+
+    def _respond(self, state: dict, raw: str) -> str:
+        """Everything after generation: file actions and the formatted response"""
+        mode, path, file_content = state["mode"], state["path"], state["file_content"]
+        sources, degraded = state["sources"], state["degraded"]
+        root = state["workspace_root"]
 
         # STEP 7: Handle ANSWER MODE (no file operations, just display)
         if mode == "ANSWER":
@@ -450,6 +600,9 @@ class AgentCore:
                 cli_output.extend(["", "=" * 60, "📚 Sources:", "=" * 60])
                 cli_output.extend(f"  • {s}" for s in sources)
             
+            if degraded:
+                cli_output.extend(["", self._degraded_notice(degraded)])
+            
             return "\n".join(cli_output)
 
         # STEP 8: Handle ACTION MODE (extract code and write to file)
@@ -462,14 +615,14 @@ class AgentCore:
 
         # STEP 9: Remove duplicate imports if file exists
         try:
-            existing = read_file(path)
+            existing = read_file(path, root=root)
             code = self._remove_duplicate_imports(existing, code)
         except Exception:
             pass  # file does not exist yet
 
         # STEP 10: Decide safe action (write new file or append to existing)
         try:
-            read_file(path)
+            read_file(path, root=root)
             action = "append_file"
         except Exception:
             action = "write_file"
@@ -477,10 +630,10 @@ class AgentCore:
         # STEP 11: Execute file action
         try:
             if action == "write_file":
-                write_file(path, code)
+                write_file(path, code, root=root)
                 file_status = f"✅ File created: {path}"
             else:
-                append_file(path, code)
+                append_file(path, code, root=root)
                 file_status = f"✅ Code appended to: {path}"
 
         except FileToolError as e:
@@ -493,10 +646,28 @@ class AgentCore:
             cli_output.extend(["", "=" * 60, "📚 Sources:", "=" * 60])
             cli_output.extend(f"  • {s}" for s in sources)
 
+        if degraded:
+            cli_output.extend(["", self._degraded_notice(degraded)])
+
         return "\n".join(cli_output)
 
     # ---------------- HELPERS ---------------- #
 
+    def _degraded_notice(self, degraded) -> str:
+        """
+        Tell the user the documentation context came from one search leg only
+
+        Args:
+            degraded: {leg: reason} from RetrievalResult.degraded
+        """
+        legs = {"semantic": "semantic", "bm25": "keyword (BM25)"}
+        reasons = {"timeout": "did not respond in time", "error": "failed"}
+        problems = " and ".join(
+            f"{legs.get(leg, leg)} search {reasons.get(reason, 'failed')}"
+            for leg, reason in degraded.items()
+        )
+        return f"⚠️  Partial documentation context: {problems}"
+
     def _detect_mode(self, user_input: str) -> str:
         """
         Detect whether the user wants ACTION MODE or ANSWER MODE
@@ -39,6 +39,8 @@
 
 import typer
 from rich import print
+from rich.live import Live
+from rich.text import Text
 import sys
 
 from agent.agent_core import AgentCore
@@ -63,10 +65,15 @@ def chat():
         while True:
             user_input = typer.prompt("Ask")
 
-            response = agent.run(user_input)
-
             print("\n[cyan]Agent:[/cyan]")
-            print(response)
+            
+            # Show tokens as they are generated, then swap in the full
+            # response (file status, sources) once generation finishes.
+            # Text (not markup) so brackets in code are printed as-is.
+            streamed = Text()
+            with Live(streamed, refresh_per_second=15, vertical_overflow="visible") as live:
+                response = agent.run(user_input, on_token=streamed.append)
+                live.update(Text(response))
             print("-" * 60)
 
     except (KeyboardInterrupt, EOFError):
@@ -76,17 +76,18 @@ class FileToolError(Exception):
 
 def set_workspace_root(new_root):
     """
-    Set the workspace root dynamically
+    Set the default workspace root for the whole process
     
     Args:
         new_root: String or Path object pointing to project directory
     
     Usage:
-        # For Web UI
-        set_workspace_root("/path/to/user/project")
-        
         # For CLI (uses default from workspace.py)
         # Don't call this function, it uses WORKSPACE_ROOT by default
+        
+        # For Web UI: don't call this either - concurrent requests would
+        # redirect each other's files. Pass the project directory to each
+        # file tool instead: read_file(path, root=project.root_path)
     """
     global _current_workspace_root
     _current_workspace_root = Path(new_root).resolve()
@@ -124,8 +125,8 @@ def get_workspace_root():
 #         raise FileToolError(f"Access outside workspace denied: {relative_path}")
     
 #     return path
-def _resolve_path(relative_path: str) -> Path:
-    workspace = get_workspace_root()
+def _resolve_path(relative_path: str, root=None) -> Path:
+    workspace = Path(root).resolve() if root else get_workspace_root()
     path = (workspace / relative_path).resolve()
 
     if not str(path).startswith(str(workspace)):
@@ -141,12 +142,13 @@ def _resolve_path(relative_path: str) -> Path:
     return path
 
 
-def read_file(path: str) -> str:
+def read_file(path: str, root=None) -> str:
     """
     Read file content from workspace
     
     Args:
         path: Relative path from workspace root
+        root: Workspace root (default: get_workspace_root())
     
     Returns:
         File content as string
@@ -154,7 +156,7 @@ def read_file(path: str) -> str:
     Raises:
         FileToolError: If file not found
     """
-    file_path = _resolve_path(path)
+    file_path = _resolve_path(path, root)
     if not file_path.exists():
         raise FileToolError(f"File not found: {path}")
     return file_path.read_text(encoding="utf-8")
@@ -176,11 +178,11 @@ def read_file(path: str) -> str:
 #         raise FileToolError(f"File already exists: {path}")
 #     file_path.parent.mkdir(parents=True, exist_ok=True)
 #     file_path.write_text(content, encoding="utf-8")
-def write_file(path: str, content: str):
+def write_file(path: str, content: str, root=None):
     """
     Write new file to workspace (fails if file exists)
     """
-    file_path = _resolve_path(path)
+    file_path = _resolve_path(path, root)
 
     # If path already exists as a FILE → block
     if file_path.exists():
@@ -197,31 +199,33 @@ def write_file(path: str, content: str):
 
 
 
-def append_file(path: str, content: str):
+def append_file(path: str, content: str, root=None):
     """
     Append content to existing file
     
     Args:
         path: Relative path from workspace root
         content: Content to append
+        root: Same as read_file()
     
     Raises:
         FileToolError: If file not found
     """
-    file_path = _resolve_path(path)
+    file_path = _resolve_path(path, root)
     if not file_path.exists():
         raise FileToolError(f"File not found: {path}")
     with file_path.open("a", encoding="utf-8") as f:
         f.write("\n\n" + content)
 
 
-def update_file(path: str, new_content: str) -> str:
+def update_file(path: str, new_content: str, root=None) -> str:
     """
     Update file with new content and return diff
     
     Args:
         path: Relative path from workspace root
         new_content: New file content
+        root: Same as read_file()
     
     Returns:
         Unified diff string showing changes
@@ -229,7 +233,7 @@ def update_file(path: str, new_content: str) -> str:
     Raises:
         FileToolError: If file not found
     """
-    file_path = _resolve_path(path)
+    file_path = _resolve_path(path, root)
     if not file_path.exists():
         raise FileToolError(f"File not found: {path}")
     
@@ -247,17 +251,18 @@ def update_file(path: str, new_content: str) -> str:
     return diff
 
 
-def delete_file(path: str):
+def delete_file(path: str, root=None):
     """
     Delete file from workspace
     
     Args:
         path: Relative path from workspace root
+        root: Same as read_file()
     
     Raises:
         FileToolError: If file not found
     """
-    file_path = _resolve_path(path)
+    file_path = _resolve_path(path, root)
     if not file_path.exists():
         raise FileToolError(f"File not found: {path}")
     file_path.unlink()
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Benchmark the embedding backends (torch vs ONNX Runtime)
+
+Export the ONNX model first (python export_onnx_model.py [--quantize]),
+then:
+    python benchmark_embedding_backends.py
+    python benchmark_embedding_backends.py --onnx data/models/all-MiniLM-L6-v2-onnx/model-int8.onnx
+    python benchmark_embedding_backends.py --queries 200 --batch-texts 2000
+
+For each backend it reports:
+    • cold start     import + model load + first encode, in a fresh process
+                     (what the CLI pays on its first question)
+    • query latency  mean / p50 / p95 ms to embed one short query
+    • throughput     chunks per second embedding documentation chunks in
+                     batches of EMBED_BATCH_SIZE (what an index build pays)
+and how closely the ONNX vectors match the torch ones.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from config import EMBED_BATCH_SIZE
+from rag.embeddings import load_embedding_model, onnx_model_path
+from rag.loader import document_files, iter_documents
+from rag.onnx_embeddings import OnnxEmbeddingModel, embedding_agreement
+
+QUERIES = [
+    "How do I create a custom management command?",
+    "What is select_related?",
+    "How do I add a field to an existing model?",
+    "Difference between ForeignKey and OneToOneField",
+    "How to write a class-based view",
+    "Configure static files in production",
+    "What does makemigrations do?",
+    "How do signals work?",
+]
+
+_COLD_START = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+{load}
+loaded = time.perf_counter()
+model.encode(["How do I create a custom management command?"])
+print(json.dumps({{"load_s": loaded - started, "total_s": time.perf_counter() - started}}))
+"""
+
+
+_LOAD = {
+    "torch": "from rag.embeddings import load_embedding_model\nmodel = load_embedding_model('torch')",
+    "onnx": "from rag.onnx_embeddings import OnnxEmbeddingModel\nmodel = OnnxEmbeddingModel({path!r})",
+}
+
+
+def load_model(backend: str, onnx_path: Path):
+    if backend == "onnx":
+        return OnnxEmbeddingModel(onnx_path)
+    return load_embedding_model(backend)
+
+
+def cold_start(backend: str, onnx_path: Path) -> dict:
+    """Import + load + first encode, timed inside a fresh interpreter"""
+    load = _LOAD[backend].format(path=str(onnx_path))
+    code = _COLD_START.format(root=str(project_root), load=load)
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=project_root
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def query_latency(model, count: int):
+    """Per-query ms (mean, p50, p95) embedding one query at a time"""
+    model.encode(QUERIES[:1])  # warm up
+    timings = []
+    for i in range(count):
+        started = time.perf_counter()
+        model.encode([QUERIES[i % len(QUERIES)]])
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.mean(timings)), float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def batch_throughput(model, texts):
+    """Texts per second embedding in EMBED_BATCH_SIZE batches"""
+    model.encode(texts[:EMBED_BATCH_SIZE], batch_size=EMBED_BATCH_SIZE)  # warm up
+    started = time.perf_counter()
+    vectors = model.encode(texts, batch_size=EMBED_BATCH_SIZE)
+    return len(texts) / (time.perf_counter() - started), np.asarray(vectors, dtype=np.float32)
+
+
+def sample_chunks(count: int):
+    """Up to `count` documentation chunks (~1000 characters each)"""
+    texts = []
+    for doc in iter_documents(document_files()):
+        text = doc["text"]
+        texts.extend(text[start:start + 1000] for start in range(0, len(text), 1000))
+        if len(texts) >= count:
+            break
+    return texts[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark torch vs ONNX Runtime embeddings")
+    parser.add_argument("--onnx", type=lambda p: Path(p).resolve(), default=onnx_model_path(),
+                        help="ONNX model to test (default: ONNX_MODEL_PATH)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch-texts", type=int, default=1000)
+    args = parser.parse_args()
+
+    if not args.onnx.exists():
+        print(f"❌ {args.onnx} not found - run: python export_onnx_model.py")
+        sys.exit(1)
+
+    print("\n" + "="*60)
+    print("⏱️  EMBEDDING BACKEND BENCHMARK")
+    print("="*60 + "\n")
+
+    texts = sample_chunks(args.batch_texts)
+    print(f"   {len(texts)} documentation chunks, batch size {EMBED_BATCH_SIZE}\n")
+
+    backends = {"torch": "torch", f"onnx ({args.onnx.name})": "onnx"}
+    print(f"   {'backend':<24}{'cold start':>12}{'query mean':>12}{'p50':>8}{'p95':>8}{'chunks/s':>10}")
+    vectors = {}
+    for label, backend in backends.items():
+        cold = cold_start(backend, args.onnx)
+        model = load_model(backend, args.onnx)
+        mean, p50, p95 = query_latency(model, args.queries)
+        throughput, vectors[backend] = batch_throughput(model, texts)
+        print(f"   {label:<24}{cold['total_s']:>11.2f}s{mean:>10.2f}ms{p50:>8.2f}{p95:>8.2f}{throughput:>10.1f}")
+        del model
+
+    max_diff, min_cosine = embedding_agreement(vectors["torch"], vectors["onnx"])
+    print(f"\n   onnx vs torch: max |diff| {max_diff:.2e}, min cosine {min_cosine:.6f}")
+    print('   Set EMBEDDING_BACKEND in config.py accordingly')
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
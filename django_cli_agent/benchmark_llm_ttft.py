@@ -0,0 +1,89 @@
+"""
+Measure time to first token of the agent's LLM requests
+
+    python benchmark_llm_ttft.py
+    python benchmark_llm_ttft.py --requests 10 --model codellama:7b
+
+Unloads the model, then sends a series of different questions with the
+agent's fixed system prompt, streaming each answer. The first request pays
+the model load and the full system-prompt prefill; later ones should only
+prefill their own user message, because Ollama reuses the cached system
+prompt prefix while the model stays loaded (LLM_KEEP_ALIVE). Reports, from
+Ollama's timing fields and the client clock:
+    • prefill tokens   prompt_eval_count (tokens actually evaluated)
+    • prefill (s)      prompt_eval_duration
+    • ttft server (s)  load_duration + prompt_eval_duration
+    • ttft client (s)  request sent → first token received
+"""
+
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from agent.prompt import SYSTEM_PROMPT, build_user_message
+from llm.model import LLM
+
+QUESTIONS = [
+    "What is a Django model?",
+    "Explain the difference between ForeignKey and OneToOneField",
+    "What does select_related do?",
+    "How does the Django admin work?",
+    "Explain class-based views",
+    "What are Django signals?",
+    "When to use prefetch_related?",
+    "Explain Django middleware",
+]
+
+
+def unload(llm: LLM):
+    """Ask Ollama to unload the model, so the first request starts cold"""
+    llm.transport.post(llm.api_url, json={"model": llm.model_name, "messages": [], "keep_alive": 0})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure LLM time to first token")
+    parser.add_argument("--requests", type=int, default=len(QUESTIONS))
+    parser.add_argument("--model", default=None, help="Ollama model (default: LLM's default)")
+    parser.add_argument("--num-predict", type=int, default=16,
+                        help="tokens to generate per request (only the first one matters)")
+    args = parser.parse_args()
+
+    llm = LLM(args.model) if args.model else LLM()
+    # Short answers: the benchmark is about the prefill, not generation
+    llm.options["num_predict"] = args.num_predict
+
+    print("\n" + "="*60)
+    print(f"⏱️  TIME TO FIRST TOKEN ({llm.model_name})")
+    print("="*60 + "\n")
+
+    unload(llm)
+    print(f"   {'#':>3}  {'prefill tokens':>14}  {'prefill (s)':>11}  {'ttft server (s)':>15}  {'ttft client (s)':>15}")
+
+    results = []
+    for i in range(args.requests):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        final = list(llm.generate_stream(build_user_message(question), system=SYSTEM_PROMPT))[-1]
+
+        stats = final.stats or {}
+        if final.text.startswith("[ERROR]"):
+            print(f"   ❌ {final.text}")
+            sys.exit(1)
+        results.append(stats)
+        print(f"   {i + 1:>3}  {stats.get('prompt_eval_count', 0):>14}  {stats.get('prefill_s', 0):>11.3f}"
+              f"  {stats.get('ttft_s', 0):>15.3f}  {stats.get('first_token_s', 0):>15.3f}")
+
+    if len(results) > 1:
+        warm = statistics.median(r.get("first_token_s", 0) for r in results[1:])
+        print()
+        print(f"   Cold first request: {results[0].get('first_token_s', 0):.2f}s to first token")
+        print(f"   Warm (median):      {warm:.2f}s to first token")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark the two semantic search backends
+
+Run this to see where ChromaDB (SQLite + HNSW) starts beating exact
+in-process search over a memory-mapped embedding matrix:
+    python benchmark_vector_backends.py
+    python benchmark_vector_backends.py --sizes 1000 10000 100000 --queries 100
+
+Uses random unit vectors with the embedding model's dimension (384), so it
+measures search cost only - no model inference. For each corpus size it
+reports mean single-query latency for:
+    • chroma         PersistentClient collection (cosine HNSW) in a temp dir
+    • exact float32  DenseIndex, BLAS matrix-vector product + argpartition
+    • exact float16  same, half-size matrix upcast in blocks
+    • exact int8     int8 codes scan + float32 rescoring of the top candidates
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import chromadb
+from rag.dense_index import DenseIndex, QuantizedIndex
+
+DIMENSION = 384
+TOP_K = 12
+
+
+def _random_unit_vectors(rng, n):
+    vectors = rng.standard_normal((n, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _time_per_query(search, queries):
+    search(queries[0])  # warm up (page in, build caches)
+    started = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def benchmark_size(n, queries, workdir):
+    """Mean per-query latency in ms for each backend at corpus size n"""
+    rng = np.random.default_rng(n)
+    corpus = _random_unit_vectors(rng, n)
+    timings = {}
+
+    # ChromaDB, configured like rag/vector_store.py
+    client = chromadb.PersistentClient(path=str(workdir / f"chroma_{n}"))
+    collection = client.get_or_create_collection(name="bench", metadata={"hnsw:space": "cosine"})
+    batch_size = 5000
+    for start in range(0, n, batch_size):
+        end = min(start + batch_size, n)
+        collection.add(
+            embeddings=corpus[start:end],
+            ids=[str(i) for i in range(start, end)]
+        )
+    timings["chroma"] = _time_per_query(
+        lambda q: collection.query(query_embeddings=[q], n_results=TOP_K, include=["distances"]),
+        queries
+    )
+
+    for dtype in ("float32", "float16"):
+        path = workdir / f"embeddings_{n}_{dtype}.npy"
+        DenseIndex.save(path, corpus, dtype=dtype)
+        index = DenseIndex.load(path)
+        timings[f"exact {dtype}"] = _time_per_query(lambda q: index.search_many(q, TOP_K), queries)
+    
+    QuantizedIndex.save(workdir / f"embeddings_{n}_float32.npy", "int8")
+    quantized = QuantizedIndex.load(workdir / f"embeddings_{n}_float32.npy", "int8")
+    timings["exact int8"] = _time_per_query(lambda q: quantized.search_many(q, TOP_K), queries)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ChromaDB vs exact vector search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000, 50_000, 100_000])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("⏱️  VECTOR BACKEND BENCHMARK (mean ms per query)")
+    print("="*60 + "\n")
+
+    queries = _random_unit_vectors(np.random.default_rng(0), args.queries)
+    backends = ["chroma", "exact float32", "exact float16", "exact int8"]
+    print(f"   {'chunks':>8}  " + "  ".join(f"{b:>14}" for b in backends))
+
+    crossover = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sorted(args.sizes):
+            timings = benchmark_size(n, queries, Path(tmp))
+            print(f"   {n:>8}  " + "  ".join(f"{timings[b]:>14.3f}" for b in backends))
+            if crossover is None and timings["chroma"] < timings["exact float32"]:
+                crossover = n
+
+    print()
+    if crossover is None:
+        print(f"   ✅ Exact search was faster at every size up to {max(args.sizes):,} chunks")
+    else:
+        print(f"   📊 ChromaDB overtakes exact float32 search at ~{crossover:,} chunks")
+    print("   Set VECTOR_BACKEND in config.py accordingly")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
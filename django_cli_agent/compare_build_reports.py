@@ -0,0 +1,73 @@
+"""
+Compare two index build reports
+
+Every setup_rag run writes a JSON report to data/build_reports/. Diff two
+of them to catch regressions after changing the splitter, the embedding
+model or the build settings:
+    python compare_build_reports.py                      # two most recent
+    python compare_build_reports.py OLD.json NEW.json
+    python compare_build_reports.py --threshold 0.2      # 20% tolerance
+
+Exits with status 1 when any timing, throughput, memory or size metric got
+worse by more than the threshold, so it can gate CI.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from rag.build_report import compare_reports, load_report, recent_reports
+
+
+def _format(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:,.3f}" if abs(value) < 10 else f"{value:,.1f}"
+    return f"{value:,}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two index build reports")
+    parser.add_argument("reports", nargs="*", type=Path,
+                        help="OLD and NEW report (default: the two most recent)")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative change counted as a regression (default: 0.1)")
+    args = parser.parse_args()
+
+    paths = args.reports or recent_reports(2)
+    if len(paths) != 2:
+        parser.error("need two reports (none given and fewer than two in data/build_reports/)")
+
+    old, new = (load_report(path) for path in paths)
+    print(f"\n📊 {paths[0].name}  →  {paths[1].name}")
+    for label, report in (("old", old), ("new", new)):
+        config = report.get("config", {})
+        print(f"   {label}: {config.get('fingerprint')} "
+              f"({'full' if report.get('full_rebuild') else 'incremental'} build"
+              f"{'' if report.get('success') else ', FAILED'})")
+    print()
+
+    rows = compare_reports(old, new, threshold=args.threshold)
+    print(f"{'metric':<28}{'old':>14}{'new':>14}{'change':>10}")
+    print("-" * 66)
+    regressions = 0
+    for label, before, after, change, regression in rows:
+        change_text = f"{change:+.1%}" if change is not None else "-"
+        marker = "  ⚠️" if regression else ""
+        regressions += regression
+        print(f"{label:<28}{_format(before):>14}{_format(after):>14}{change_text:>10}{marker}")
+
+    print()
+    if regressions:
+        print(f"⚠️  {regressions} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"✅ No regressions above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
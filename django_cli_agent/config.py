@@ -0,0 +1,153 @@
+"""
+Tunable settings for the Django AI Agent
+
+Plain module constants, read by the rag / llm / agent modules at import
+time. Edit them here rather than threading options through every call.
+"""
+
+# ---------------- RETRIEVAL ---------------- #
+
+# Result cache for HybridRetriever.retrieve / retrieve_context.
+# Entries are keyed on the normalized query, k, alpha and the index build
+# fingerprint, so a rebuilt index never serves stale results.
+RETRIEVAL_CACHE_SIZE = 512          # max cached queries (LRU eviction)
+RETRIEVAL_CACHE_TTL = 60 * 60       # seconds before an entry expires
+
+# Concurrent retrieval legs. Semantic search and BM25 run side by side on a
+# small thread pool; each leg has its own deadline (seconds). A leg that
+# misses it is dropped and the answer is built from the other one. The
+# embedding model is loaded when the retriever starts, so the semantic
+# deadline only covers encoding the query and searching.
+RETRIEVAL_WORKERS = 4
+SEMANTIC_SEARCH_TIMEOUT = 5.0
+BM25_SEARCH_TIMEOUT = 2.0
+
+# How the semantic and BM25 rankings are combined (see rag/fusion.py):
+# 'rrf' (reciprocal rank fusion), 'normalized' (z-score) or 'convex' (min-max)
+FUSION_STRATEGY = 'rrf'
+
+# Long-running processes (Django workers) pick up a newly published index
+# snapshot without a restart: every INDEX_RELOAD_INTERVAL seconds the
+# retriever checks data/indexes/CURRENT and loads a new snapshot in the
+# background. 0 disables hot reload.
+INDEX_RELOAD_INTERVAL = 5.0
+
+# Semantic search backend:
+#   'chroma' - ChromaDB PersistentClient (SQLite + HNSW)
+#   'exact'  - in-process exact search over the snapshot's embeddings.npy
+#              (memory-mapped), one matrix product per query batch.
+# Measured with benchmark_vector_backends.py (1 vCPU, chromadb 1.4.0 as
+# pinned in requirements.txt, mean ms per query): exact float32 0.5 vs
+# chroma 2.1 at 5,000 chunks, 1.6 vs 2.4 at 10,000, chroma ahead from
+# ~12,000 (4.6 vs 2.3 at 20,000). float16 and int8 scans save memory but
+# were slower per query than float32 there.
+# Rerun it on the serving machine before switching.
+VECTOR_BACKEND = 'chroma'
+EXACT_VECTOR_DTYPE = 'float32'      # or 'float16' to halve the matrix size
+
+# Quantized first pass for the exact backend (built with the index snapshot):
+#   None   - scan the full-precision matrix
+#   'int8' - scan int8 codes (4x smaller), near-lossless after rescoring
+#   'pq'   - scan product-quantization codes (PQ_SUBSPACES bytes per chunk)
+# The best k * VECTOR_RESCORE_FACTOR candidates are rescored exactly against
+# the full-precision rows, so only those rows have to be paged in.
+EXACT_VECTOR_QUANTIZATION = None
+VECTOR_RESCORE_FACTOR = 4
+PQ_SUBSPACES = 48                   # must divide the embedding dimension (384)
+
+# ---------------- INDEX BUILD ---------------- #
+
+# rag/initialise_rag.py builds ChromaDB, the BM25 index and the embedding
+# matrix in one pass into data/indexes/<version>/ and then atomically
+# switches data/indexes/CURRENT to it. The newest INDEX_SNAPSHOTS_KEPT
+# snapshots are kept; older ones are deleted once no running retriever
+# still reads from them.
+INDEX_SNAPSHOTS_KEPT = 2
+
+# setup_rag streams documents → chunks → embeddings → ChromaDB. Chunks are
+# embedded and stored in micro-batches; at most INGEST_QUEUE_SIZE items wait
+# between two stages, so memory stays flat however large the corpus is.
+INGEST_BATCH_SIZE = 100
+INGEST_QUEUE_SIZE = 4
+
+# data/django_docs is walked recursively for .txt, .rst and .md files (see
+# rag/loader.PARSERS); LOADER_WORKERS threads read and parse them ahead of
+# the splitter.
+LOADER_WORKERS = 8
+
+# Embedding during index builds. With EMBED_WORKERS > 1 the micro-batches
+# are sharded across a process pool (one model copy per process, ~100 MB
+# each); results keep their order. EMBED_BATCH_SIZE is the model's encode
+# batch size.
+EMBED_WORKERS = 1                   # e.g. os.cpu_count() // 2 on build boxes
+EMBED_BATCH_SIZE = 32
+
+# Near-duplicate chunks (MinHash-estimated Jaccard similarity of their word
+# 5-grams >= DEDUP_THRESHOLD) are indexed once; the other copies become
+# aliases of the kept chunk and their files are still reported as sources.
+# DEDUP_NUM_PERM hash functions in DEDUP_BANDS LSH bands. None disables it.
+DEDUP_THRESHOLD = 0.85
+DEDUP_NUM_PERM = 128
+DEDUP_BANDS = 32
+
+# ---------------- EMBEDDINGS ---------------- #
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Inference backend for EMBEDDING_MODEL_NAME:
+#   "torch"  sentence-transformers on PyTorch
+#   "onnx"   the same model exported to ONNX (optionally int8-quantized),
+#            run with onnxruntime - no torch import, lower per-call
+#            overhead on CPU. Export it first: python export_onnx_model.py
+# ONNX_MODEL_PATH is relative to django_cli_agent/; tokenizer.json is read
+# from the same directory. Vectors of the two backends differ slightly, so
+# switching backend re-embeds the index on the next build.
+EMBEDDING_BACKEND = "torch"
+ONNX_MODEL_PATH = "data/models/all-MiniLM-L6-v2-onnx/model.onnx"
+ONNX_THREADS = 0                    # intra-op threads, 0 = onnxruntime default
+
+# Persistent query-embedding cache (SQLite file under data/). Survives
+# restarts and is shared by the CLI and every web worker on the machine.
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_SIZE = 50_000       # max cached texts (LRU eviction), ~1.5 KB each
+
+# ---------------- LLM ---------------- #
+
+# Ollama chat endpoint (OLLAMA_HOST/api/chat). The agent's instructions go
+# in a fixed system message ahead of each request; while the model stays
+# loaded (LLM_KEEP_ALIVE, an Ollama duration, -1 = forever) Ollama reuses
+# their evaluation from the KV cache and only prefills the request itself.
+# LLM_NUM_CTX must hold the system prompt (~2k tokens) plus documentation
+# context and answer - if a prompt overflows it, Ollama drops its start
+# (the instructions) and the prefix cannot be reused.
+OLLAMA_HOST = "http://localhost:11434"
+LLM_KEEP_ALIVE = "30m"
+LLM_NUM_CTX = 8192
+
+# HTTP transport to Ollama (llm/transport.py), shared by every LLM instance
+# in the process. Timeouts are in seconds. For streamed generations the read
+# timeout bounds each wait for data (time to first token on a cold model
+# included), not the whole generation. A non-streamed generation sends
+# nothing until it is finished, so its read timeout is LLM_GENERATE_TIMEOUT,
+# which does cap the whole generation. Connection errors are retried with
+# jittered exponential backoff; after LLM_CIRCUIT_FAILURES failed requests
+# in a row calls fail fast for LLM_CIRCUIT_RESET seconds instead of tying up
+# a worker.
+LLM_POOL_SIZE = 10                  # keep-alive connections per host
+LLM_CONNECT_TIMEOUT = 3.0
+LLM_READ_TIMEOUT = 120.0
+LLM_GENERATE_TIMEOUT = 600.0        # read timeout of non-streamed requests
+LLM_RETRIES = 2
+LLM_RETRY_BACKOFF = 0.5             # first retry waits up to this long
+LLM_RETRY_BACKOFF_MAX = 4.0
+LLM_CIRCUIT_FAILURES = 5
+LLM_CIRCUIT_RESET = 30.0
+
+# Persistent generation cache (SQLite file under data/): identical requests
+# (model + options + messages) are answered from disk in milliseconds instead
+# of regenerated. Enabled per agent mode - ANSWER prompts repeat (same
+# question, same retrieved context); ACTION prompts depend on files that
+# change, so they are not cached by default. () disables the cache.
+GENERATION_CACHE_MODES = ("ANSWER",)
+GENERATION_CACHE_SIZE = 2_000       # max cached generations (LRU eviction)
+GENERATION_CACHE_MAX_MB = 64
@@ -0,0 +1,124 @@
+"""
+Export the embedding model to ONNX for EMBEDDING_BACKEND = "onnx"
+
+    python export_onnx_model.py               # fp32 model.onnx
+    python export_onnx_model.py --quantize    # also int8 model-int8.onnx
+
+Writes the transformer (token embeddings out; pooling and normalization
+run in numpy, see rag/onnx_embeddings.py) and tokenizer.json to the
+directory of ONNX_MODEL_PATH, then checks the ONNX vectors against the
+sentence-transformers ones on sample texts. Quantization needs the `onnx`
+package (pip install onnx). To use the int8 model, point ONNX_MODEL_PATH
+at model-int8.onnx.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from config import EMBEDDING_MODEL_NAME
+from rag.embeddings import load_embedding_model, onnx_model_path
+from rag.onnx_embeddings import (
+    OnnxEmbeddingModel,
+    embedding_agreement,
+    MIN_COSINE_FP32,
+    MIN_COSINE_INT8,
+)
+
+OPSET = 17
+
+SAMPLE_TEXTS = [
+    "How do I create a custom management command?",
+    "QuerySet.select_related() follows foreign keys in a single SQL query.",
+    "python manage.py makemigrations",
+    "Middleware is a framework of hooks into Django's request/response processing. "
+    "It's a light, low-level plugin system for globally altering input or output.",
+    "CSRF",
+]
+
+
+def export(model, output_path: Path):
+    import torch
+
+    transformer = model[0].auto_model.eval()
+    inputs = model.tokenizer(SAMPLE_TEXTS[:2], padding=True, return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(inputs[name] for name in names),
+            str(output_path),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in names + ["last_hidden_state"]},
+            opset_version=OPSET,
+            do_constant_folding=True,
+        )
+    # tokenizer.json (fast tokenizer) next to the model
+    model.tokenizer.save_pretrained(str(output_path.parent))
+
+
+def quantize(model_path: Path) -> Path:
+    """Dynamic int8 quantization of the weights; returns the new path or None"""
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        import onnx  # noqa: F401 (required by quantize_dynamic)
+    except ImportError:
+        print("   ⚠️  Warning: quantization needs the onnx package (pip install onnx), skipped")
+        return None
+    quantized_path = model_path.with_name(model_path.stem + "-int8.onnx")
+    quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+    return quantized_path
+
+
+def verify(reference, model_path: Path, min_cosine: float) -> bool:
+    candidate = OnnxEmbeddingModel(model_path).encode(SAMPLE_TEXTS)
+    max_diff, cosine = embedding_agreement(reference, candidate)
+    ok = cosine >= min_cosine
+    print(f"   {'✅' if ok else '❌'} {model_path.name}: max |diff| {max_diff:.2e}, "
+          f"min cosine {cosine:.6f} (need ≥ {min_cosine})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX")
+    parser.add_argument("--output", type=Path, default=onnx_model_path(),
+                        help="fp32 .onnx path (default: ONNX_MODEL_PATH)")
+    parser.add_argument("--quantize", action="store_true",
+                        help="also write an int8-quantized model next to it")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"📦 EXPORTING {EMBEDDING_MODEL_NAME} TO ONNX")
+    print("="*60 + "\n")
+
+    model = load_embedding_model("torch")
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    export(model, args.output)
+    print(f"   ✅ {args.output}")
+
+    checks = [(args.output, MIN_COSINE_FP32)]
+    if args.quantize:
+        quantized_path = quantize(args.output)
+        if quantized_path is not None:
+            print(f"   ✅ {quantized_path}")
+            checks.append((quantized_path, MIN_COSINE_INT8))
+
+    print("\n🔍 Checking against sentence-transformers...")
+    reference = model.encode(SAMPLE_TEXTS)
+    ok = all([verify(reference, path, min_cosine) for path, min_cosine in checks])
+
+    print()
+    if not ok:
+        print("❌ ONNX output does not match the torch model")
+        sys.exit(1)
+    print('   Set EMBEDDING_BACKEND = "onnx" in config.py to use it')
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Persistent generation cache
+
+Repeated ANSWER-mode questions retrieve the same context, so the prompt
+(and the sampling options) sent to the model are often byte-identical;
+regenerating them costs seconds of 7B-model time for an answer we already
+have. This cache stores completed generations on disk in SQLite, keyed by
+a hash of model name + options + messages. When it grows past its entry or
+size limit the least recently used generations are evicted.
+
+As in rag/embedding_cache.py, a hit only rewrites last_used when it is
+more than TOUCH_INTERVAL seconds old, and the entry count and byte total
+are running upper bounds that are only recounted when one of them crosses
+its limit; eviction then goes down to EVICT_TO of the limits.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+GENERATION_CACHE_PATH = Path(__file__).parent.parent / "data" / "generation_cache.sqlite3"
+
+# Minimum age (seconds) of last_used before a hit refreshes it
+TOUCH_INTERVAL = 300
+
+# Eviction shrinks the cache to this fraction of max_entries / max_bytes
+EVICT_TO = 0.9
+
+
+def generation_key(payload: dict) -> bytes:
+    """Hash of the parts of an Ollama request that determine its output"""
+    identity = {
+        "model": payload.get("model"),
+        "options": payload.get("options", {}),
+        "messages": payload.get("messages"),
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).digest()
+
+
+class GenerationCache:
+    """
+    Disk-backed LRU cache of LLM generations.
+
+    Safe to share between threads; several processes can use the same file
+    (WAL journal, short transactions).
+    """
+
+    def __init__(self, path=GENERATION_CACHE_PATH, max_entries: int = 2_000, max_bytes: int = 64 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "  key BLOB PRIMARY KEY,"
+            "  text TEXT NOT NULL,"
+            "  stats TEXT NOT NULL,"
+            "  size INTEGER NOT NULL,"
+            "  last_used REAL NOT NULL"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS generations_last_used ON generations (last_used)")
+        self._conn.commit()
+        # Upper bounds of the row count and total size (other processes may
+        # insert too); recounted only when one of them passes its limit
+        self._count, self._bytes = self._totals()
+
+    def _totals(self):
+        return self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations"
+        ).fetchone()
+
+    def get(self, key: bytes):
+        """
+        Returns:
+            tuple: (text, stats of the original generation), or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, stats, last_used FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            # Refresh recency only if it wasn't touched recently
+            if now - row[2] > TOUCH_INTERVAL:
+                self._conn.execute("UPDATE generations SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+        return row[0], json.loads(row[1])
+
+    def put(self, key: bytes, text: str, stats: dict = None):
+        """Store a generation, then evict LRU entries beyond the entry / size limits"""
+        stats = json.dumps(stats or {})
+        size = len(text.encode("utf-8")) + len(stats)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, text, stats, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, text, stats, size, time.time())
+            )
+            # Replaced keys are counted too, so these stay upper bounds
+            self._count += 1
+            self._bytes += size
+            if self._count > self.max_entries or self._bytes > self.max_bytes:
+                self._count, self._bytes = self._totals()
+                if self._count > self.max_entries or self._bytes > self.max_bytes:
+                    self._evict(int(self.max_entries * EVICT_TO), int(self.max_bytes * EVICT_TO))
+            self._conn.commit()
+
+    def _evict(self, max_entries: int, max_bytes: int):
+        """Delete the oldest generations until both limits hold (lock held)"""
+        evict = []
+        for old_key, old_size in self._conn.execute(
+            "SELECT key, size FROM generations ORDER BY last_used"
+        ):
+            if self._count <= max_entries and self._bytes <= max_bytes:
+                break
+            evict.append((old_key,))
+            self._count -= 1
+            self._bytes -= old_size
+        self._conn.executemany("DELETE FROM generations WHERE key = ?", evict)
+        self.evictions += len(evict)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._totals()
+            lookups = self.hits + self.misses
+            return {
+                "size": count,
+                "bytes": total,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM generations")
+            self._conn.commit()
+            self._count, self._bytes = 0, 0
@@ -22,42 +22,382 @@
 #         except requests.exceptions.RequestException as e:
 #             return f"[ERROR] LLM request failed: {e}"
 
+import asyncio
+import json
+import time
+from typing import NamedTuple
+
+import httpx
 import requests
 
+from llm.generation_cache import GenerationCache, generation_key
+from llm.transport import CircuitOpenError, get_transport, get_async_transport
+from config import (
+    OLLAMA_HOST,
+    LLM_KEEP_ALIVE,
+    LLM_NUM_CTX,
+    GENERATION_CACHE_SIZE,
+    GENERATION_CACHE_MAX_MB,
+)
+
+# Timing fields of Ollama's final response (durations in nanoseconds)
+OLLAMA_STATS = (
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
+
+
+_generation_cache = None
+
+
+def get_generation_cache():
+    global _generation_cache
+    if _generation_cache is None:
+        _generation_cache = GenerationCache(
+            max_entries=GENERATION_CACHE_SIZE,
+            max_bytes=GENERATION_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _generation_cache
+
+
+def _timing_stats(data: dict) -> dict:
+    """
+    Ollama's timing fields, plus (in seconds):
+        prefill_s      prompt evaluation; small when the system prompt prefix
+                       was reused from the KV cache (prompt_eval_count then
+                       counts only the newly evaluated tokens)
+        ttft_s         server-side time to first token: model load + prefill
+        tokens_per_s   generation speed
+    """
+    stats = {key: data[key] for key in OLLAMA_STATS if key in data}
+    if "prompt_eval_duration" in stats:
+        stats["prefill_s"] = round(stats["prompt_eval_duration"] / 1e9, 3)
+        stats["ttft_s"] = round((stats.get("load_duration", 0) + stats["prompt_eval_duration"]) / 1e9, 3)
+    if stats.get("eval_duration"):
+        stats["tokens_per_s"] = round(stats.get("eval_count", 0) / (stats["eval_duration"] / 1e9), 1)
+    return stats
+
+
+def describe_stats(stats: dict) -> str:
+    """One-line summary of a generation's timing stats for debug output"""
+    if not stats:
+        return "no timing stats"
+    if stats.get("cached"):
+        return "answered from the generation cache"
+    parts = []
+    if "prompt_eval_count" in stats:
+        parts.append(f"prefill {stats['prompt_eval_count']} tokens in {stats.get('prefill_s', 0):.2f}s")
+    if "ttft_s" in stats:
+        parts.append(f"ttft {stats['ttft_s']:.2f}s (server)")
+    if "first_token_s" in stats:
+        parts.append(f"{stats['first_token_s']:.2f}s (client)")
+    if "tokens_per_s" in stats:
+        parts.append(f"{stats.get('eval_count', 0)} tokens at {stats['tokens_per_s']:.1f} tok/s")
+    return ", ".join(parts)
+
+
+class OllamaError(Exception):
+    """Error reported by Ollama inside a stream"""
+
+
+class GenerationChunk(NamedTuple):
+    """One piece of a streamed generation"""
+    delta: str                  # text generated since the previous chunk
+    done: bool = False
+    text: str = None            # final chunk only: the full (stripped) text
+    stats: dict = None          # final chunk only: Ollama's timing fields
+
+
+class _StreamReader:
+    """Turns the lines of an Ollama NDJSON stream into GenerationChunks"""
+
+    def __init__(self):
+        self.parts = []
+        self.stats = {}
+        self.done = False
+        self.started = time.perf_counter()
+        self.first_token_s = None
+
+    def feed(self, line):
+        """One NDJSON line; returns a GenerationChunk, or None if it carried no text"""
+        data = json.loads(line)
+        if data.get("error"):
+            raise OllamaError(data["error"])
+        
+        if data.get("done"):
+            self.stats = _timing_stats(data)
+            if self.first_token_s is not None:
+                # Client-side time to first token (network and queueing included)
+                self.stats["first_token_s"] = self.first_token_s
+            self.done = True
+        
+        delta = data.get("message", {}).get("content", "")
+        if not self.parts:
+            # generate() strips the text; match it from the first token
+            delta = delta.lstrip()
+        if delta:
+            if not self.parts:
+                self.first_token_s = round(time.perf_counter() - self.started, 3)
+            self.parts.append(delta)
+            return GenerationChunk(delta)
+        return None
+
+    def final(self) -> GenerationChunk:
+        return GenerationChunk("", done=True, text="".join(self.parts).strip(), stats=self.stats)
+
+    def failed(self, error) -> GenerationChunk:
+        error = f"[ERROR] LLM request failed: {error}"
+        # Keep whatever was generated before the failure
+        text = ("".join(self.parts).strip() + "\n\n" + error).strip()
+        return GenerationChunk(("\n\n" if self.parts else "") + error, done=True, text=text, stats=self.stats)
+
+
+class _OllamaClient:
+    """
+    Requests go to Ollama's chat endpoint: the system prompt is sent as its
+    own, byte-identical system message at the start of every conversation,
+    and keep_alive keeps the model (with its KV cache) loaded between
+    requests, so Ollama reuses the already-evaluated system prompt prefix
+    and only prefills the user message.
+    """
 
-class LLM:
     def __init__(self, model_name: str = "codellama:7b"):
         self.model_name = model_name
-        self.api_url = "http://localhost:11434/api/generate"
+        self.api_url = f"{OLLAMA_HOST}/api/chat"
+        # Options must not change between requests: a different num_ctx
+        # reloads the model and drops the cached prefix
+        self.options = {
+            "top_p": 0.9,
+            "top_k": 40,
+            "num_ctx": LLM_NUM_CTX
+        }
+
+    def _payload(self, prompt: str, temperature: float, stream: bool, system: str = None) -> dict:
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        return {
+            "model": self.model_name,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": LLM_KEEP_ALIVE,
+            "options": {"temperature": temperature, **self.options}
+        }
 
-    def generate(self, prompt: str, temperature: float = 0.1) -> str:
+    def _cache_lookup(self, payload: dict):
+        """
+        Returns:
+            tuple: (cache key, (text, stats) on a hit else None); the key is
+            None when the cache is unavailable
+        """
+        try:
+            key = generation_key(payload)
+            return key, get_generation_cache().get(key)
+        except Exception as e:
+            print(f"⚠️  Warning: Generation cache unavailable: {e}")
+            return None, None
+
+    def _cache_store(self, key, text: str, stats: dict):
+        """Cache a successful generation (never errors or empty answers)"""
+        if key is None or not text:
+            return
+        try:
+            get_generation_cache().put(key, text, stats)
+        except Exception as e:
+            print(f"⚠️  Warning: Could not write generation cache: {e}")
+
+    @staticmethod
+    def _cached_chunks(text: str, stats: dict):
+        """A cache hit as a stream: the whole text in one delta, then the final chunk"""
+        return [
+            GenerationChunk(text),
+            GenerationChunk("", done=True, text=text, stats={**stats, "cached": True}),
+        ]
+
+
+class LLM(_OllamaClient):
+    def __init__(self, model_name: str = "codellama:7b", transport=None):
+        super().__init__(model_name)
+        # Pooled keep-alive session with timeouts, retries and a circuit breaker
+        self.transport = transport or get_transport()
+
+    def generate(self, prompt: str, temperature: float = 0.1, use_cache: bool = False, system: str = None) -> str:
         """
         Generate LLM response
         
         Args:
-            prompt: The input prompt
+            prompt: The input prompt (the user message)
             temperature: Controls randomness (0.0 = deterministic, 1.0 = creative)
                         Lower temperature = better instruction following
+            use_cache: Answer identical requests (model, options, messages)
+                       from the persistent generation cache
+            system: Optional system message; keep it identical across
+                    requests so its evaluation is reused
         
         Returns:
             Generated text response
         """
-        payload = {
-            "model": self.model_name,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": temperature,
-                "top_p": 0.9,
-                "top_k": 40
-            }
-        }
+        payload = self._payload(prompt, temperature, stream=False, system=system)
+        key = None
+        if use_cache:
+            key, hit = self._cache_lookup(payload)
+            if hit is not None:
+                return hit[0]
 
         try:
-            response = requests.post(self.api_url, json=payload)
+            response = self.transport.post(self.api_url, json=payload)
             response.raise_for_status()
             data = response.json()
-            return data.get("response", "").strip()
+            text = data.get("message", {}).get("content", "").strip()
+            self._cache_store(key, text, _timing_stats(data))
+            return text
 
         except requests.exceptions.RequestException as e:
-            return f"[ERROR] LLM request failed: {e}"
\ No newline at end of file
+            return f"[ERROR] LLM request failed: {e}"
+
+    def generate_stream(self, prompt: str, temperature: float = 0.1, use_cache: bool = False, system: str = None):
+        """
+        Generate an LLM response token by token (Ollama NDJSON stream)
+        
+        Args:
+            prompt: The input prompt (the user message)
+            temperature: Same as generate()
+            use_cache: Same as generate(); a hit is yielded as one delta,
+                       and its final chunk's stats have "cached": True
+            system: Same as generate()
+        
+        Yields:
+            GenerationChunk per token delta as Ollama produces it, then a
+            final chunk (done=True) with the full text - the same text
+            generate() returns - and Ollama's timing stats. Errors end the
+            stream with an "[ERROR] ..." final chunk, like generate().
+        """
+        payload = self._payload(prompt, temperature, stream=True, system=system)
+        key = None
+        if use_cache:
+            key, hit = self._cache_lookup(payload)
+            if hit is not None:
+                yield from self._cached_chunks(*hit)
+                return
+        reader = _StreamReader()
+
+        try:
+            with self.transport.post(self.api_url, json=payload, stream=True) as response:
+                response.raise_for_status()
+                # chunk_size=None: hand over each HTTP chunk (one NDJSON line from
+                # Ollama) as soon as it arrives instead of filling a buffer
+                for line in response.iter_lines(chunk_size=None):
+                    if not line:
+                        continue
+                    chunk = reader.feed(line)
+                    if chunk:
+                        yield chunk
+                    if reader.done:
+                        break
+
+        except (requests.exceptions.RequestException, OllamaError, ValueError) as e:
+            yield reader.failed(e)
+            return
+
+        final = reader.final()
+        if reader.done:
+            # A stream that ended without Ollama's final line is truncated
+            self._cache_store(key, final.text, final.stats)
+        yield final
+
+
+class AsyncLLM(_OllamaClient):
+    """
+    asyncio version of LLM on a pooled httpx.AsyncClient, so an ASGI worker
+    can have many generations in flight without a thread each.
+
+    Cancelling a generate() / generate_stream() in progress (e.g. the
+    browser went away) closes its connection, and Ollama stops generating.
+    Generation cache lookups and writes (SQLite) run in a worker thread.
+    """
+
+    def __init__(self, model_name: str = "codellama:7b", transport=None):
+        super().__init__(model_name)
+        self._transport = transport
+
+    @property
+    def transport(self):
+        # Default: the shared transport of the running event loop
+        return self._transport or get_async_transport()
+
+    async def generate(self, prompt: str, temperature: float = 0.1, use_cache: bool = False, system: str = None) -> str:
+        """
+        Generate LLM response (coroutine version of LLM.generate)
+        
+        Returns:
+            Generated text response, or "[ERROR] ..." like LLM.generate
+        """
+        payload = self._payload(prompt, temperature, stream=False, system=system)
+        key = None
+        if use_cache:
+            key, hit = await asyncio.to_thread(self._cache_lookup, payload)
+            if hit is not None:
+                return hit[0]
+        transport = self.transport
+
+        try:
+            response = await transport.post(self.api_url, json=payload)
+            response.raise_for_status()
+            data = response.json()
+            text = data.get("message", {}).get("content", "").strip()
+            await asyncio.to_thread(self._cache_store, key, text, _timing_stats(data))
+            return text
+
+        except (httpx.HTTPError, CircuitOpenError, ValueError) as e:
+            return f"[ERROR] LLM request failed: {e}"
+
+    async def generate_stream(self, prompt: str, temperature: float = 0.1, use_cache: bool = False, system: str = None):
+        """
+        Async generator version of LLM.generate_stream (same chunks)
+        
+        Close it (or cancel the task iterating it) to abort the generation;
+        use contextlib.aclosing() when breaking out of the loop early.
+        """
+        payload = self._payload(prompt, temperature, stream=True, system=system)
+        key = None
+        if use_cache:
+            key, hit = await asyncio.to_thread(self._cache_lookup, payload)
+            if hit is not None:
+                for chunk in self._cached_chunks(*hit):
+                    yield chunk
+                return
+        transport = self.transport
+        reader = _StreamReader()
+
+        try:
+            response = await transport.post(self.api_url, json=payload, stream=True)
+            try:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = reader.feed(line)
+                    if chunk:
+                        yield chunk
+                    if reader.done:
+                        break
+            except (asyncio.CancelledError, GeneratorExit):
+                transport.count_cancelled()
+                raise
+            finally:
+                # Also on cancellation: dropping the connection is what
+                # tells Ollama to stop
+                await response.aclose()
+
+        except (httpx.HTTPError, CircuitOpenError, OllamaError, ValueError) as e:
+            yield reader.failed(e)
+            return
+
+        final = reader.final()
+        if reader.done:
+            await asyncio.to_thread(self._cache_store, key, final.text, final.stats)
+        yield final
@@ -0,0 +1,352 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    LLM_POOL_SIZE,
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+    LLM_GENERATE_TIMEOUT,
+    LLM_RETRIES,
+    LLM_RETRY_BACKOFF,
+    LLM_RETRY_BACKOFF_MAX,
+    LLM_CIRCUIT_FAILURES,
+    LLM_CIRCUIT_RESET,
+)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The backend failed repeatedly; requests are refused until the reset timeout"""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+
+    - closed: requests go through; `failure_threshold` consecutive failures open it
+    - open: requests fail fast for `reset_timeout` seconds
+    - half-open: then a single trial request goes through; success closes
+      the circuit, failure opens it again
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half-open"
+            if self.state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release(self):
+        """A request ended without an outcome (cancelled): free the trial slot"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """Count a failed request; returns True if this opened the circuit"""
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half-open" or (
+                self.state == "closed" and self.failures >= self.failure_threshold
+            ):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+class _Transport:
+    """
+    Policy shared by the sync and async transports: pool size, timeouts,
+    retry backoff, circuit breaker and counters
+    """
+
+    def __init__(
+        self,
+        pool_size: int = LLM_POOL_SIZE,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        generate_timeout: float = LLM_GENERATE_TIMEOUT,
+        retries: int = LLM_RETRIES,
+        backoff: float = LLM_RETRY_BACKOFF,
+        backoff_max: float = LLM_RETRY_BACKOFF_MAX,
+        breaker: CircuitBreaker = None,
+    ):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.generate_timeout = generate_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(LLM_CIRCUIT_FAILURES, LLM_CIRCUIT_RESET)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.connect_errors = 0
+        self.read_timeouts = 0
+        self.server_errors = 0
+        self.short_circuited = 0
+        self.circuit_opened = 0
+        self.cancelled = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _failed(self):
+        if self.breaker.record_failure():
+            self._count("circuit_opened")
+            print(f"⚠️  Warning: LLM backend unavailable, failing fast for {self.breaker.reset_timeout:g}s")
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(backoff_max, backoff * 2^attempt)]"""
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    def count_cancelled(self):
+        """A request abandoned by its caller (async only)"""
+        self._count("cancelled")
+
+    def _check_circuit(self, url: str):
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError(f"Circuit open: {url} failed {self.breaker.failures} times in a row")
+
+    def _record_status(self, status_code: int):
+        if status_code >= 500:
+            self._count("server_errors")
+            self._failed()
+        else:
+            self.breaker.record_success()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retried": self.retried,
+                "connect_errors": self.connect_errors,
+                "read_timeouts": self.read_timeouts,
+                "server_errors": self.server_errors,
+                "short_circuited": self.short_circuited,
+                "circuit_opened": self.circuit_opened,
+                "cancelled": self.cancelled,
+                "circuit_state": self.breaker.state,
+            }
+
+
+class HTTPTransport(_Transport):
+    """
+    Pooled, resilient HTTP client for the LLM backend.
+
+    - One keep-alive requests.Session, up to `pool_size` connections per host
+    - Separate connect and read timeouts; the read timeout bounds every wait
+      for data, including the gap between chunks of a streamed response.
+      A non-streamed response arrives all at once when the generation is
+      done, so it gets the longer `generate_timeout` instead
+    - Connection errors (nothing reached the backend) are retried up to
+      `retries` times with full-jitter exponential backoff. Read timeouts
+      are not retried: the backend may still be generating
+    - A CircuitBreaker fails fast while the backend is down
+    - Keeps request / retry / error / circuit counters (stats())
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = (self.connect_timeout, self.read_timeout)
+        self.session = requests.Session()
+        # Retries are done here (with jitter and breaker bookkeeping), not by urllib3
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, url: str, json: dict, stream: bool = False) -> requests.Response:
+        """
+        POST a JSON body.
+
+        Args:
+            url: Endpoint URL
+            json: Request body
+            stream: Return before the body is read (iterate it with iter_lines)
+
+        Returns:
+            requests.Response (status not checked)
+
+        Raises:
+            CircuitOpenError: The circuit is open
+            requests.exceptions.RequestException: The request failed after retries
+        """
+        self._check_circuit(url)
+        # A non-streamed response arrives in one piece when the generation is done
+        timeout = self.timeout if stream else (self.connect_timeout, self.generate_timeout)
+
+        attempt = 0
+        while True:
+            self._count("requests")
+            try:
+                response = self.session.post(url, json=json, stream=stream, timeout=timeout)
+            except requests.exceptions.ConnectionError:
+                # Includes ConnectTimeout: the request never reached the backend
+                self._count("connect_errors")
+                if attempt < self.retries:
+                    time.sleep(self._backoff_delay(attempt))
+                    attempt += 1
+                    self._count("retried")
+                    continue
+                self._failed()
+                raise
+            except requests.exceptions.Timeout:
+                self._count("read_timeouts")
+                self._failed()
+                raise
+            except Exception:
+                # Not a backend failure (e.g. an invalid URL), but a trial
+                # request must not keep the half-open slot forever
+                self.breaker.release()
+                raise
+
+            self._record_status(response.status_code)
+            return response
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHTTPTransport(_Transport):
+    """
+    asyncio counterpart of HTTPTransport on an httpx.AsyncClient, with the
+    same pooling, timeouts, retries, circuit breaker and counters.
+
+    An httpx client is bound to the event loop it is first used on; use
+    get_async_transport() to get the one for the running loop.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+        )
+
+    async def post(self, url: str, json: dict, stream: bool = False):
+        """
+        POST a JSON body.
+
+        Args:
+            url: Endpoint URL
+            json: Request body
+            stream: Return before the body is read (iterate it with
+                    aiter_lines, then await response.aclose())
+
+        Returns:
+            httpx.Response (status not checked)
+
+        Raises:
+            CircuitOpenError: The circuit is open
+            httpx.HTTPError: The request failed after retries
+
+        Cancelling the awaiting task closes the connection, which aborts the
+        request upstream.
+        """
+        self._check_circuit(url)
+        # A non-streamed response arrives in one piece when the generation is done
+        timeout = (httpx.USE_CLIENT_DEFAULT if stream
+                   else httpx.Timeout(self.generate_timeout, connect=self.connect_timeout))
+
+        attempt = 0
+        while True:
+            self._count("requests")
+            try:
+                request = self.client.build_request("POST", url, json=json, timeout=timeout)
+                response = await self.client.send(request, stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                # The request never reached the backend
+                self._count("connect_errors")
+                if attempt < self.retries:
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                    attempt += 1
+                    self._count("retried")
+                    continue
+                self._failed()
+                raise
+            except httpx.TimeoutException:
+                self._count("read_timeouts")
+                self._failed()
+                raise
+            except asyncio.CancelledError:
+                self.count_cancelled()
+                # Neither a success nor a backend failure; let the next
+                # request try the circuit again
+                self.breaker.release()
+                raise
+            except Exception:
+                # Not a backend failure either; free a half-open trial slot
+                self.breaker.release()
+                raise
+
+            self._record_status(response.status_code)
+            return response
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """
+    Process-wide transport: every LLM instance (the web UI creates one per
+    request) shares its connection pool, breaker and counters
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HTTPTransport()
+    return _transport
+
+
+_async_transports = weakref.WeakKeyDictionary()
+
+
+def get_async_transport() -> AsyncHTTPTransport:
+    """
+    The AsyncHTTPTransport of the running event loop, shared by every
+    AsyncLLM on it (connections cannot move between loops). The circuit
+    breaker is the process-wide one of get_transport(): a backend that is
+    down is down for sync and async callers alike.
+    """
+    loop = asyncio.get_running_loop()
+    transport = _async_transports.get(loop)
+    if transport is None:
+        transport = AsyncHTTPTransport(breaker=get_transport().breaker)
+        _async_transports[loop] = transport
+    return transport
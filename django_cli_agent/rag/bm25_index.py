@@ -0,0 +1,822 @@
+"""
+Inverted-index BM25 engine
+
+Replaces rank_bm25's BM25Okapi.get_scores(), which scores every chunk in the
+corpus for every query. Here each term owns a postings list (doc ids + term
+frequencies), IDF and per-document length norms are precomputed at build
+time, and top-k queries use MaxScore pruning, so query cost depends on the
+postings the query terms touch rather than on corpus size.
+
+Scores match BM25Okapi (k1=1.5, b=0.75, epsilon=0.25).
+
+On disk the index is a single versioned binary file (see save/load) that is
+memory-mapped: arrays are zero-copy views into the mapping, so loading takes
+milliseconds, only the pages a query touches are read, and several worker
+processes share the same pages through the OS page cache. Nothing is
+unpickled.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+# ---------------- FILE FORMAT ---------------- #
+#
+# [header][section table][sections...]
+#
+# header:        magic, format version, section count, k1, b, avgdl,
+#                doc count, term count, postings count
+# section table: (offset, nbytes) per entry of SECTIONS, in order
+# sections:      little-endian arrays, each aligned to SECTION_ALIGNMENT
+#
+# Variable-length strings (vocabulary, document texts, metadata JSON, chunk
+# ids) are stored as a uint64 offsets table plus a UTF-8 blob.
+
+MAGIC = b"DJBM25\x00\x00"
+FORMAT_VERSION = 1
+SECTION_ALIGNMENT = 64
+
+# Max number of memoized query term -> term id lookups per index
+TERM_CACHE_SIZE = 50_000
+
+# top_k_many() scores into a dense (queries x docs) block when that block is
+# at most this many times larger than the number of postings the batch touches
+DENSE_BATCH_RATIO = 8
+
+HEADER = struct.Struct("<8sII3d3Q")
+SECTION_ENTRY = struct.Struct("<QQ")
+
+SECTIONS = [
+    ("vocab_offsets", "<u8"),     # [T+1] sorted vocabulary
+    ("vocab_blob", "u1"),
+    ("idf", "<f4"),               # [T]
+    ("upper_bounds", "<f4"),      # [T]
+    ("postings_offsets", "<i8"),  # [T+1]
+    ("postings_docs", "<i4"),     # [P]
+    ("postings_tfs", "<f4"),      # [P]
+    ("doc_lens", "<i4"),          # [N]
+    ("doc_norms", "<f4"),         # [N]
+    ("doc_offsets", "<u8"),       # [N+1] document texts
+    ("doc_blob", "u1"),
+    ("meta_offsets", "<u8"),      # [N+1] metadata as JSON
+    ("meta_blob", "u1"),
+    ("id_offsets", "<u8"),        # [N+1] vector store chunk ids
+    ("id_blob", "u1"),
+    ("id_order", "<i4"),          # [N] doc ordinals sorted by chunk id
+]
+
+
+def tokenize(text: str) -> list:
+    """
+    Tokenizer shared by index builds and queries.
+    Simple tokenization: lowercase + split by whitespace
+    """
+    return text.lower().split()
+
+
+class StringTable:
+    """
+    Read-only sequence of strings backed by an offsets array and a UTF-8 blob.
+    Entries are decoded on access, so nothing is materialized up front.
+    """
+
+    def __init__(self, offsets, blob, decode=None):
+        self.offsets = offsets
+        self.blob = blob
+        self.decode = decode
+        self._buffer = memoryview(blob)
+
+    @classmethod
+    def encode(cls, strings):
+        """Pack strings into (offsets, blob) arrays"""
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return offsets, blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _raw(self, i):
+        return self._buffer[self.offsets.item(i):self.offsets.item(i + 1)].tobytes()
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        value = self._raw(i).decode("utf-8")
+        return self.decode(value) if self.decode else value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def find(self, value: str, order=None):
+        """
+        Binary search for value in a sorted table (or in table[order[i]] when
+        an ordering permutation is given). Compares raw UTF-8 bytes, whose
+        order matches Python string order. Returns the position or None.
+        """
+        target = value.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = order.item(mid) if order is not None else mid
+            candidate = self._raw(pos)
+            if candidate < target:
+                lo = mid + 1
+            elif candidate > target:
+                hi = mid
+            else:
+                return pos
+        return None
+
+    def sort_order(self):
+        """
+        Positions of the entries in sorted (raw UTF-8 byte) order, computed
+        on a fixed-width byte array rather than on decoded Python strings.
+        Entries must not contain NUL characters.
+        """
+        lengths = np.diff(self.offsets)
+        keys = np.empty(len(self), dtype=f"S{max(int(lengths.max()), 1) if len(self) else 1}")
+        for i in range(len(self)):
+            keys[i] = self._raw(i)
+        return np.argsort(keys, kind="stable").astype(np.int32)
+
+
+class StringTableWriter:
+    """
+    Builds a StringTable on disk: strings are appended to a UTF-8 blob file
+    as they arrive and only their offsets stay in memory. table() maps the
+    finished blob.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "wb")
+        self._offsets = array("Q", [0])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def append(self, value: str):
+        self.append_raw(value.encode("utf-8"))
+
+    def append_raw(self, data: bytes):
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def extend_from(self, table: StringTable, positions=None):
+        """Copy entries of another table (all, or the given positions) byte for byte"""
+        for i in range(len(table)) if positions is None else positions:
+            self.append_raw(table._raw(int(i)))
+
+    def table(self, decode=None) -> StringTable:
+        """Finish writing and memory-map the result"""
+        self._file.close()
+        offsets = np.array(self._offsets, dtype=np.uint64)
+        if offsets[-1] == 0:
+            blob = np.empty(0, dtype=np.uint8)
+        else:
+            blob = np.memmap(self.path, dtype=np.uint8, mode="r")
+        return StringTable(offsets, blob, decode=decode)
+
+
+def _count_postings(tokenized_docs):
+    """
+    Term frequencies of tokenized documents as flat postings.
+
+    Returns:
+        tuple: (terms, postings_terms, postings_docs, tfs, doc_lens) with
+        terms sorted and postings ordered by term, then by doc
+    """
+    vocab = {}
+    token_ids = []
+    token_docs = []
+    doc_lens = []
+
+    for doc_id, tokens in enumerate(tokenized_docs):
+        doc_lens.append(len(tokens))
+        for token in tokens:
+            token_ids.append(vocab.setdefault(token, len(vocab)))
+        token_docs.append(np.full(len(tokens), doc_id, dtype=np.int64))
+
+    corpus_size = len(doc_lens)
+    doc_lens = np.asarray(doc_lens, dtype=np.int32)
+
+    # Renumber terms alphabetically so term ids are stable and searchable
+    terms = sorted(vocab)
+    remap = np.empty(len(vocab), dtype=np.int64)
+    for new_id, term in enumerate(terms):
+        remap[vocab[term]] = new_id
+
+    token_ids = remap[np.asarray(token_ids, dtype=np.int64)] if token_ids else np.empty(0, dtype=np.int64)
+    token_docs = np.concatenate(token_docs) if token_docs else np.empty(0, dtype=np.int64)
+
+    # One (term, doc) key per token; counting unique keys gives term frequencies
+    # already sorted by term, then by doc
+    keys, tfs = np.unique(token_ids * max(corpus_size, 1) + token_docs, return_counts=True)
+    postings_terms = keys // max(corpus_size, 1)
+    postings_docs = (keys % max(corpus_size, 1)).astype(np.int32)
+    return terms, postings_terms, postings_docs, tfs.astype(np.float32), doc_lens
+
+
+class PostingsBuilder:
+    """
+    Counts postings batch by batch, so an index build never holds the token
+    lists of the whole corpus: each batch is reduced to (term, doc, tf)
+    arrays right away. build() and patched() accept it in place of token
+    lists.
+    """
+
+    def __init__(self):
+        self.vocab = {}
+        self.corpus_size = 0
+        self._terms = []
+        self._docs = []
+        self._tfs = []
+        self._doc_lens = []
+
+    def add(self, tokenized_docs):
+        """Count a batch of tokenized documents (numbered after the previous ones)"""
+        terms, postings_terms, postings_docs, tfs, doc_lens = _count_postings(tokenized_docs)
+        term_ids = np.fromiter(
+            (self.vocab.setdefault(term, len(self.vocab)) for term in terms),
+            dtype=np.int32, count=len(terms)
+        )
+        self._terms.append(term_ids[postings_terms])
+        self._docs.append(postings_docs + np.int32(self.corpus_size))
+        self._tfs.append(tfs)
+        self._doc_lens.append(doc_lens)
+        self.corpus_size += len(doc_lens)
+
+    def postings(self):
+        """Everything counted so far, in the format of _count_postings()"""
+        terms = sorted(self.vocab)
+        remap = np.empty(len(self.vocab), dtype=np.int64)
+        for new_id, term in enumerate(terms):
+            remap[self.vocab[term]] = new_id
+
+        def joined(parts, dtype):
+            return np.concatenate(parts).astype(dtype, copy=False) if parts else np.empty(0, dtype=dtype)
+
+        postings_terms = remap[joined(self._terms, np.int32)]
+        postings_docs = joined(self._docs, np.int32)
+        order = np.lexsort((postings_docs, postings_terms))
+        return (
+            terms, postings_terms[order], postings_docs[order],
+            joined(self._tfs, np.float32)[order], joined(self._doc_lens, np.int32)
+        )
+
+
+def _counted(tokenized_docs):
+    if isinstance(tokenized_docs, PostingsBuilder):
+        return tokenized_docs.postings()
+    return _count_postings(tokenized_docs)
+
+
+class BM25Index:
+    """
+    BM25 keyword index stored as term-major postings arrays.
+
+    Layout (T = vocabulary size, N = documents, P = postings):
+        terms             sorted list of the T vocabulary terms
+        idf               float32[T]
+        upper_bounds      float32[T]  best single-document score of each term
+        postings_offsets  int64[T+1]  postings of term t are [off[t], off[t+1])
+        postings_docs     int32[P]    doc ids, ascending within each term
+        postings_tfs      float32[P]  term frequency of the term in that doc
+        doc_lens          int32[N]
+        doc_norms         float32[N]  k1 * (1 - b + b * doc_len / avgdl)
+
+    Alongside the scoring arrays the index carries what the retriever needs
+    to return results: documents (chunk texts), metadatas and doc_ids (the
+    vector store ids of the same chunks), all indexed by doc ordinal.
+    """
+
+    def __init__(self, terms, idf, upper_bounds, postings_offsets, postings_docs,
+                 postings_tfs, doc_lens, doc_norms, k1=1.5, b=0.75, avgdl=0.0,
+                 documents=None, metadatas=None, doc_ids=None, id_order=None):
+        self.terms = terms
+        self.idf = idf
+        self.upper_bounds = upper_bounds
+        self.postings_offsets = postings_offsets
+        self.postings_docs = postings_docs
+        self.postings_tfs = postings_tfs
+        self.doc_lens = doc_lens
+        self.doc_norms = doc_norms
+        self.k1 = k1
+        self.b = b
+        self.avgdl = avgdl
+        self.documents = documents
+        self.metadatas = metadatas
+        self.doc_ids = doc_ids
+        self.id_order = id_order
+        self._mmap = None
+        self._term_cache = {}
+
+    @property
+    def corpus_size(self) -> int:
+        return len(self.doc_lens)
+
+    @property
+    def vocab_size(self) -> int:
+        return len(self.terms)
+
+    # ---------------- BUILD ---------------- #
+
+    @classmethod
+    def build(cls, tokenized_docs, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25,
+              documents=None, metadatas=None, doc_ids=None):
+        """
+        Build the index from already tokenized documents.
+
+        Args:
+            tokenized_docs: Iterable of token lists, one per document, or a
+                PostingsBuilder that already counted them
+            k1, b: BM25 parameters
+            epsilon: Floor for negative IDFs, as a fraction of the mean IDF
+            documents, metadatas, doc_ids: Optional per-document payload,
+                required to save() the index
+
+        Returns:
+            BM25Index
+        """
+        terms, postings_terms, postings_docs, tfs, doc_lens = _counted(tokenized_docs)
+
+        doc_freqs = np.bincount(postings_terms, minlength=len(terms))
+        postings_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=postings_offsets[1:])
+
+        index = cls.from_postings(
+            terms, postings_offsets, postings_docs, tfs,
+            doc_lens, k1=k1, b=b, epsilon=epsilon
+        )
+        index.documents = documents
+        index.metadatas = metadatas
+        index.doc_ids = doc_ids
+        return index
+
+    def patched(self, keep, tokenized_docs, documents=None, metadatas=None, doc_ids=None,
+                epsilon: float = 0.25):
+        """
+        Incremental rebuild: the kept documents of this index, in their
+        current order, followed by newly added documents. Postings of kept
+        documents are reused as they are, only the added documents are
+        counted; IDF, length norms and upper bounds are then recomputed for
+        the merged corpus.
+
+        Args:
+            keep: Ordinals of the documents to keep, ascending
+            tokenized_docs: Token lists of the added documents, or a
+                PostingsBuilder that already counted them
+            documents, metadatas, doc_ids: Payload of the added documents.
+                When omitted the caller sets the merged payload itself
+
+        Returns:
+            BM25Index
+        """
+        keep = np.asarray(keep, dtype=np.int64)
+        new_ordinal = np.full(self.corpus_size, -1, dtype=np.int64)
+        new_ordinal[keep] = np.arange(len(keep))
+
+        # Kept postings, renumbered to the new doc ordinals
+        old_terms = np.repeat(np.arange(self.vocab_size), np.diff(self.postings_offsets))
+        old_docs = new_ordinal[self.postings_docs]
+        kept = old_docs >= 0
+        old_terms, old_docs, old_tfs = old_terms[kept], old_docs[kept], self.postings_tfs[kept]
+
+        added_terms, new_terms, new_docs, new_tfs, new_lens = _counted(tokenized_docs)
+
+        # Merged, sorted vocabulary (terms only found in removed documents drop out)
+        used = np.unique(old_terms)
+        used_terms = [self.terms[t] for t in used]
+        terms = sorted(set(used_terms).union(added_terms))
+        position = {term: i for i, term in enumerate(terms)}
+        old_remap = np.zeros(self.vocab_size, dtype=np.int64)
+        old_remap[used] = [position[term] for term in used_terms]
+        new_remap = np.asarray([position[term] for term in added_terms], dtype=np.int64)
+
+        postings_terms = np.concatenate([old_remap[old_terms], new_remap[new_terms]])
+        postings_docs = np.concatenate([old_docs, new_docs.astype(np.int64) + len(keep)])
+        postings_tfs = np.concatenate([old_tfs, new_tfs]).astype(np.float32)
+        order = np.lexsort((postings_docs, postings_terms))
+
+        postings_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(postings_terms, minlength=len(terms)), out=postings_offsets[1:])
+
+        index = self.from_postings(
+            terms, postings_offsets, postings_docs[order].astype(np.int32), postings_tfs[order],
+            np.concatenate([self.doc_lens[keep], new_lens]).astype(np.int32),
+            k1=self.k1, b=self.b, epsilon=epsilon
+        )
+        if documents is not None:
+            index.documents = [self.documents[i] for i in keep] + list(documents)
+            index.metadatas = [self.metadatas[i] for i in keep] + list(metadatas)
+            index.doc_ids = [self.doc_ids[i] for i in keep] + list(doc_ids)
+        return index
+
+    @classmethod
+    def from_postings(cls, terms, postings_offsets, postings_docs, postings_tfs,
+                      doc_lens, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        """
+        Derive IDF, length norms and per-term score upper bounds from raw postings.
+        """
+        corpus_size = len(doc_lens)
+        avgdl = float(doc_lens.mean()) if corpus_size else 0.0
+        doc_norms = (k1 * (1 - b + b * doc_lens / max(avgdl, 1e-9))).astype(np.float32)
+
+        # IDF exactly as BM25Okapi computes it
+        doc_freqs = np.diff(postings_offsets).astype(np.float64)
+        idf = np.log(corpus_size - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)
+        if len(idf):
+            # Terms in more than half the corpus get epsilon * mean IDF instead of
+            # a negative weight. Floored at zero so scores only ever grow as terms
+            # are added, which MaxScore pruning relies on.
+            eps = max(epsilon * idf.mean(), 0.0)
+            idf[idf < 0] = eps
+        idf = idf.astype(np.float32)
+
+        # Upper bound of each term = its best single-document contribution
+        upper_bounds = np.zeros(len(terms), dtype=np.float32)
+        if len(postings_docs):
+            impacts = (postings_tfs * (k1 + 1)) / (postings_tfs + doc_norms[postings_docs])
+            nonempty = np.flatnonzero(np.diff(postings_offsets))
+            best = np.maximum.reduceat(impacts, postings_offsets[nonempty])
+            upper_bounds[nonempty] = best * idf[nonempty]
+
+        return cls(
+            terms, idf, upper_bounds, postings_offsets, postings_docs,
+            postings_tfs, doc_lens, doc_norms, k1=k1, b=b, avgdl=avgdl
+        )
+
+    # ---------------- QUERY ---------------- #
+
+    def term_id(self, term: str):
+        """Vocabulary id of a term, or None if unknown"""
+        if term in self._term_cache:
+            return self._term_cache[term]
+
+        if isinstance(self.terms, StringTable):
+            term_id = self.terms.find(term)
+        else:
+            pos = bisect.bisect_left(self.terms, term)
+            term_id = pos if pos < len(self.terms) and self.terms[pos] == term else None
+
+        # Query vocabulary is small and repetitive; keep the cache bounded
+        if len(self._term_cache) >= TERM_CACHE_SIZE:
+            self._term_cache.clear()
+        self._term_cache[term] = term_id
+        return term_id
+
+    def _query_terms(self, query_tokens):
+        """Collapse repeated tokens into (term_id, query_term_frequency) pairs"""
+        counts = {}
+        for token in query_tokens:
+            term_id = self.term_id(token)
+            if term_id is not None:
+                counts[term_id] = counts.get(term_id, 0) + 1
+        return list(counts.items())
+
+    def term_postings(self, term_id: int, weight: float = 1.0, docs=None):
+        """
+        Score contributions of one term.
+
+        Args:
+            term_id: Vocabulary id
+            weight: Multiplier (query term frequency)
+            docs: Optional sorted array of doc ids; when given, only those docs
+                  are looked up (binary search instead of a full postings scan)
+
+        Returns:
+            tuple: (doc_ids, contributions)
+        """
+        start, end = self.postings_offsets[term_id], self.postings_offsets[term_id + 1]
+        posting_docs = self.postings_docs[start:end]
+        tfs = self.postings_tfs[start:end]
+
+        if docs is not None:
+            pos = np.searchsorted(posting_docs, docs)
+            pos_clipped = np.minimum(pos, len(posting_docs) - 1)
+            hit = (pos < len(posting_docs)) & (posting_docs[pos_clipped] == docs)
+            posting_docs = posting_docs[pos_clipped[hit]]
+            tfs = tfs[pos_clipped[hit]]
+
+        contributions = (weight * self.idf[term_id]) * (tfs * (self.k1 + 1)) / (
+            tfs + self.doc_norms[posting_docs]
+        )
+        return posting_docs, contributions.astype(np.float32)
+
+    def top_k(self, query_tokens, k: int):
+        """
+        Top-k BM25 search with MaxScore pruning.
+
+        Terms are processed from highest to lowest score upper bound. Once the
+        combined upper bound of the remaining terms cannot lift an unseen
+        document above the current k-th best score, no new candidates are
+        admitted: the remaining terms only binary-search their postings for
+        existing candidates, and candidates that can no longer reach the top-k
+        are dropped.
+
+        Args:
+            query_tokens: Tokenized query
+            k: Number of results
+
+        Returns:
+            tuple: (doc_ids, scores) sorted by descending score, positive scores only
+        """
+        query_terms = self._query_terms(query_tokens)
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+        if not query_terms or k <= 0:
+            return empty
+
+        bounds = np.array([self.upper_bounds[t] * w for t, w in query_terms], dtype=np.float64)
+        order = np.argsort(-bounds, kind="stable")
+        # remaining[i] = upper bound of terms order[i:] combined
+        remaining = np.cumsum(bounds[order][::-1])[::-1]
+
+        cand_docs = np.empty(0, dtype=np.int32)
+        cand_scores = np.empty(0, dtype=np.float32)
+        threshold = 0.0
+
+        for i, term_pos in enumerate(order):
+            term_id, weight = query_terms[term_pos]
+
+            if len(cand_docs) >= k:
+                threshold = float(np.partition(cand_scores, len(cand_scores) - k)[len(cand_scores) - k])
+
+            if len(cand_docs) >= k and remaining[i] <= threshold:
+                # Non-essential term: unseen docs can no longer make the top-k
+                alive = cand_scores + remaining[i] >= threshold
+                cand_docs, cand_scores = cand_docs[alive], cand_scores[alive]
+                docs, contrib = self.term_postings(term_id, weight, cand_docs)
+                cand_scores[np.searchsorted(cand_docs, docs)] += contrib
+            else:
+                docs, contrib = self.term_postings(term_id, weight)
+                merged = np.concatenate([cand_docs, docs])
+                cand_docs, inverse = np.unique(merged, return_inverse=True)
+                cand_scores = np.bincount(
+                    inverse,
+                    weights=np.concatenate([cand_scores, contrib]),
+                    minlength=len(cand_docs)
+                ).astype(np.float32)
+
+        positive = cand_scores > 0
+        cand_docs, cand_scores = cand_docs[positive], cand_scores[positive]
+
+        if len(cand_docs) > k:
+            top = np.argpartition(-cand_scores, k - 1)[:k]
+            cand_docs, cand_scores = cand_docs[top], cand_scores[top]
+
+        ranked = np.argsort(-cand_scores, kind="stable")
+        return cand_docs[ranked], cand_scores[ranked]
+
+    def top_k_many(self, queries_tokens, k: int):
+        """
+        Top-k BM25 search for a batch of queries in one vectorized pass.
+
+        The batch is treated as a sparse (query x term) weight matrix times the
+        (term x doc) postings: each distinct term's postings are decoded once
+        for the whole batch and all (query, doc) contributions are accumulated
+        together. When the batch touches few postings relative to
+        queries x corpus size, contributions are summed sparsely (one sort over
+        the touched postings); otherwise into a dense (query x doc) score block
+        with one bincount and a row-wise argpartition.
+
+        Args:
+            queries_tokens: List of tokenized queries
+            k: Number of results per query
+
+        Returns:
+            List of (doc_ids, scores) tuples, one per query, as in top_k()
+        """
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+        query_terms = [self._query_terms(tokens) for tokens in queries_tokens]
+        if k <= 0 or not any(query_terms):
+            return [empty for _ in query_terms]
+
+        unique_terms = {term_id for terms in query_terms for term_id, _ in terms}
+        postings = {term_id: self.term_postings(term_id) for term_id in unique_terms}
+
+        rows, docs, contribs = [], [], []
+        for row, terms in enumerate(query_terms):
+            for term_id, weight in terms:
+                term_docs, term_contrib = postings[term_id]
+                rows.append(np.full(len(term_docs), row, dtype=np.int64))
+                docs.append(term_docs)
+                contribs.append(term_contrib * weight)
+        rows = np.concatenate(rows)
+        docs = np.concatenate(docs)
+        contribs = np.concatenate(contribs)
+
+        n_queries, n_docs = len(query_terms), max(self.corpus_size, 1)
+        if n_queries * n_docs <= DENSE_BATCH_RATIO * len(docs):
+            return self._top_k_dense(rows, docs, contribs, n_queries, k)
+        return self._top_k_sparse(rows, docs, contribs, n_queries, k)
+
+    def _top_k_dense(self, rows, docs, contribs, n_queries, k):
+        n_docs = self.corpus_size
+        scores = np.bincount(
+            rows * n_docs + docs, weights=contribs, minlength=n_queries * n_docs
+        ).astype(np.float32).reshape(n_queries, n_docs)
+
+        k = min(k, n_docs)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        ranked = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, ranked, axis=1).astype(np.int32)
+        top_scores = np.take_along_axis(top_scores, ranked, axis=1)
+
+        results = []
+        for row in range(n_queries):
+            positive = top_scores[row] > 0
+            results.append((top[row][positive], top_scores[row][positive]))
+        return results
+
+    def _top_k_sparse(self, rows, docs, contribs, n_queries, k):
+        n_docs = max(self.corpus_size, 1)
+        keys, inverse = np.unique(rows * n_docs + docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contribs, minlength=len(keys))
+        key_rows = keys // n_docs
+        key_docs = (keys % n_docs).astype(np.int32)
+
+        # Group by query, best score first, then keep the first k positive hits per group
+        order = np.lexsort((-scores, key_rows))
+        key_rows, key_docs, scores = key_rows[order], key_docs[order], scores[order].astype(np.float32)
+        group_starts = np.searchsorted(key_rows, np.arange(n_queries + 1))
+        rank = np.arange(len(key_rows)) - group_starts[key_rows]
+        keep = (rank < k) & (scores > 0)
+        key_rows, key_docs, scores = key_rows[keep], key_docs[keep], scores[keep]
+
+        bounds = np.searchsorted(key_rows, np.arange(n_queries + 1))
+        return [
+            (key_docs[bounds[row]:bounds[row + 1]], scores[bounds[row]:bounds[row + 1]])
+            for row in range(n_queries)
+        ]
+
+    def get_scores(self, query_tokens):
+        """
+        Dense scores for every document (BM25Okapi-compatible, for debugging
+        and verification only - this is the full-corpus cost top_k avoids).
+        """
+        scores = np.zeros(self.corpus_size, dtype=np.float32)
+        for term_id, weight in self._query_terms(query_tokens):
+            docs, contrib = self.term_postings(term_id, weight)
+            scores[docs] += contrib
+        return scores
+
+    # ---------------- PERSISTENCE ---------------- #
+
+    def save(self, path):
+        """
+        Write the index in the binary format described at the top of this module.
+
+        The file is written next to its destination and renamed into place, so
+        processes that still have the previous file mapped keep reading a
+        consistent copy. Payload given as StringTables (e.g. from a
+        StringTableWriter) is copied over as is, without decoding it.
+
+        Returns:
+            Size of the written file in bytes
+        """
+        if self.documents is None or self.metadatas is None or self.doc_ids is None:
+            raise ValueError("documents, metadatas and doc_ids are required to save a BM25 index")
+
+        path = Path(path)
+        vocab_offsets, vocab_blob = _string_section(self.terms)
+        doc_offsets, doc_blob = _string_section(self.documents)
+        meta_offsets, meta_blob = _string_section(self.metadatas, lambda m: json.dumps(m, ensure_ascii=False))
+        if isinstance(self.doc_ids, StringTable):
+            id_offsets, id_blob = self.doc_ids.offsets, self.doc_ids.blob
+            id_order = self.doc_ids.sort_order()
+        else:
+            doc_ids = [str(doc_id) for doc_id in self.doc_ids]
+            id_offsets, id_blob = StringTable.encode(doc_ids)
+            id_order = np.array(sorted(range(len(doc_ids)), key=doc_ids.__getitem__), dtype=np.int32)
+
+        arrays = {
+            "vocab_offsets": vocab_offsets,
+            "vocab_blob": vocab_blob,
+            "idf": self.idf,
+            "upper_bounds": self.upper_bounds,
+            "postings_offsets": self.postings_offsets,
+            "postings_docs": self.postings_docs,
+            "postings_tfs": self.postings_tfs,
+            "doc_lens": self.doc_lens,
+            "doc_norms": self.doc_norms,
+            "doc_offsets": doc_offsets,
+            "doc_blob": doc_blob,
+            "meta_offsets": meta_offsets,
+            "meta_blob": meta_blob,
+            "id_offsets": id_offsets,
+            "id_blob": id_blob,
+            "id_order": id_order,
+        }
+
+        # Lay out sections after the header and section table
+        position = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+        layout = []
+        for name, dtype in SECTIONS:
+            data = np.ascontiguousarray(arrays[name], dtype=np.dtype(dtype))
+            position += -position % SECTION_ALIGNMENT
+            layout.append((position, data))
+            position += data.nbytes
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(
+                MAGIC, FORMAT_VERSION, len(SECTIONS),
+                self.k1, self.b, self.avgdl,
+                self.corpus_size, self.vocab_size, len(self.postings_docs)
+            ))
+            for offset, data in layout:
+                f.write(SECTION_ENTRY.pack(offset, data.nbytes))
+            for offset, data in layout:
+                f.write(b"\x00" * (offset - f.tell()))
+                # Straight from the array's buffer (mapped payload included)
+                f.write(data.data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        return path.stat().st_size
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map an index written by save(). All arrays are zero-copy views
+        into the mapping; strings are decoded lazily on access.
+
+        Raises:
+            ValueError: If the file is not a BM25 index or has an unsupported version
+        """
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(mapped) < HEADER.size:
+            raise ValueError(f"Not a BM25 index file: {path}")
+        magic, version, section_count, k1, b, avgdl, n_docs, n_terms, n_postings = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a BM25 index file: {path}")
+        if version != FORMAT_VERSION or section_count != len(SECTIONS):
+            raise ValueError(
+                f"Unsupported BM25 index format version {version} (expected {FORMAT_VERSION}); "
+                f"rebuild it with rag/initialise_rag.py"
+            )
+
+        arrays = {}
+        for i, (name, dtype) in enumerate(SECTIONS):
+            offset, nbytes = SECTION_ENTRY.unpack_from(mapped, HEADER.size + i * SECTION_ENTRY.size)
+            if offset + nbytes > len(mapped):
+                raise ValueError(f"Truncated BM25 index file: {path}")
+            dtype = np.dtype(dtype)
+            arrays[name] = np.frombuffer(mapped, dtype=dtype, count=nbytes // dtype.itemsize, offset=offset)
+
+        if len(arrays["doc_lens"]) != n_docs or len(arrays["idf"]) != n_terms or len(arrays["postings_docs"]) != n_postings:
+            raise ValueError(f"Corrupt BM25 index file: {path}")
+
+        index = cls(
+            StringTable(arrays["vocab_offsets"], arrays["vocab_blob"]),
+            arrays["idf"],
+            arrays["upper_bounds"],
+            arrays["postings_offsets"],
+            arrays["postings_docs"],
+            arrays["postings_tfs"],
+            arrays["doc_lens"],
+            arrays["doc_norms"],
+            k1=k1,
+            b=b,
+            avgdl=avgdl,
+            documents=StringTable(arrays["doc_offsets"], arrays["doc_blob"]),
+            metadatas=StringTable(arrays["meta_offsets"], arrays["meta_blob"], decode=json.loads),
+            doc_ids=StringTable(arrays["id_offsets"], arrays["id_blob"]),
+            id_order=arrays["id_order"],
+        )
+        index._mmap = mapped
+        return index
+
+    def ordinal(self, doc_id: str):
+        """Doc ordinal of a vector store chunk id, or None if not indexed"""
+        if isinstance(self.doc_ids, StringTable):
+            return self.doc_ids.find(str(doc_id), order=self.id_order)
+        try:
+            return list(self.doc_ids).index(doc_id)
+        except ValueError:
+            return None
+
+
+def _string_section(values, encode=None):
+    """(offsets, blob) of a payload column; StringTables are used as they are"""
+    if isinstance(values, StringTable):
+        return values.offsets, values.blob
+    return StringTable.encode(values if encode is None else map(encode, values))
@@ -0,0 +1,245 @@
+"""
+Index build profiling and machine-readable build reports
+
+setup_rag records, per stage (load, split, dedup, embed, store, bm25,
+matrix, publish), the wall time and CPU time spent doing that stage's own
+work - streaming stages run concurrently in different threads, so time a
+stage spends waiting on the stage before it is not counted - plus
+throughput, peak RSS, on-disk index sizes and vocabulary size. Every build
+writes the result to data/build_reports/<snapshot>.json.
+
+Compare two reports (default: the two most recent) to catch regressions
+after changing the splitter or the embedding model:
+    python compare_build_reports.py [OLD.json NEW.json] [--threshold 0.1]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_VERSION = 1
+REPORTS_PATH = Path(__file__).parent.parent / "data" / "build_reports"
+
+
+def peak_rss_mb(children: bool = False):
+    """Peak resident set size of this process (or of its reaped children) in MB"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+
+def children_cpu_seconds() -> float:
+    """CPU time of reaped child processes (the embedding process pool)"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def path_size(path) -> int:
+    """Size in bytes of a file, or of everything under a directory"""
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    if not path.is_dir():
+        return 0
+    return sum(
+        (Path(dirpath) / name).stat().st_size
+        for dirpath, _, filenames in os.walk(path)
+        for name in filenames
+    )
+
+
+class BuildProfiler:
+    """
+    Accumulates wall / CPU time and item counts per build stage.
+    CPU time is the calling thread's (time.thread_time), so concurrent
+    stages don't count each other's work. Thread-safe.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time() + children_cpu_seconds()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._lock = threading.Lock()
+
+    def add(self, name: str, wall: float = 0.0, cpu: float = 0.0, items: int = 0):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "items": 0})
+            stage["wall_s"] += wall
+            stage["cpu_s"] += cpu
+            stage["items"] += items
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        """Time a block of work as (part of) a stage"""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.thread_time() - cpu, items)
+
+    def iterate(self, name: str, stage, source, count=len):
+        """
+        Run a streaming stage, stage(source) -> iterator, and time its own
+        work: the time spent pulling from `source` (upstream stages, queue
+        waits) is subtracted.
+
+        Args:
+            count: Items per yielded element (len for lists / batches,
+                   or e.g. lambda _: 1)
+        """
+        waited = [0.0, 0.0]
+
+        def upstream():
+            iterator = iter(source)
+            while True:
+                wall, cpu = time.perf_counter(), time.thread_time()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    waited[0] += time.perf_counter() - wall
+                    waited[1] += time.thread_time() - cpu
+                yield item
+
+        iterator = iter(stage(upstream()))
+        while True:
+            wall, cpu = time.perf_counter(), time.thread_time()
+            waited_before = waited[:]
+            item = None
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add(
+                    name,
+                    (time.perf_counter() - wall) - (waited[0] - waited_before[0]),
+                    (time.thread_time() - cpu) - (waited[1] - waited_before[1]),
+                    count(item) if item is not None else 0
+                )
+            yield item
+
+    def stage_report(self) -> dict:
+        report = {}
+        for name, stage in self.stages.items():
+            report[name] = {
+                "wall_s": round(stage["wall_s"], 4),
+                "cpu_s": round(stage["cpu_s"], 4),
+                "items": stage["items"],
+                "items_per_s": round(stage["items"] / stage["wall_s"], 1) if stage["wall_s"] > 0 else None,
+            }
+        return report
+
+    def report(self, **sections) -> dict:
+        """
+        Assemble the build report
+
+        Args:
+            sections: Extra top-level sections (counts, index, config, ...)
+        """
+        elapsed = time.perf_counter() - self.started
+        chunks = sections.get("counts", {}).get("chunks_embedded", 0)
+        report = {
+            "version": REPORT_VERSION,
+            "started_at": self.started_at,
+            "wall_s": round(elapsed, 3),
+            "cpu_s": round(time.process_time() + children_cpu_seconds() - self.started_cpu, 3),
+            "chunks_per_s": round(chunks / elapsed, 1) if elapsed > 0 else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_children_mb": peak_rss_mb(children=True),
+            "stages": self.stage_report(),
+        }
+        report.update(sections)
+        return report
+
+
+def save_report(report: dict, name: str) -> Path:
+    """Write a report to data/build_reports/<name>.json (atomically)"""
+    REPORTS_PATH.mkdir(parents=True, exist_ok=True)
+    path = REPORTS_PATH / f"{name}.json"
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_report(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def recent_reports(count: int = 2):
+    """Paths of the `count` most recent reports, oldest first"""
+    if not REPORTS_PATH.exists():
+        return []
+    reports = sorted(REPORTS_PATH.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    return reports[-count:]
+
+
+# Changes smaller than this (absolute) are noise, whatever the percentage
+_NOISE_SECONDS = 0.05
+_NOISE_MB = 5.0
+_NOISE_KB = 1.0
+
+
+def _metrics(report):
+    """Compared metrics: (label, value, higher is better, noise floor)"""
+    yield "total wall (s)", report.get("wall_s"), False, _NOISE_SECONDS
+    yield "total cpu (s)", report.get("cpu_s"), False, _NOISE_SECONDS
+    yield "chunks/sec", report.get("chunks_per_s"), True, 0.0
+    yield "peak RSS (MB)", report.get("peak_rss_mb"), False, _NOISE_MB
+    yield "peak RSS workers (MB)", report.get("peak_rss_children_mb"), False, _NOISE_MB
+    for name, stage in report.get("stages", {}).items():
+        yield f"{name} wall (s)", stage.get("wall_s"), False, _NOISE_SECONDS
+        yield f"{name} cpu (s)", stage.get("cpu_s"), False, _NOISE_SECONDS
+    index = report.get("index", {})
+    for name, size in index.get("sizes_bytes", {}).items():
+        yield f"size {name} (KB)", size / 1024 if size is not None else None, False, _NOISE_KB
+    yield "chunks in index", index.get("chunks"), None, 0.0
+    yield "vocabulary size", index.get("vocab_size"), None, 0.0
+
+
+def compare_reports(old: dict, new: dict, threshold: float = 0.1):
+    """
+    Diff two build reports.
+
+    Args:
+        threshold: Relative change counted as a regression (0.1 = 10%)
+
+    Returns:
+        List of (metric, old, new, relative change, regression) rows.
+        Metrics without a direction (chunk count, vocabulary) are never
+        regressions, nor are changes below a small absolute noise floor.
+    """
+    old_metrics = {label: value for label, value, _, _ in _metrics(old)}
+    rows = []
+    for label, value, higher_is_better, noise in _metrics(new):
+        before = old_metrics.pop(label, None)
+        change = None
+        if before not in (None, 0) and value is not None:
+            change = (value - before) / abs(before)
+        regression = False
+        if change is not None and higher_is_better is not None and abs(value - before) > noise:
+            regression = -change > threshold if higher_is_better else change > threshold
+        rows.append((label, before, value, change, regression))
+    for label, before in old_metrics.items():
+        rows.append((label, before, None, None, False))
+    return rows
@@ -0,0 +1,181 @@
+"""
+Near-duplicate chunk elimination for index builds
+
+Many reference files repeat the same boilerplate and examples. A chunk
+whose word 5-gram set is estimated (MinHash) to be at least DEDUP_THRESHOLD
+Jaccard-similar to an already indexed chunk is not embedded or indexed;
+it is recorded as an alias of the kept ("canonical") chunk instead. The
+alias map is stored with the snapshot (chunk_aliases.json) and the sources
+of a chunk's aliases are added to its BM25 metadata as 'also_in', so
+retrieval still reports every file the text appears in.
+
+Candidate pairs come from LSH banding over the signatures, so a chunk is
+only compared with the few chunks sharing a band bucket with it.
+"""
+
+import json
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from config import DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_BANDS
+
+SHINGLE_SIZE = 5
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"\w+")
+
+
+class MinHasher:
+    """MinHash signatures of word shingles (universal hashing, numpy)"""
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, shingle_size: int = SHINGLE_SIZE, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a * h + b stays below 2**64 for 32-bit h: no uint64 overflow
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def shingles(self, text: str):
+        words = _WORD.findall(text.lower())
+        n = self.shingle_size
+        if len(words) <= n:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in self.shingles(text)),
+            dtype=np.uint64
+        )
+        permuted = (hashes[:, None] * self.a + self.b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures"""
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, bands: int = DEDUP_BANDS):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.rows = num_perm // bands
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = {}
+
+    def _keys(self, signature):
+        for band, bucket in enumerate(self.buckets):
+            yield bucket, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        for bucket, band_key in self._keys(signature):
+            bucket.setdefault(band_key, []).append(key)
+
+    def most_similar(self, signature):
+        """
+        Returns:
+            (key, estimated Jaccard similarity) of the best candidate,
+            or (None, 0.0) if no indexed signature shares a band
+        """
+        candidates = set()
+        for bucket, band_key in self._keys(signature):
+            candidates.update(bucket.get(band_key, ()))
+        best, best_similarity = None, 0.0
+        for key in candidates:
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity > best_similarity:
+                best, best_similarity = key, similarity
+        return best, best_similarity
+
+
+class NearDuplicateFilter:
+    """
+    Streaming dedup stage: filter() yields the chunks to index and records
+    the others as aliases of the chunk they duplicate.
+
+    For incremental builds, chunks kept from the previous snapshot are
+    added with seed() as their file is found unchanged; chunks already
+    stored in the snapshot (protected ids) are always kept, so the vector
+    store and the alias map never disagree.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, protected=()):
+        self.threshold = threshold
+        self.hasher = MinHasher()
+        self.lsh = LSHIndex()
+        # {canonical chunk id: [{"id", "source", "section"}, ...]}
+        self.aliases = {}
+        self.protected = set(protected)
+        self.chunks_seen = 0
+        self.chunks_dropped = 0
+        self.chars_seen = 0
+        self.chars_dropped = 0
+        # seed() is called from the loader thread, filter() from the splitter's
+        self._lock = threading.Lock()
+
+    def seed(self, chunk_id, text):
+        """Make an already indexed chunk a dedup target"""
+        signature = self.hasher.signature(text)
+        with self._lock:
+            self.lsh.add(chunk_id, signature)
+
+    def filter(self, chunks):
+        for chunk in chunks:
+            self.chunks_seen += 1
+            self.chars_seen += len(chunk["text"])
+            signature = self.hasher.signature(chunk["text"])
+            with self._lock:
+                canonical, similarity = self.lsh.most_similar(signature)
+                duplicate = (canonical is not None and canonical != chunk["id"]
+                             and similarity >= self.threshold and chunk["id"] not in self.protected)
+                if not duplicate:
+                    self.lsh.add(chunk["id"], signature)
+
+            if duplicate:
+                self.aliases.setdefault(canonical, []).append({
+                    "id": chunk["id"],
+                    "source": chunk["metadata"]["source"],
+                    "section": chunk["metadata"].get("section", ""),
+                })
+                self.chunks_dropped += 1
+                self.chars_dropped += len(chunk["text"])
+                continue
+            yield chunk
+
+    def report(self) -> str:
+        if not self.chunks_seen:
+            return "no new chunks"
+        return (
+            f"{self.chunks_dropped} of {self.chunks_seen} chunks "
+            f"({100 * self.chunks_dropped / self.chunks_seen:.1f}%) were near-duplicates, "
+            f"{self.chars_dropped / 1024:.1f} KB of "
+            f"{self.chars_seen / 1024:.1f} KB of text not indexed"
+        )
+
+
+def alias_sources(aliases: dict) -> dict:
+    """{canonical id: sorted sources of its aliases}"""
+    return {
+        chunk_id: sorted({alias["source"] for alias in entries})
+        for chunk_id, entries in aliases.items()
+        if entries
+    }
+
+
+def load_aliases(path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_aliases(path, aliases: dict):
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({k: v for k, v in aliases.items() if v}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
@@ -0,0 +1,350 @@
+"""
+Exact in-process vector search
+
+For a corpus of a few thousand chunks, going through ChromaDB (SQLite +
+HNSW) for every query costs more than the search itself. This backend keeps
+the chunk embeddings L2-normalized in a plain .npy file (float32, or
+float16 to halve memory), memory-maps it, and answers a batch of queries
+with one BLAS matrix product plus argpartition.
+
+Row i of the matrix is the chunk with BM25 index ordinal i, so results are
+already in the chunk ids fusion works with.
+
+QuantizedIndex adds a compact copy of the same matrix for the first pass:
+int8 scalar quantization (4x smaller) or product quantization (m bytes per
+vector). The scan runs over the codes only; the best candidates are then
+rescored against the full-precision rows, which are paged in on demand.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+# float16 matrices are upcast in blocks of this many rows before the product
+# (NumPy has no BLAS path for float16)
+BLOCK_ROWS = 16_384
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class DenseIndex:
+    """Memory-mapped matrix of normalized chunk embeddings"""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def save(path, embeddings, dtype: str = "float32") -> int:
+        """
+        Normalize embeddings (rows ordered by chunk ordinal) and write them as .npy
+
+        Returns:
+            Size of the written file in bytes
+        """
+        embeddings = np.asarray(embeddings)
+        blocks = (embeddings[start:start + BLOCK_ROWS] for start in range(0, len(embeddings), BLOCK_ROWS))
+        return DenseIndex.save_blocks(path, blocks, embeddings.shape, dtype=dtype)
+
+    @staticmethod
+    def save_blocks(path, blocks, shape, dtype: str = "float32") -> int:
+        """
+        Like save(), for a matrix that arrives as consecutive row blocks
+        (e.g. memory-mapped spill files); only one block is in memory at a time.
+
+        Args:
+            blocks: Iterable of (rows, dim) arrays, shape[0] rows in total
+            shape: (rows, dim) of the whole matrix
+
+        Returns:
+            Size of the written file in bytes
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Same temp-then-rename as the BM25 index, so mapped readers stay consistent
+        tmp_path = path.with_name(path.name + ".tmp")
+        matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.dtype(dtype), shape=tuple(shape))
+        written = 0
+        for block in blocks:
+            matrix[written:written + len(block)] = _normalize(block)
+            written += len(block)
+        if written != shape[0]:
+            raise ValueError(f"Expected {shape[0]} embedding rows, got {written}")
+        matrix.flush()
+        del matrix
+        tmp_path.replace(path)
+        return path.stat().st_size
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a matrix written by save(); pages load on first touch"""
+        return cls(np.load(path, mmap_mode="r"))
+
+    def _scores(self, queries):
+        """Cosine similarities, shape (len(matrix), len(queries))"""
+        if self.matrix.dtype == np.float32:
+            return self.matrix @ queries.T
+
+        scores = np.empty((len(self.matrix), len(queries)), dtype=np.float32)
+        for start in range(0, len(self.matrix), BLOCK_ROWS):
+            block = np.asarray(self.matrix[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ queries.T
+        return scores
+
+    def search_many(self, query_embeddings, k: int):
+        """
+        Exact top-k cosine search for a batch of queries.
+
+        Returns:
+            One (chunk_ids, similarities) array pair per query, best first
+        """
+        queries = _normalize(np.atleast_2d(query_embeddings))
+        if len(self.matrix) == 0 or k <= 0:
+            return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+
+        scores = self._scores(queries)
+        k = min(k, len(self.matrix))
+
+        results = []
+        for column in scores.T:
+            top = np.argpartition(-column, k - 1)[:k]
+            top = top[np.argsort(-column[top], kind="stable")]
+            results.append((top.astype(np.int64), column[top]))
+        return results
+
+
+# ---------------- QUANTIZATION ---------------- #
+
+class ScalarQuantizer:
+    """
+    int8 scalar quantization with one scale per dimension:
+    code = round(x / scale), scale = max |x| / 127 over the corpus.
+    The approximate dot product is codes @ (query * scale).
+    """
+
+    kind = "int8"
+
+    def __init__(self, scales):
+        self.scales = np.asarray(scales, dtype=np.float32)
+
+    @classmethod
+    def train(cls, matrix):
+        absmax = np.zeros(matrix.shape[1], dtype=np.float32)
+        for start in range(0, len(matrix), BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + BLOCK_ROWS], dtype=np.float32)
+            absmax = np.maximum(absmax, np.abs(block).max(axis=0))
+        return cls(np.maximum(absmax, 1e-12) / 127)
+
+    def params(self):
+        return self.scales
+
+    @classmethod
+    def from_params(cls, params):
+        return cls(params)
+
+    def encode(self, matrix):
+        codes = np.rint(np.asarray(matrix, dtype=np.float32) / self.scales)
+        return np.clip(codes, -127, 127).astype(np.int8)
+
+    def scores(self, codes, queries):
+        """Approximate similarities, shape (len(codes), len(queries))"""
+        weighted = (queries * self.scales).T
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            block = np.asarray(codes[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ weighted
+        return scores
+
+
+class ProductQuantizer:
+    """
+    Product quantization: the vector is split into `subspaces` equal slices
+    and each slice is replaced by the id of its nearest of 256 k-means
+    centroids (one uint8 per slice). Queries score codes through a
+    (subspaces x 256) lookup table of query-slice . centroid products.
+    """
+
+    kind = "pq"
+
+    def __init__(self, centroids):
+        self.centroids = np.asarray(centroids, dtype=np.float32)  # (m, n_centroids, dsub)
+
+    @classmethod
+    def train(cls, matrix, subspaces: int = 48, iterations: int = 20, sample: int = 20_000, seed: int = 0):
+        n, dim = matrix.shape
+        if dim % subspaces:
+            raise ValueError(f"Embedding dimension {dim} is not divisible into {subspaces} subspaces")
+
+        rng = np.random.default_rng(seed)
+        # Only the sampled rows are read
+        rows = np.sort(rng.choice(n, size=min(n, sample), replace=False))
+        training = np.asarray(matrix[rows], dtype=np.float32)
+        n_centroids = min(256, len(training))
+        dsub = dim // subspaces
+
+        centroids = np.empty((subspaces, n_centroids, dsub), dtype=np.float32)
+        for j in range(subspaces):
+            centroids[j] = _kmeans(training[:, j * dsub:(j + 1) * dsub], n_centroids, iterations, rng)
+        return cls(centroids)
+
+    def params(self):
+        return self.centroids
+
+    @classmethod
+    def from_params(cls, params):
+        return cls(params)
+
+    def encode(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        subspaces, _, dsub = self.centroids.shape
+        codes = np.empty((len(matrix), subspaces), dtype=np.uint8)
+        for j in range(subspaces):
+            codes[:, j] = _nearest_centroid(matrix[:, j * dsub:(j + 1) * dsub], self.centroids[j])
+        return codes
+
+    def scores(self, codes, queries):
+        """Approximate similarities, shape (len(codes), len(queries))"""
+        subspaces, _, dsub = self.centroids.shape
+        # tables[b, j, c] = query b's slice j . centroid c of slice j
+        tables = np.einsum("bjd,jcd->bjc", queries.reshape(len(queries), subspaces, dsub), self.centroids)
+        slices = np.arange(subspaces)
+
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            block = np.asarray(codes[start:start + BLOCK_ROWS])
+            for b, table in enumerate(tables):
+                scores[start:start + len(block), b] = table[slices, block].sum(axis=1)
+        return scores
+
+
+def _nearest_centroid(vectors, centroids):
+    # argmin |x - c|^2 == argmax (x . c - |c|^2 / 2)
+    half_norms = 0.5 * (centroids ** 2).sum(axis=1)
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        block = vectors[start:start + BLOCK_ROWS]
+        assignment[start:start + len(block)] = np.argmax(block @ centroids.T - half_norms, axis=1)
+    return assignment
+
+
+def _kmeans(vectors, n_centroids, iterations, rng):
+    """Plain Lloyd's k-means; empty clusters keep their previous centroid"""
+    centroids = vectors[rng.choice(len(vectors), size=n_centroids, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest_centroid(vectors, centroids)
+        counts = np.bincount(assignment, minlength=n_centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+QUANTIZERS = {
+    ScalarQuantizer.kind: ScalarQuantizer,
+    ProductQuantizer.kind: ProductQuantizer,
+}
+
+
+def quantized_paths(path, kind: str):
+    """(codes, params) file paths stored next to the full-precision matrix"""
+    path = Path(path)
+    return (
+        path.with_name(f"{path.stem}.{kind}.codes.npy"),
+        path.with_name(f"{path.stem}.{kind}.params.npy"),
+    )
+
+
+class QuantizedIndex:
+    """
+    Two-pass search: approximate top candidates from the quantized codes,
+    then exact rescoring of just those candidates against the
+    full-precision DenseIndex.
+    """
+
+    def __init__(self, full_index: DenseIndex, quantizer, codes, rescore_factor: int = 4):
+        self.full_index = full_index
+        self.quantizer = quantizer
+        self.codes = codes
+        self.rescore_factor = rescore_factor
+
+    def __len__(self):
+        return len(self.codes)
+
+    @staticmethod
+    def save(path, kind: str, **train_kwargs) -> int:
+        """
+        Quantize the (already saved, normalized) matrix at `path`.
+
+        Args:
+            path: Full-precision .npy written by DenseIndex.save
+            kind: 'int8' or 'pq'
+            train_kwargs: Quantizer options (e.g. subspaces for 'pq')
+
+        Returns:
+            Size of the codes file in bytes
+        """
+        if kind not in QUANTIZERS:
+            raise ValueError(f"Unknown quantization '{kind}'. Choose from: {', '.join(QUANTIZERS)}")
+
+        matrix = DenseIndex.load(path).matrix
+        quantizer = QUANTIZERS[kind].train(matrix, **train_kwargs)
+        codes_path, params_path = quantized_paths(path, kind)
+        np.save(params_path, quantizer.params())
+
+        # Encoded block by block straight into the (memory-mapped) codes file
+        tmp_path = codes_path.with_name(codes_path.name + ".tmp")
+        empty = quantizer.encode(matrix[:0])
+        codes = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=empty.dtype, shape=(len(matrix),) + empty.shape[1:]
+        )
+        for start in range(0, len(matrix), BLOCK_ROWS):
+            codes[start:start + BLOCK_ROWS] = quantizer.encode(matrix[start:start + BLOCK_ROWS])
+        codes.flush()
+        del codes
+        tmp_path.replace(codes_path)
+        return codes_path.stat().st_size
+
+    @classmethod
+    def load(cls, path, kind: str, rescore_factor: int = 4):
+        codes_path, params_path = quantized_paths(path, kind)
+        quantizer = QUANTIZERS[kind].from_params(np.load(params_path))
+        return cls(
+            DenseIndex.load(path),
+            quantizer,
+            np.load(codes_path, mmap_mode="r"),
+            rescore_factor=rescore_factor
+        )
+
+    def search_many(self, query_embeddings, k: int):
+        """
+        Approximate scan over the codes, exact rescoring of the best
+        k * rescore_factor candidates.
+
+        Returns:
+            One (chunk_ids, similarities) array pair per query, best first
+        """
+        queries = _normalize(np.atleast_2d(query_embeddings))
+        if len(self.codes) == 0 or k <= 0:
+            return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+
+        approximate = self.quantizer.scores(self.codes, queries)
+        n_candidates = min(len(self.codes), max(k, k * self.rescore_factor))
+        k = min(k, len(self.codes))
+
+        results = []
+        for query, column in zip(queries, approximate.T):
+            candidates = np.sort(np.argpartition(-column, n_candidates - 1)[:n_candidates])
+            # Only the candidate rows of the full-precision matrix are read
+            exact = np.asarray(self.full_index.matrix[candidates], dtype=np.float32) @ query
+            top = np.argpartition(-exact, k - 1)[:k]
+            top = top[np.argsort(-exact[top], kind="stable")]
+            results.append((candidates[top].astype(np.int64), exact[top]))
+        return results
@@ -0,0 +1,160 @@
+"""
+Persistent embedding cache
+
+Query strings repeat a lot, and running MiniLM for each of them is the main
+per-query CPU cost. This cache stores embeddings on disk in SQLite (the
+same engine ChromaDB uses), keyed by a hash of model name + text, as compact
+float32 blobs. Lookups and inserts are batched; when the cache grows past
+its size limit the least recently used entries are evicted.
+
+Lookups are read-only unless an entry's recency is stale: last_used is only
+rewritten when it is more than TOUCH_INTERVAL seconds old, so repeated
+queries don't turn every lookup into a write transaction shared by all
+worker processes. The entry count is tracked as a running upper bound and
+only recounted when it crosses the limit; eviction then goes down to
+EVICT_TO of the limit so the next recount is many inserts away.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+EMBEDDING_CACHE_PATH = Path(__file__).parent.parent / "data" / "embedding_cache.sqlite3"
+
+# SQLite limits the number of bound parameters per statement
+_BATCH = 500
+
+# Minimum age (seconds) of last_used before a hit refreshes it
+TOUCH_INTERVAL = 300
+
+# Eviction shrinks the cache to this fraction of max_entries
+EVICT_TO = 0.9
+
+
+def _cache_key(model_name: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed LRU cache of text embeddings.
+
+    Safe to share between threads; several processes can use the same file
+    (WAL journal, short transactions).
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries: int = 50_000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "  key BLOB PRIMARY KEY,"
+            "  dim INTEGER NOT NULL,"
+            "  vector BLOB NOT NULL,"
+            "  last_used REAL NOT NULL"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        # Upper bound of the row count (other processes may insert too);
+        # recounted only when it passes max_entries
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def get_many(self, model_name: str, texts) -> dict:
+        """
+        Batch lookup.
+
+        Returns:
+            dict mapping text -> float32 vector for every text found
+        """
+        keys = {_cache_key(model_name, text): text for text in set(texts)}
+        found = {}
+        now = time.time()
+        stale = []
+
+        with self._lock:
+            key_list = list(keys)
+            for i in range(0, len(key_list), _BATCH):
+                batch = key_list[i:i + _BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, dim, vector, last_used FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, dim, vector, last_used in rows:
+                    found[keys[key]] = np.frombuffer(vector, dtype=np.float32, count=dim)
+                    if now - last_used > TOUCH_INTERVAL:
+                        stale.append(key)
+
+            # Refresh recency only for entries not touched recently
+            if stale:
+                for i in range(0, len(stale), _BATCH):
+                    batch = stale[i:i + _BATCH]
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(batch))})",
+                        [now, *batch]
+                    )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, model_name: str, texts, vectors):
+        """Store embeddings for texts, then evict LRU entries beyond max_entries"""
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((_cache_key(model_name, text), len(vector), vector.tobytes(), now))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            # Replaced keys are counted too, so this stays an upper bound
+            self._count += len(rows)
+            if self._count > self.max_entries:
+                (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                if self._count > self.max_entries:
+                    target = int(self.max_entries * EVICT_TO)
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN ("
+                        "  SELECT key FROM embeddings ORDER BY last_used LIMIT ?"
+                        ")",
+                        (self._count - target,)
+                    )
+                    self._count = target
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "size": count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._count = 0
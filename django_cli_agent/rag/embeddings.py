@@ -1,14 +1,175 @@
-from sentence_transformers import SentenceTransformer
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+from rag.embedding_cache import EmbeddingCache
+from config import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_BACKEND,
+    ONNX_MODEL_PATH,
+    ONNX_THREADS,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_SIZE,
+    EMBED_WORKERS,
+    EMBED_BATCH_SIZE,
+)
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
 
 _embedding_model = None
+_embedding_cache = None
+
+
+def onnx_model_path() -> Path:
+    """ONNX_MODEL_PATH, resolved against the django_cli_agent directory"""
+    path = Path(ONNX_MODEL_PATH)
+    return path if path.is_absolute() else Path(__file__).parent.parent / path
+
+
+def load_embedding_model(backend: str = None, threads: int = None):
+    """
+    Load EMBEDDING_MODEL_NAME on the given backend (default: EMBEDDING_BACKEND).
+    Both expose encode(texts, batch_size=...) returning unit-length float32
+    vectors, and a .tokenizer for token counting.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "torch":
+        # Imported here: the onnx backend never loads torch
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(EMBEDDING_MODEL_NAME)
+    if backend == "onnx":
+        from rag.onnx_embeddings import OnnxEmbeddingModel
+        return OnnxEmbeddingModel(onnx_model_path(), threads=ONNX_THREADS if threads is None else threads)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}, expected one of {EMBEDDING_BACKENDS}")
+
+
+def embedding_model_id(backend: str = None) -> str:
+    """
+    Identifies the vectors a backend produces: part of the embedding cache
+    key and of the index fingerprint, so vectors of different backends are
+    never mixed.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "torch":
+        return EMBEDDING_MODEL_NAME
+    return f"{EMBEDDING_MODEL_NAME}@{backend}:{onnx_model_path().name}"
+
 
 def get_embedding_model():
     global _embedding_model
     if _embedding_model is None:
-        _embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+        _embedding_model = load_embedding_model()
     return _embedding_model
 
 
-def embed_texts(texts):
-    model = get_embedding_model()
-    return model.encode(texts)
+def warm_up_embedding_model():
+    """
+    Load the model and run it once, so the first query doesn't pay for
+    loading it (or for the backend's first-call setup)
+    """
+    get_embedding_model().encode(["django"])
+
+
+def get_embedding_cache():
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(max_entries=EMBEDDING_CACHE_SIZE)
+    return _embedding_cache
+
+
+def embed_texts(texts, use_cache=True):
+    """
+    Embed a list of texts.
+    
+    Args:
+        texts: List of strings
+        use_cache: Look texts up in the persistent embedding cache first and
+                   only run the model on misses. Index builds pass False so
+                   document chunks don't evict cached queries.
+    
+    Returns:
+        float32 array of shape (len(texts), dim)
+    """
+    if not use_cache or not EMBEDDING_CACHE_ENABLED:
+        return get_embedding_model().encode(texts)
+    
+    try:
+        cache = get_embedding_cache()
+        cached = cache.get_many(embedding_model_id(), texts)
+    except Exception as e:
+        print(f"⚠️  Warning: Embedding cache unavailable: {e}")
+        return get_embedding_model().encode(texts)
+    
+    # Only cache misses reach the model (the model isn't even loaded
+    # when everything is cached)
+    missing = list(dict.fromkeys(text for text in texts if text not in cached))
+    if missing:
+        vectors = get_embedding_model().encode(missing)
+        cached.update(zip(missing, vectors))
+        try:
+            cache.put_many(embedding_model_id(), missing, vectors)
+        except Exception as e:
+            print(f"⚠️  Warning: Could not write embedding cache: {e}")
+    
+    return np.array([cached[text] for text in texts], dtype=np.float32)
+
+
+# ---------------- INDEX BUILDS ---------------- #
+
+def _init_embed_worker(backend, threads):
+    """Process pool initializer: one model copy per worker process"""
+    global _embedding_model
+    # Workers split the cores between them instead of each using all of them
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+    _embedding_model = load_embedding_model(backend, threads=threads)
+
+
+def _embed_shard(texts):
+    return np.asarray(get_embedding_model().encode(texts, batch_size=EMBED_BATCH_SIZE), dtype=np.float32)
+
+
+def embed_batches(batches, workers: int = EMBED_WORKERS):
+    """
+    Embed a stream of batches for an index build (bypasses the cache).
+    
+    With workers > 1 the batches are sharded across a process pool, each
+    worker running its own copy of the model; at most 2 * workers batches
+    are in flight. Results are yielded in input order either way, so the
+    output is deterministic.
+    
+    Args:
+        batches: Iterable of (payload, texts) pairs
+        workers: Number of embedding processes (1 = in this process)
+    
+    Yields:
+        (payload, float32 array of shape (len(texts), dim))
+    """
+    if workers <= 1:
+        for payload, texts in batches:
+            yield payload, _embed_shard(texts)
+        return
+    
+    # spawn, not fork: the build pipeline already runs threads
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_embed_worker,
+        initargs=(EMBEDDING_BACKEND, max(1, (os.cpu_count() or 1) // workers))
+    )
+    pending = deque()
+    try:
+        for payload, texts in batches:
+            pending.append((payload, pool.submit(_embed_shard, texts)))
+            if len(pending) >= 2 * workers:
+                payload, future = pending.popleft()
+                yield payload, future.result()
+        while pending:
+            payload, future = pending.popleft()
+            yield payload, future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
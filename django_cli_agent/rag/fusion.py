@@ -0,0 +1,88 @@
+"""
+Result fusion for hybrid retrieval
+
+Each search leg hands over a ranked list as two NumPy arrays: integer chunk
+ids (BM25 index ordinals) and the leg's raw scores, best first. A fusion
+strategy turns every leg into per-candidate contributions, contributions
+are summed per chunk id with one bincount, and the final top-k is picked
+with argpartition. Chunk texts are never touched here.
+
+Strategies (FUSION_STRATEGIES):
+    rrf         Reciprocal Rank Fusion: weight / (rank + 60)
+    normalized  z-score normalized scores, weighted sum
+    convex      min-max normalized scores, alpha * semantic + (1 - alpha) * bm25
+"""
+
+import numpy as np
+
+RRF_CONSTANT = 60
+
+
+def _rrf_contributions(ids, scores, weight):
+    """RRF formula: score = weight * 1 / (rank + 60)"""
+    return weight / (np.arange(len(ids), dtype=np.float64) + RRF_CONSTANT)
+
+
+def _zscore_contributions(ids, scores, weight):
+    scores = np.asarray(scores, dtype=np.float64)
+    std = scores.std()
+    if std == 0:
+        return np.full(len(scores), weight, dtype=np.float64)
+    return weight * (scores - scores.mean()) / std
+
+
+def _minmax_contributions(ids, scores, weight):
+    scores = np.asarray(scores, dtype=np.float64)
+    spread = scores.max() - scores.min()
+    if spread == 0:
+        return np.full(len(scores), weight, dtype=np.float64)
+    return weight * (scores - scores.min()) / spread
+
+
+FUSION_STRATEGIES = {
+    'rrf': _rrf_contributions,
+    'normalized': _zscore_contributions,
+    'convex': _minmax_contributions,
+}
+
+
+def fuse(legs, weights, k: int, strategy: str = 'rrf'):
+    """
+    Fuse ranked result lists from several search legs.
+
+    Args:
+        legs: List of (ids, scores) array pairs, each ranked best first
+        weights: One weight per leg (alpha, 1 - alpha for semantic / BM25)
+        k: Number of fused results
+        strategy: Key of FUSION_STRATEGIES
+
+    Returns:
+        tuple: (ids, fused_scores) of the top-k chunks, best first. Ties
+        keep the order in which chunks first appeared across the legs.
+    """
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy '{strategy}'. Choose from: {', '.join(FUSION_STRATEGIES)}")
+    contributions_fn = FUSION_STRATEGIES[strategy]
+
+    all_ids = []
+    all_contributions = []
+    for (ids, scores), weight in zip(legs, weights):
+        if len(ids) == 0:
+            continue
+        all_ids.append(np.asarray(ids, dtype=np.int64))
+        all_contributions.append(contributions_fn(ids, scores, weight))
+
+    if not all_ids or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    all_ids = np.concatenate(all_ids)
+    unique_ids, first_seen, inverse = np.unique(all_ids, return_index=True, return_inverse=True)
+    fused = np.bincount(inverse, weights=np.concatenate(all_contributions), minlength=len(unique_ids))
+
+    if len(unique_ids) > k:
+        top = np.argpartition(-fused, k - 1)[:k]
+    else:
+        top = np.arange(len(unique_ids))
+
+    ranked = top[np.lexsort((first_seen[top], -fused[top]))]
+    return unique_ids[ranked], fused[ranked]
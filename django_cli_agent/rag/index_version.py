@@ -0,0 +1,50 @@
+"""
+Index build fingerprint
+
+Every index build publishes its snapshot by rewriting a small pointer file,
+data/indexes/CURRENT (see rag/snapshot.py). Readers fingerprint the build
+they are serving from the pointer's stat() - no file read per lookup - and
+use it to invalidate anything derived from the old index.
+"""
+
+import os
+import uuid
+from pathlib import Path
+
+INDEX_VERSION_PATH = Path(__file__).parent.parent / "data" / "indexes" / "CURRENT"
+
+
+def bump_index_version(token: str | None = None) -> str:
+    """
+    Record that a new index was built (atomically). Returns the new version token.
+    
+    Args:
+        token: Version to publish, normally the new snapshot's directory name
+    """
+    token = token or uuid.uuid4().hex
+    INDEX_VERSION_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = INDEX_VERSION_PATH.with_name(INDEX_VERSION_PATH.name + ".tmp")
+    tmp_path.write_text(token + "\n", encoding="utf-8")
+    os.replace(tmp_path, INDEX_VERSION_PATH)
+    return token
+
+
+def read_index_version() -> str | None:
+    """Token written by the last bump_index_version(), or None"""
+    try:
+        return INDEX_VERSION_PATH.read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_index_version() -> tuple:
+    """
+    Cheap fingerprint of the index build currently on disk.
+    Changes whenever bump_index_version() runs.
+    """
+    try:
+        stat = INDEX_VERSION_PATH.stat()
+    except FileNotFoundError:
+        # Indexes built before versioning was introduced
+        return ("unversioned",)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
@@ -6,6 +6,11 @@ Run this file directly:
 
 Or from command line:
     python -m initialize_rag
+
+Builds the vector store, the BM25 index and the embedding matrix in one
+pass into a new snapshot under data/indexes/ and publishes it atomically.
+Only files changed since the last run are re-embedded; pass --full to
+rebuild everything from scratch.
 """
 
 import sys
@@ -22,7 +27,7 @@ if __name__ == "__main__":
     print("="*60 + "\n")
     
     # Run setup
-    success = setup_rag()
+    success = setup_rag(full_rebuild="--full" in sys.argv)
     
     if success:
         # Verify it works
@@ -1,50 +1,294 @@
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from config import LOADER_WORKERS
+
 # Use relative path from the rag module
 DOCS_PATH = Path(__file__).parent.parent / "data" / "django_docs"
 
 
-def load_documents():
+# ---------------- FORMATS ---------------- #
+# Every format is converted to the heading dialect of the bundled .txt
+# files (===== banners, SECTION:, CONCEPT:, CODE:), so the structure-aware
+# splitter works the same on all of them. Code blocks are closed with an
+# END CODE line, or prose following them would be read as code.
+
+_RST_ADORNMENT = re.compile(r"^([=\-~^\"'`#*+:.])\1{2,}\s*$")
+_RST_ROLE = re.compile(r":[\w:.+-]+:`([^`<]*?)(?:\s*<[^>]*>)?`")
+_RST_CODE_DIRECTIVE = re.compile(r"^\s*\.\. (?:code-block|code|sourcecode|console)::")
+_RST_TARGET = re.compile(r"^\s*\.\. _[^:]*:\s*$|^\s*\.\. \|")
+_MD_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_MD_FENCE = re.compile(r"^\s*(```|~~~)")
+_CODE_END = "END CODE"
+
+
+def _heading_line(level: int, title: str):
+    if level == 0:
+        return ["=" * 25, title.upper(), "=" * 25]
+    return [f"{'SECTION' if level == 1 else 'CONCEPT'}: {title}"]
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def _rst_inline(text: str) -> str:
+    """:role:`text <target>` → text, ``literal`` → literal"""
+    return _RST_ROLE.sub(r"\1", text).replace("``", "")
+
+
+def _parse_text(text: str) -> str:
+    """The bundled docs are already in the splitter's dialect"""
+    return text
+
+
+def _parse_rst(text: str) -> str:
+    """
+    reStructuredText: section titles become banner / SECTION / CONCEPT
+    headings by order of first use of their adornment style (as in rst
+    itself), code directives and literal blocks become CODE: blocks and
+    inline roles are reduced to their text.
+    """
+    lines = text.splitlines()
+    styles = []
+    out = []
+    # Indentation of the line that opened the current code block
+    code_indent = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        # A code block is the indented text after its directive / "::"
+        if code_indent is not None:
+            if not line.strip() or _indent(line) > code_indent:
+                out.append(line)
+                i += 1
+                continue
+            out.append(_CODE_END)
+            code_indent = None
+        # Overlined title: adornment, title, adornment
+        if (_RST_ADORNMENT.match(line) and i + 2 < len(lines) and lines[i + 1].strip()
+                and lines[i + 2].strip() == line.strip()):
+            style, title, consumed = ("over", line.strip()[0]), lines[i + 1].strip(), 3
+        # Underlined title
+        elif (line.strip() and not line.startswith(" ") and i + 1 < len(lines)
+                and _RST_ADORNMENT.match(lines[i + 1])
+                and len(lines[i + 1].strip()) >= len(line.strip())):
+            style, title, consumed = ("under", lines[i + 1].strip()[0]), line.strip(), 2
+        else:
+            style = None
+        
+        if style is not None:
+            if style not in styles:
+                styles.append(style)
+            out.extend(_heading_line(min(styles.index(style), 2), _rst_inline(title)))
+            i += consumed
+            continue
+        
+        if _RST_TARGET.match(line):
+            i += 1
+            continue
+        if _RST_CODE_DIRECTIVE.match(line):
+            out.append("CODE:")
+            code_indent = _indent(line)
+            i += 1
+            continue
+        
+        line = _rst_inline(line)
+        # "Paragraph::" introduces a literal (code) block
+        if line.rstrip().endswith("::") and not line.lstrip().startswith(".."):
+            stripped = line.rstrip()[:-2].rstrip()
+            if stripped:
+                out.append(stripped + ":")
+            out.append("CODE:")
+            code_indent = _indent(line)
+        else:
+            out.append(line)
+        i += 1
+    return "\n".join(out)
+
+
+def _parse_markdown(text: str) -> str:
+    """
+    Markdown: '#' becomes a banner, '##' SECTION:, deeper levels CONCEPT:;
+    fenced code blocks become CODE: blocks.
+    """
+    out = []
+    in_fence = False
+    for line in text.splitlines():
+        if _MD_FENCE.match(line):
+            out.append(_CODE_END if in_fence else "CODE:")
+            in_fence = not in_fence
+            continue
+        heading = None if in_fence else _MD_HEADING.match(line)
+        if heading:
+            out.extend(_heading_line(min(len(heading.group(1)) - 1, 2), heading.group(2)))
+        else:
+            out.append(line)
+    return "\n".join(out)
+
+
+# Extension → parser; document_files() picks up every extension listed here
+PARSERS = {
+    ".txt": _parse_text,
+    ".rst": _parse_rst,
+    ".md": _parse_markdown,
+}
+
+
+# ---------------- LOADING ---------------- #
+
+def source_name(file_path, root=None) -> str:
+    """
+    Source of a file in chunk metadata: its path relative to the docs
+    root (just the file name for the top-level files)
+    """
+    return Path(file_path).relative_to(root or DOCS_PATH).as_posix()
+
+
+def document_files(root=None):
     """
-    Load all .txt files from the Django documentation directory.
+    Recursively list the documentation files (every format in PARSERS)
+    under the docs directory, in a stable order. Hidden files and
+    directories are skipped.
     
     Returns:
-        List of document dictionaries with 'text' and 'metadata'
+        List of file paths
     """
-    documents = []
-    
+    root = Path(root or DOCS_PATH)
     # Verify path exists
-    if not DOCS_PATH.exists():
-        raise FileNotFoundError(f"Documentation path not found: {DOCS_PATH}")
+    if not root.exists():
+        raise FileNotFoundError(f"Documentation path not found: {root}")
     
-    # Find all .txt files
-    txt_files = list(DOCS_PATH.glob("*.txt"))
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        files.extend(
+            Path(dirpath) / name
+            for name in sorted(filenames)
+            if not name.startswith(".") and Path(name).suffix.lower() in PARSERS
+        )
+    
+    if len(files) == 0:
+        raise FileNotFoundError(f"No {', '.join(PARSERS)} files found in: {root}")
+    
+    return files
+
+
+class LoadStats:
+    """Per-file size and read / parse time of a load, plus totals"""
+    
+    def __init__(self):
+        self.files = []          # (source, bytes, seconds)
+        self.failed_sources = []
+        self.cpu_seconds = 0.0
+        self.started = time.perf_counter()
+    
+    @property
+    def failed(self) -> int:
+        return len(self.failed_sources)
+    
+    def add(self, source, size, seconds, cpu_seconds=0.0):
+        self.files.append((source, size, seconds))
+        self.cpu_seconds += cpu_seconds
+    
+    def add_failure(self, source):
+        self.failed_sources.append(source)
+    
+    def busy_seconds(self) -> float:
+        """Summed per-file read / parse time across loader threads"""
+        return sum(seconds for _, _, seconds in self.files)
+    
+    def summary(self, slowest: int = 3) -> str:
+        elapsed = time.perf_counter() - self.started
+        total = sum(size for _, size, _ in self.files)
+        text = (f"{len(self.files)} files, {total / 1024 / 1024:.2f} MB in {elapsed:.2f}s "
+                f"({total / 1024 / 1024 / max(elapsed, 1e-9):.1f} MB/s)")
+        if self.failed:
+            text += f", {self.failed} failed"
+        if self.files and slowest:
+            worst = sorted(self.files, key=lambda f: f[2], reverse=True)[:slowest]
+            text += "; slowest: " + ", ".join(f"{source} ({seconds * 1000:.0f} ms)" for source, _, seconds in worst)
+        return text
+
+
+def _read_document(file_path, root):
+    """Read and parse one file (runs in a loader thread)"""
+    started, cpu_started = time.perf_counter(), time.thread_time()
+    raw = Path(file_path).read_bytes()
+    text = PARSERS[Path(file_path).suffix.lower()](raw.decode("utf-8"))
+    return {
+        "text": text,
+        "metadata": {
+            "source": source_name(file_path, root)
+        }
+    }, len(raw), time.perf_counter() - started, time.thread_time() - cpu_started
+
+
+def iter_documents(txt_files=None, workers: int = LOADER_WORKERS, stats: LoadStats = None, root=None):
+    """
+    Lazily load documentation files. Files are read and parsed by a pool
+    of `workers` threads, at most 2 * workers ahead of the consumer, and
+    yielded in input order.
     
-    if len(txt_files) == 0:
-        raise FileNotFoundError(f"No .txt files found in: {DOCS_PATH}")
+    Args:
+        txt_files: Paths to load (default: document_files())
+        workers: Loader threads
+        stats: Optional LoadStats to record per-file size and timing in
+        root: Docs root the sources are relative to (default: DOCS_PATH)
     
-    print(f"   Found {len(txt_files)} .txt files")
+    Yields:
+        Document dictionaries with 'text' and 'metadata'
+    """
+    if txt_files is None:
+        txt_files = document_files(root)
+    root = Path(root or DOCS_PATH)
     
-    # Load each file
-    for i, file_path in enumerate(txt_files, 1):
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="docs-loader") as pool:
+        pending = deque()
+        files = iter(txt_files)
+        i = 0
+        while True:
+            # Keep the pool busy without reading the whole corpus ahead
+            while len(pending) < 2 * max(1, workers):
+                file_path = next(files, None)
+                if file_path is None:
+                    break
+                pending.append((file_path, pool.submit(_read_document, file_path, root)))
+            if not pending:
+                break
+            
+            file_path, future = pending.popleft()
+            i += 1
+            try:
+                doc, size, seconds, cpu_seconds = future.result()
+            except Exception as e:
+                print(f"   ⚠️  Warning: Could not load {file_path.name}: {e}")
+                if stats is not None:
+                    stats.add_failure(source_name(file_path, root))
+                continue
             
-            if len(text.strip()) > 0:
-                documents.append({
-                    "text": text,
-                    "metadata": {
-                        "source": file_path.name
-                    }
-                })
+            if stats is not None:
+                stats.add(doc["metadata"]["source"], size, seconds, cpu_seconds)
             
             # Progress indicator
-            if i % 20 == 0:
+            if i % 100 == 0:
                 print(f"   Loading... {i}/{len(txt_files)} files")
-                
-        except Exception as e:
-            print(f"   ⚠️  Warning: Could not load {file_path.name}: {e}")
-            continue
+            
+            if len(doc["text"].strip()) > 0:
+                yield doc
+
+
+def load_documents():
+    """
+    Load all documentation files from the Django documentation directory.
     
-    return documents
\ No newline at end of file
+    Returns:
+        List of document dictionaries with 'text' and 'metadata'
+    """
+    txt_files = document_files()
+    print(f"   Found {len(txt_files)} documentation files")
+    return list(iter_documents(txt_files))
@@ -0,0 +1,175 @@
+"""
+Index manifest for incremental re-indexing
+
+Each index snapshot carries an index_manifest.json that records, for every
+documentation file, a hash of its content and the ids of the chunks it
+produced. Chunk ids are derived from content (source file + chunk text), so
+an unchanged chunk keeps its id across builds. setup_rag compares the
+current files against the previous snapshot's manifest and only re-splits
+changed files, embeds chunks whose id is new and deletes chunks whose id
+disappeared.
+
+A change of splitter, chunking or dedup parameters or embedding model
+(or backend) changes the manifest
+fingerprint, which forces a full rebuild.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from rag.splitter import CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, SPLITTER_VERSION
+from rag.embeddings import embedding_model_id
+from config import DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_BANDS
+
+MANIFEST_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def index_fingerprint() -> str:
+    """Everything that changes chunk boundaries or vectors for the same files"""
+    return (
+        f"v{MANIFEST_VERSION}:splitter={SPLITTER_VERSION}"
+        f":chunk={CHUNK_TOKENS}/{CHUNK_OVERLAP_TOKENS}tok:model={embedding_model_id()}"
+        f":dedup={DEDUP_THRESHOLD}/{DEDUP_NUM_PERM}x{DEDUP_BANDS}"
+    )
+
+
+def assign_chunk_ids(chunks):
+    """
+    Give every chunk a stable, content-derived 'id':
+    sha1(source + text), suffixed with a counter for repeated texts
+    within the same file.
+    """
+    seen = {}
+    for chunk in chunks:
+        key = content_hash(f"{chunk['metadata']['source']}\0{chunk['text']}")
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        chunk["id"] = key if occurrence == 0 else f"{key}-{occurrence}"
+    return chunks
+
+
+def load_manifest(path) -> dict:
+    """Manifest of a previous build, or an empty one (forces a full build)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"fingerprint": None, "files": {}}
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def save_manifest(path, fingerprint: str, files: dict):
+    """
+    Args:
+        path: index_manifest.json of the snapshot being built
+        fingerprint: index_fingerprint() of the build
+        files: {source: {"hash": content_hash, "chunks": [chunk ids]}}
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "files": files}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class IndexPlan:
+    """
+    Incremental build plan, filled in while documents stream past.
+
+    changed_documents() filters the document stream down to new or changed
+    files; record_chunks() notes the ids of the chunks they produce. Once
+    the stream is exhausted, stale_ids() and files describe the new build.
+    """
+
+    def __init__(self, manifest: dict, full_rebuild: bool = False):
+        self.full_rebuild = full_rebuild or manifest.get("fingerprint") != index_fingerprint()
+        self.previous = {} if self.full_rebuild else manifest["files"]
+        self.files = {}
+        self.changed = 0
+        self.unchanged = 0
+
+    def changed_documents(self, documents, on_unchanged=None):
+        """
+        Yield documents that are new or changed since the previous build
+
+        Args:
+            on_unchanged: Optional callback(source, entry) for skipped files
+        """
+        for doc in documents:
+            source = doc["metadata"]["source"]
+            digest = content_hash(doc["text"])
+            entry = self.previous.get(source)
+            if entry is not None and entry["hash"] == digest:
+                self.files[source] = entry
+                self.unchanged += 1
+                if on_unchanged is not None:
+                    on_unchanged(source, entry)
+            else:
+                self.files[source] = {"hash": digest, "chunks": []}
+                self.changed += 1
+                yield doc
+
+    def reprocess(self, documents):
+        """Yield unchanged documents that have to be split again anyway"""
+        for doc in documents:
+            self.files[doc["metadata"]["source"]] = {"hash": content_hash(doc["text"]), "chunks": []}
+            yield doc
+
+    def is_unchanged(self, source) -> bool:
+        """File kept as is from the previous build (not changed, removed or reprocessed)"""
+        entry = self.previous.get(source)
+        return entry is not None and self.files.get(source) is entry
+
+    def record_chunks(self, chunk_lists):
+        """Assign ids to each document's chunks and record them; yields chunks"""
+        for chunks in chunk_lists:
+            for chunk in assign_chunk_ids(chunks):
+                self.files[chunk["metadata"]["source"]]["chunks"].append(chunk["id"])
+                yield chunk
+
+    def keep_previous(self, sources) -> int:
+        """
+        Files that exist but could not be loaded this time keep their
+        previous entry, so their chunks stay indexed instead of being
+        deleted as if the files were removed.
+
+        Returns:
+            Number of files carried forward
+        """
+        kept = 0
+        for source in sources:
+            entry = self.previous.get(source)
+            if entry is not None and source not in self.files:
+                self.files[source] = entry
+                kept += 1
+        return kept
+
+    @property
+    def removed(self):
+        return [source for source in self.previous if source not in self.files]
+
+    def stale_ids(self):
+        """Chunks of changed or removed files that were not produced again"""
+        current = {
+            chunk_id
+            for entry in self.files.values()
+            for chunk_id in entry["chunks"]
+        }
+        return [
+            chunk_id
+            for source, entry in self.previous.items()
+            if self.files.get(source) is not entry
+            for chunk_id in entry["chunks"]
+            if chunk_id not in current
+        ]
+
+    def save(self, path):
+        save_manifest(path, index_fingerprint(), self.files)
@@ -0,0 +1,126 @@
+"""
+ONNX Runtime backend for the sentence embedding model
+
+Runs an ONNX export of the transformer (see export_onnx_model.py) with
+onnxruntime and the Rust `tokenizers` tokenizer, then applies the same
+post-processing as the sentence-transformers pipeline of all-MiniLM-L6-v2:
+mean pooling over the attention mask and L2 normalization. Neither torch
+nor sentence-transformers is imported.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+# all-MiniLM-L6-v2 is trained with (and sentence-transformers truncates to)
+# 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+
+class _Tokenizer:
+    """The slice of the Hugging Face tokenizer API the splitter uses"""
+
+    def __init__(self, tokenizer):
+        self._tokenizer = tokenizer
+
+    def encode(self, text: str, add_special_tokens: bool = True):
+        return self._tokenizer.encode(text, add_special_tokens=add_special_tokens).ids
+
+
+class OnnxEmbeddingModel:
+    """
+    Drop-in for SentenceTransformer.encode() on the ONNX export.
+
+    Args:
+        model_path: .onnx file; tokenizer.json must be in the same directory
+        threads: onnxruntime intra-op threads (0 = its default)
+    """
+
+    def __init__(self, model_path, threads: int = 0, max_seq_length: int = MAX_SEQ_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = Path(model_path)
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"ONNX model not found: {model_path} (run: python export_onnx_model.py)"
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.max_seq_length = max_seq_length
+
+        tokenizer_path = model_path.parent / "tokenizer.json"
+        # Counting tokens (splitter) must not truncate; inference must
+        self.tokenizer = _Tokenizer(Tokenizer.from_file(str(tokenizer_path)))
+        self._tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self._tokenizer.enable_truncation(max_length=max_seq_length)
+        self._tokenizer.enable_padding(pad_id=self._tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+
+    def _encode_batch(self, texts):
+        encodings = self._tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feed)[0]
+
+        # Mean pooling over real (non-padding) tokens, then L2 normalization
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def encode(self, texts, batch_size: int = 32, **kwargs):
+        """
+        Args:
+            texts: A string or a list of strings
+            batch_size: Texts per inference call
+
+        Returns:
+            float32 array of shape (len(texts), dim), or (dim,) for a string
+        """
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            dim = self.session.get_outputs()[0].shape[-1]
+            return np.zeros((0, dim if isinstance(dim, int) else 0), dtype=np.float32)
+
+        # Similar lengths per batch keep padding (wasted compute) small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            for i, vector in zip(batch, self._encode_batch(texts[i] for i in batch)):
+                vectors[i] = vector
+
+        result = np.stack(vectors)
+        return result[0] if single else result
+
+
+# Agreement with the torch backend expected of an export: fp32 differs only
+# by kernel rounding, int8 quantization moves vectors slightly
+MIN_COSINE_FP32 = 0.9999
+MIN_COSINE_INT8 = 0.99
+
+
+def embedding_agreement(reference, candidate):
+    """
+    Compare two backends' vectors for the same texts (rows unit-length).
+
+    Returns:
+        (max absolute element difference, min per-row cosine similarity)
+    """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    cosine = (reference * candidate).sum(axis=1)
+    return float(np.abs(reference - candidate).max()), float(cosine.min())
@@ -0,0 +1,79 @@
+"""
+Bounded streaming stages for index builds
+
+Each ingestion stage (load -> split -> embed -> store) is a generator.
+prefetch() runs a stage in a background thread and hands its items to the
+next stage through a bounded queue: the producer blocks once `maxsize`
+items are waiting, so memory stays flat however large the corpus is, and
+the stages overlap in time (file reads, model inference and ChromaDB
+writes all release the GIL).
+"""
+
+import queue
+import threading
+
+_ITEM = 0
+_DONE = 1
+_ERROR = 2
+
+
+def prefetch(iterable, maxsize: int = 4, name: str = "ingest"):
+    """
+    Iterate `iterable` in a background thread, at most `maxsize` items ahead.
+
+    Exceptions raised by the producer are re-raised in the consumer. If the
+    consumer stops early (break, exception), the producer is told to stop.
+
+    Args:
+        iterable: Any iterable, typically the previous stage's generator
+        maxsize: Bound of the hand-over queue
+        name: Thread name (shows up in stack dumps)
+
+    Yields:
+        The items of `iterable`, in order
+    """
+    handover = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(message):
+        while not stop.is_set():
+            try:
+                handover.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((_ITEM, item)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_ERROR, e))
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, value = handover.get()
+            if kind == _DONE:
+                return
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+
+def batched(iterable, size: int):
+    """Group an iterable into lists of up to `size` items"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
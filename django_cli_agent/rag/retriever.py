@@ -46,16 +46,86 @@
 #     return "\n\n".join(contexts), list(sources)
 
 import chromadb
-from rag.embeddings import embed_texts
-from pathlib import Path
-from rank_bm25 import BM25Okapi
-import pickle
+from chromadb.api.shared_system_client import SharedSystemClient
+from rag.embeddings import embed_texts, warm_up_embedding_model
+from rag.bm25_index import BM25Index, tokenize
+from rag.dense_index import DenseIndex, QuantizedIndex
+from rag.fusion import fuse
+from rag.cache import TTLCache
+from rag.index_version import current_index_version
+from rag.snapshot import DATA_PATH, current_index_paths, hold_snapshot, release_snapshot
+from config import (
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_TTL,
+    RETRIEVAL_WORKERS,
+    SEMANTIC_SEARCH_TIMEOUT,
+    BM25_SEARCH_TIMEOUT,
+    FUSION_STRATEGY,
+    VECTOR_BACKEND,
+    EXACT_VECTOR_QUANTIZATION,
+    VECTOR_RESCORE_FACTOR,
+    INDEX_RELOAD_INTERVAL,
+)
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from functools import partial
+import asyncio
 import numpy as np
+import threading
+import time
 import re
 
-# Use relative path from the rag module
-CHROMA_PATH = Path(__file__).parent.parent / "data" / "vector_db"
-BM25_INDEX_PATH = Path(__file__).parent.parent / "data" / "bm25_index.pkl"
+# Display names of the two retrieval legs
+SEARCH_LEGS = {
+    'semantic': 'Semantic',
+    'bm25': 'BM25',
+}
+
+# Pre-binary-format BM25 index (pickled rank_bm25 object); only detected, never loaded
+LEGACY_BM25_PICKLE = DATA_PATH / "bm25_index.pkl"
+
+# What a leg that returned nothing hands to fusion: (chunk ids, scores)
+EMPTY_LEG = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+
+
+class RetrievalResult(tuple):
+    """
+    (context, sources) pair returned by retrieval.
+    
+    Unpacks exactly like the plain tuple: `context, sources = result`.
+    `degraded` maps the search legs ('semantic' / 'bm25') that did not
+    contribute to why: 'timeout' (missed its deadline) or 'error' (raised),
+    so the answer was built from the other leg alone. Empty when both legs
+    contributed.
+    """
+    
+    def __new__(cls, context, sources, degraded=None):
+        result = super().__new__(cls, (context, sources))
+        result.degraded = dict(degraded or {})
+        return result
+    
+    @property
+    def context(self):
+        return self[0]
+    
+    @property
+    def sources(self):
+        return self[1]
+
+
+# Small shared pool that runs the semantic and BM25 legs side by side
+_search_executor = None
+_search_executor_lock = threading.Lock()
+
+def _get_search_executor():
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(
+                max_workers=RETRIEVAL_WORKERS,
+                thread_name_prefix="retrieval"
+            )
+    return _search_executor
 
 
 class HybridRetriever:
@@ -82,34 +152,115 @@ class HybridRetriever:
     def __init__(self):
         self.chroma_client = None
         self.chroma_collection = None
+        self.dense_index = None
         self.bm25 = None
         self.documents = []
         self.metadatas = []
+        self._result_cache = TTLCache(maxsize=RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL)
+        # All indexes come from the same published snapshot
+        self.index_version = current_index_version()
+        self.index_paths = current_index_paths()
+        # Keeps index builds from pruning the snapshot while it is served
+        self._snapshot_lock = hold_snapshot(self.index_paths)
+        # Requests currently using this instance (see _pinned_retriever)
+        self._in_flight = 0
+        self._retired = False
+        self._state_lock = threading.Lock()
         self._load_indexes()
     
     def _load_indexes(self):
-        """Load both ChromaDB and BM25 indexes"""
-        # Load ChromaDB (semantic search)
-        try:
-            self.chroma_client = chromadb.PersistentClient(path=str(CHROMA_PATH))
-            self.chroma_collection = self.chroma_client.get_collection("django_docs")
-        except Exception as e:
-            print(f"⚠️  Warning: Could not load ChromaDB: {e}")
+        """Load the semantic (ChromaDB or exact) and BM25 indexes"""
+        paths = self.index_paths
+        # Load semantic search backend (VECTOR_BACKEND in config)
+        if VECTOR_BACKEND == "exact":
+            # Memory-mapped embedding matrix, searched in-process; with
+            # quantization the scan runs over the codes and only the best
+            # candidates are rescored against the full-precision rows
+            try:
+                if EXACT_VECTOR_QUANTIZATION:
+                    self.dense_index = QuantizedIndex.load(
+                        paths.embeddings,
+                        EXACT_VECTOR_QUANTIZATION,
+                        rescore_factor=VECTOR_RESCORE_FACTOR
+                    )
+                else:
+                    self.dense_index = DenseIndex.load(paths.embeddings)
+            except Exception as e:
+                print(f"⚠️  Warning: Could not load embedding matrix: {e}")
+                print("   Run: python rag/initialise_rag.py to build it")
+        else:
+            try:
+                self.chroma_client = chromadb.PersistentClient(path=str(paths.chroma))
+                self.chroma_collection = self.chroma_client.get_collection("django_docs")
+            except Exception as e:
+                print(f"⚠️  Warning: Could not load ChromaDB: {e}")
         
-        # Load BM25 index (keyword search)
+        # Load the embedding model here, not inside the first query's
+        # semantic search deadline (the model stays loaded across reloads)
+        if self.dense_index is not None or self.chroma_collection is not None:
+            try:
+                warm_up_embedding_model()
+            except Exception as e:
+                print(f"⚠️  Warning: Could not load embedding model: {e}")
+        
+        # Load BM25 index (keyword search) - memory-mapped, nothing is copied
+        # or unpickled; documents and metadata are decoded on access
         try:
-            if BM25_INDEX_PATH.exists():
-                with open(BM25_INDEX_PATH, 'rb') as f:
-                    bm25_data = pickle.load(f)
-                    self.bm25 = bm25_data['bm25']
-                    self.documents = bm25_data['documents']
-                    self.metadatas = bm25_data['metadatas']
+            if paths.bm25.exists():
+                self.bm25 = BM25Index.load(paths.bm25)
+                self.documents = self.bm25.documents
+                self.metadatas = self.bm25.metadatas
+            elif LEGACY_BM25_PICKLE.exists():
+                # Pickled rank_bm25 indexes (before the binary format) are not read
+                print(f"⚠️  Warning: {LEGACY_BM25_PICKLE.name} is no longer supported, BM25 search is disabled")
+                print("   Rebuild the indexes: python rag/initialise_rag.py --full")
             else:
-                print(f"⚠️  Warning: BM25 index not found at {BM25_INDEX_PATH}")
+                print(f"⚠️  Warning: BM25 index not found at {paths.bm25}")
                 print("   Run the setup script to build BM25 index")
         except Exception as e:
             print(f"⚠️  Warning: Could not load BM25 index: {e}")
     
+    def _pin(self):
+        with self._state_lock:
+            self._in_flight += 1
+    
+    def _unpin(self):
+        with self._state_lock:
+            self._in_flight -= 1
+            drained = self._retired and self._in_flight == 0
+        if drained:
+            self.close()
+    
+    def retire(self):
+        """Close this instance as soon as its in-flight requests finish"""
+        with self._state_lock:
+            self._retired = True
+            drained = self._in_flight == 0
+        if drained:
+            self.close()
+    
+    def close(self):
+        """
+        Drop the indexes so memory maps and the ChromaDB client can be freed,
+        and let index builds prune the snapshot
+        """
+        if self.chroma_client is not None:
+            _stop_chroma_client(self.chroma_client)
+        self.chroma_client = None
+        self.chroma_collection = None
+        self.dense_index = None
+        self.bm25 = None
+        self.documents = []
+        self.metadatas = []
+        self._result_cache.clear()
+        release_snapshot(self._snapshot_lock)
+        self._snapshot_lock = None
+    
+    def _indexes_ready(self) -> bool:
+        """Both a semantic backend and the BM25 index are loaded"""
+        semantic_ready = self.dense_index is not None or self.chroma_collection is not None
+        return semantic_ready and self.bm25 is not None
+    
     def _preprocess_query(self, query: str) -> dict:
         """
         Preprocess query to improve both semantic and keyword search
@@ -179,7 +330,7 @@ class HybridRetriever:
         # Join back
         return ' '.join(keywords) if keywords else query
     
-    def retrieve(self, query: str, k: int = 4, alpha: float = 0.5):
+    def retrieve(self, query: str, k: int = 4, alpha: float = 0.5, fusion: str | None = None):
         """
         Hybrid retrieval using both BM25 and semantic search
         
@@ -188,13 +339,24 @@ class HybridRetriever:
             k: Number of results to retrieve
             alpha: Weight for semantic vs BM25 (0.5 = equal weight)
                    0.0 = pure BM25, 1.0 = pure semantic
+            fusion: Fusion strategy ('rrf', 'normalized', 'convex');
+                    defaults to FUSION_STRATEGY from config
         
         Returns:
-            tuple: (combined_context_string, list_of_sources)
+            RetrievalResult: (combined_context_string, list_of_sources),
+            with .degraded naming any search leg that timed out or failed
         """
-        if not self.chroma_collection or not self.bm25:
+        if not self._indexes_ready():
             print("⚠️  Hybrid search not available, check setup")
-            return "", []
+            return RetrievalResult("", [])
+        
+        # Repeated questions skip expansion, embedding, both searches and fusion
+        fusion = fusion or FUSION_STRATEGY
+        cache_key = self._cache_key(query, k, alpha, fusion)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            print(f"[DEBUG] Retrieval cache hit: {cache_key[0]}")
+            return cached
         
         # Preprocess query
         processed = self._preprocess_query(query)
@@ -207,141 +369,443 @@ class HybridRetriever:
         # Get more results than needed for better fusion
         retrieve_k = min(k * 3, 20)
         
-        # 1. SEMANTIC SEARCH (use expanded query)
-        semantic_results = self._semantic_search(processed['semantic'], retrieve_k)
+        # 1 + 2. SEMANTIC SEARCH (expanded query) and BM25 KEYWORD SEARCH
+        # (keyword query) run concurrently, each with its own deadline
+        semantic_batches, bm25_batches, degraded = self._run_search_legs(
+            [processed['semantic']],
+            [processed['keyword']],
+            retrieve_k,
+            timeouts=(SEMANTIC_SEARCH_TIMEOUT, BM25_SEARCH_TIMEOUT)
+        )
+        
+        # 3. FUSION (on chunk ids; texts are fetched for the final k only)
+        fused_results = self._fuse(
+            semantic_batches[0], 
+            bm25_batches[0], 
+            alpha=self._fallback_alpha(alpha, degraded),
+            k=k,
+            strategy=fusion
+        )
+        
+        # 4. Format output (partial results are not cached)
+        result = self._format_results(fused_results, degraded)
+        if not degraded:
+            self._result_cache.set(cache_key, result)
+        
+        return result
+    
+    async def aretrieve(self, query: str, k: int = 4, alpha: float = 0.5, fusion: str | None = None):
+        """
+        Async version of retrieve() for ASGI views
+        
+        The cache lookup and query preprocessing are cheap and run inline;
+        embedding, both searches and fusion run on the shared (bounded)
+        search pool, so the event loop is never blocked and concurrent chats
+        do not each need a thread of their own while they wait.
+        
+        Args/Returns: same as retrieve()
+        """
+        if not self._indexes_ready():
+            print("⚠️  Hybrid search not available, check setup")
+            return RetrievalResult("", [])
         
-        # 2. BM25 KEYWORD SEARCH (use keyword query)
-        bm25_results = self._bm25_search(processed['keyword'], retrieve_k)
+        fusion = fusion or FUSION_STRATEGY
+        cache_key = self._cache_key(query, k, alpha, fusion)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            print(f"[DEBUG] Retrieval cache hit: {cache_key[0]}")
+            return cached
         
-        # 3. RECIPROCAL RANK FUSION
-        fused_results = self._reciprocal_rank_fusion(
-            semantic_results, 
-            bm25_results, 
-            alpha=alpha,
-            k=k
+        processed = self._preprocess_query(query)
+        
+        print(f"[DEBUG] Original query: {processed['original']}")
+        print(f"[DEBUG] Semantic query: {processed['semantic']}")
+        print(f"[DEBUG] Keyword query: {processed['keyword']}")
+        
+        retrieve_k = min(k * 3, 20)
+        
+        semantic_batches, bm25_batches, degraded = await self._arun_search_legs(
+            [processed['semantic']],
+            [processed['keyword']],
+            retrieve_k,
+            timeouts=(SEMANTIC_SEARCH_TIMEOUT, BM25_SEARCH_TIMEOUT)
+        )
+        
+        loop = asyncio.get_running_loop()
+        fused_results = await loop.run_in_executor(
+            _get_search_executor(),
+            partial(
+                self._fuse,
+                semantic_batches[0],
+                bm25_batches[0],
+                alpha=self._fallback_alpha(alpha, degraded),
+                k=k,
+                strategy=fusion
+            )
+        )
+        
+        result = self._format_results(fused_results, degraded)
+        if not degraded:
+            self._result_cache.set(cache_key, result)
+        
+        return result
+    
+    def retrieve_many(self, queries, k: int = 4, alpha: float = 0.5, fusion: str | None = None):
+        """
+        Batched hybrid retrieval for many queries at once
+        (offline evaluation sets, bulk prompt files)
+        
+        All semantic queries are embedded in one model call and sent to
+        ChromaDB in a single query; BM25 scores the whole batch in one
+        vectorized pass. The two legs run concurrently, without deadlines
+        (batch jobs want complete results). Fusion then runs per query.
+        
+        Args:
+            queries: List of query strings
+            k: Number of results to retrieve per query
+            alpha: Weight for semantic vs BM25 (see retrieve)
+            fusion: Fusion strategy (see retrieve)
+        
+        Returns:
+            list of RetrievalResult (context, sources) pairs,
+            in the same order as queries
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        
+        if not self._indexes_ready():
+            print("⚠️  Hybrid search not available, check setup")
+            return [RetrievalResult("", []) for _ in queries]
+        
+        # Serve what we can from the result cache, batch the rest
+        fusion = fusion or FUSION_STRATEGY
+        cache_keys = [self._cache_key(query, k, alpha, fusion) for query in queries]
+        results = [self._result_cache.get(key) for key in cache_keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+        
+        processed = [self._preprocess_query(queries[i]) for i in missing]
+        retrieve_k = min(k * 3, 20)
+        
+        semantic_batches, bm25_batches, degraded = self._run_search_legs(
+            [p['semantic'] for p in processed],
+            [p['keyword'] for p in processed],
+            retrieve_k
         )
         
-        # 4. Format output
+        for i, semantic_results, bm25_results in zip(missing, semantic_batches, bm25_batches):
+            fused_results = self._fuse(
+                semantic_results,
+                bm25_results,
+                alpha=self._fallback_alpha(alpha, degraded),
+                k=k,
+                strategy=fusion
+            )
+            results[i] = self._format_results(fused_results, degraded)
+            if not degraded:
+                self._result_cache.set(cache_keys[i], results[i])
+        
+        return results
+    
+    def _run_search_legs(self, semantic_queries, keyword_queries, k: int, timeouts=(None, None)):
+        """
+        Run the semantic and BM25 legs concurrently on the shared search pool,
+        so wall time is roughly the slower leg instead of the sum.
+        
+        Each leg has its own deadline (seconds from submission, None = wait).
+        A leg that misses it ('timeout') or raises ('error') contributes
+        empty results and is reported as degraded; a timed-out leg keeps
+        running in the background and its result is discarded.
+        
+        Returns:
+            tuple: (semantic_batches, bm25_batches, {degraded_leg: reason})
+        """
+        executor = _get_search_executor()
+        started = time.monotonic()
+        futures = {
+            'semantic': executor.submit(self._semantic_search_many, semantic_queries, k),
+            'bm25': executor.submit(self._bm25_search_many, keyword_queries, k),
+        }
+        
+        batches = {}
+        degraded = {}
+        for (leg, future), timeout in zip(futures.items(), timeouts):
+            remaining = None if timeout is None else max(0.0, started + timeout - time.monotonic())
+            try:
+                batches[leg] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                future.cancel()
+                print(f"⚠️  {SEARCH_LEGS[leg]} search missed its {timeout:.1f}s deadline")
+                batches[leg] = [EMPTY_LEG for _ in semantic_queries]
+                degraded[leg] = 'timeout'
+            except Exception as e:
+                print(f"⚠️  {SEARCH_LEGS[leg]} search failed: {e}")
+                batches[leg] = [EMPTY_LEG for _ in semantic_queries]
+                degraded[leg] = 'error'
+        
+        return batches['semantic'], batches['bm25'], degraded
+    
+    async def _arun_search_legs(self, semantic_queries, keyword_queries, k: int, timeouts=(None, None)):
+        """
+        Event-loop counterpart of _run_search_legs: both legs run on the
+        search pool and are awaited together, each under its own deadline.
+        A leg that times out is abandoned (its thread finishes in the
+        background) and reported as degraded, like one that raises.
+        
+        Returns:
+            tuple: (semantic_batches, bm25_batches, {degraded_leg: reason})
+        """
+        loop = asyncio.get_running_loop()
+        executor = _get_search_executor()
+        futures = {
+            'semantic': loop.run_in_executor(executor, self._semantic_search_many, semantic_queries, k),
+            'bm25': loop.run_in_executor(executor, self._bm25_search_many, keyword_queries, k),
+        }
+        outcomes = await asyncio.gather(
+            *(asyncio.wait_for(future, timeout) for future, timeout in zip(futures.values(), timeouts)),
+            return_exceptions=True
+        )
+        
+        batches = {}
+        degraded = {}
+        for leg, timeout, outcome in zip(futures, timeouts, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                print(f"⚠️  {SEARCH_LEGS[leg]} search missed its {timeout:.1f}s deadline")
+                degraded[leg] = 'timeout'
+            elif isinstance(outcome, Exception):
+                print(f"⚠️  {SEARCH_LEGS[leg]} search failed: {outcome}")
+                degraded[leg] = 'error'
+            else:
+                batches[leg] = outcome
+                continue
+            batches[leg] = [EMPTY_LEG for _ in semantic_queries]
+        
+        return batches['semantic'], batches['bm25'], degraded
+    
+    def _fallback_alpha(self, alpha: float, degraded) -> float:
+        """When one leg is missing, rank purely by the leg that finished"""
+        if 'semantic' in degraded:
+            return 0.0
+        if 'bm25' in degraded:
+            return 1.0
+        return alpha
+    
+    def _cache_key(self, query: str, k: int, alpha: float, fusion: str):
+        """
+        Result cache key: normalized query, k, alpha, fusion strategy and the
+        index build this instance serves. A new build is served by a new
+        instance (hot reload) with its own, empty cache.
+        
+        Lowercasing is safe: BM25 tokens are lowercased and the embedding
+        model (all-MiniLM-L6-v2) is uncased.
+        """
+        normalized = " ".join(query.lower().split())
+        return (normalized, k, float(alpha), fusion, self.index_version)
+    
+    def cache_stats(self) -> dict:
+        """Hit/miss/eviction counters of the retrieval result cache"""
+        return self._result_cache.stats()
+    
+    def _format_results(self, fused_results, degraded=None):
+        """Turn fused (document, metadata) pairs into a RetrievalResult"""
         contexts = [doc for doc, _ in fused_results]
         sources = list(set([meta['source'] for _, meta in fused_results]))
+        # Files holding near-duplicates of the chunks (see rag/dedup.py)
+        for _, meta in fused_results:
+            sources.extend(source for source in meta.get('also_in', ()) if source not in sources)
         
-        return "\n\n".join(contexts), sources
+        return RetrievalResult("\n\n".join(contexts), sources, degraded)
     
-    def _semantic_search(self, query: str, k: int):
-        """Perform semantic search using ChromaDB"""
-        try:
-            query_embedding = embed_texts([query])[0]
-            
-            results = self.chroma_collection.query(
-                query_embeddings=[query_embedding],
-                n_results=k
-            )
-            
-            # Return list of (document, metadata, score, rank) tuples
-            # ChromaDB returns distances, convert to similarity scores
-            semantic_results = []
-            for i, (doc, meta, distance) in enumerate(zip(
-                results["documents"][0],
-                results["metadatas"][0],
-                results["distances"][0]
-            )):
+    def _semantic_search_many(self, queries, k: int):
+        """
+        Semantic search for a batch of queries: one embedding call and
+        one search (ChromaDB query or exact matrix product) for the whole batch
+        
+        Returns:
+            One (chunk_ids, scores) array pair per query, best first.
+            Chunk ids are BM25 index ordinals, so both legs speak the same ids.
+        """
+        query_embeddings = embed_texts(queries)
+        
+        if self.dense_index is not None:
+            # Rows are already BM25 ordinals. Cosine similarity is mapped to
+            # the same 1 / (1 + cosine distance) scale Chroma results use, so
+            # score-based fusion behaves the same on either backend.
+            return [
+                (ids, (1 / (2 - similarities)).astype(np.float32))
+                for ids, similarities in self.dense_index.search_many(query_embeddings, k)
+            ]
+        
+        # Only ids and distances - texts come from the keyword index later,
+        # and only for the chunks that survive fusion
+        results = self.chroma_collection.query(
+            query_embeddings=list(query_embeddings),
+            n_results=k,
+            include=["distances"]
+        )
+        
+        batches = []
+        for chroma_ids, distances in zip(results["ids"], results["distances"]):
+            ordinals = []
+            similarities = []
+            for chroma_id, distance in zip(chroma_ids, distances):
+                ordinal = self.bm25.ordinal(chroma_id)
+                if ordinal is None:
+                    continue  # vector store has a chunk the keyword index doesn't (rebuild pending)
+                ordinals.append(ordinal)
                 # Convert distance to similarity (lower distance = higher similarity)
-                similarity = 1 / (1 + distance)
-                semantic_results.append((doc, meta, similarity, i))
-            
-            return semantic_results
-            
-        except Exception as e:
-            print(f"⚠️  Semantic search failed: {e}")
-            return []
+                similarities.append(1 / (1 + distance))
+            batches.append((
+                np.array(ordinals, dtype=np.int64),
+                np.array(similarities, dtype=np.float32)
+            ))
+        
+        return batches
     
-    def _bm25_search(self, query: str, k: int):
-        """Perform BM25 keyword search"""
-        try:
-            # Tokenize query (simple whitespace split)
-            tokenized_query = query.lower().split()
-            
-            # Get BM25 scores for all documents
-            scores = self.bm25.get_scores(tokenized_query)
-            
-            # Get top-k indices
-            top_indices = np.argsort(scores)[::-1][:k]
-            
-            # Return list of (document, metadata, score, rank) tuples
-            bm25_results = []
-            for rank, idx in enumerate(top_indices):
-                if scores[idx] > 0:  # Only include non-zero scores
-                    bm25_results.append((
-                        self.documents[idx],
-                        self.metadatas[idx],
-                        scores[idx],
-                        rank
-                    ))
-            
-            return bm25_results
-            
-        except Exception as e:
-            print(f"⚠️  BM25 search failed: {e}")
-            return []
+    def _bm25_search_many(self, queries, k: int):
+        """
+        BM25 keyword search for a batch of queries, scored together
+        in one pass over the inverted index
+        
+        Returns:
+            One (chunk_ids, scores) array pair per query, best first
+        """
+        # Tokenize queries (simple whitespace split)
+        tokenized_queries = [tokenize(query) for query in queries]
+        
+        # Top-k straight from the inverted index (only non-zero scores,
+        # already sorted) - no full-corpus scoring
+        if len(tokenized_queries) == 1:
+            return [self.bm25.top_k(tokenized_queries[0], k)]
+        return self.bm25.top_k_many(tokenized_queries, k)
     
-    def _reciprocal_rank_fusion(self, semantic_results, bm25_results, alpha=0.5, k=4):
+    def _fuse(self, semantic_results, bm25_results, alpha=0.5, k=4, strategy='rrf'):
         """
-        Combine results using Reciprocal Rank Fusion (RRF)
+        Fuse the two legs' (chunk_ids, scores) lists with the chosen strategy
+        (see rag/fusion.py) and fetch texts and metadata for the top-k only
         
-        RRF formula: score = sum(1 / (rank + k)) for each result list
-        k=60 is a common constant in RRF
+        Returns:
+            list of (document, metadata) tuples, best first
         """
-        rrf_constant = 60
-        doc_scores = {}
-        
-        # Score semantic results
-        for doc, meta, similarity, rank in semantic_results:
-            doc_id = doc[:100]  # Use first 100 chars as ID
-            rrf_score = alpha * (1 / (rank + rrf_constant))
-            
-            if doc_id not in doc_scores:
-                doc_scores[doc_id] = {
-                    'doc': doc,
-                    'meta': meta,
-                    'score': 0
-                }
-            doc_scores[doc_id]['score'] += rrf_score
-        
-        # Score BM25 results
-        for doc, meta, score, rank in bm25_results:
-            doc_id = doc[:100]
-            rrf_score = (1 - alpha) * (1 / (rank + rrf_constant))
-            
-            if doc_id not in doc_scores:
-                doc_scores[doc_id] = {
-                    'doc': doc,
-                    'meta': meta,
-                    'score': 0
-                }
-            doc_scores[doc_id]['score'] += rrf_score
-        
-        # Sort by combined score and return top-k
-        ranked_docs = sorted(
-            doc_scores.values(),
-            key=lambda x: x['score'],
-            reverse=True
-        )[:k]
-        
-        return [(d['doc'], d['meta']) for d in ranked_docs]
-
-
-# Singleton instance
+        fused_ids, _ = fuse(
+            [semantic_results, bm25_results],
+            [alpha, 1 - alpha],
+            k=k,
+            strategy=strategy
+        )
+        
+        return [(self.documents[i], self.metadatas[i]) for i in fused_ids]
+
+
+def _stop_chroma_client(client):
+    """
+    PersistentClient shares one System (SQLite connection, HNSW segments)
+    per path through a process-wide cache, so dropping the client frees
+    nothing. Stop the System and evict it from that cache.
+    """
+    try:
+        client._system.stop()
+        SharedSystemClient._identifier_to_system.pop(client._identifier, None)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not close ChromaDB client: {e}")
+
+
+# Singleton instance; replaced when a new index snapshot is published
 _hybrid_retriever = None
+_retriever_lock = threading.Lock()
+_last_reload_check = 0.0
+_last_seen_version = None
+_reload_running = False
 
 def get_hybrid_retriever():
-    """Get or create hybrid retriever instance"""
-    global _hybrid_retriever
+    """
+    Get or create hybrid retriever instance
+    
+    At most every INDEX_RELOAD_INTERVAL seconds this also checks whether a
+    newer index snapshot was published. If so, the new snapshot is loaded in
+    a background thread and swapped in once it is ready; until then callers
+    keep getting the current instance. Use retrieve_context & co. rather
+    than holding on to the returned instance: a replaced instance is closed
+    as soon as the requests using it have finished.
+    """
+    global _hybrid_retriever, _last_seen_version
     if _hybrid_retriever is None:
-        _hybrid_retriever = HybridRetriever()
+        with _retriever_lock:
+            if _hybrid_retriever is None:
+                _hybrid_retriever = HybridRetriever()
+                _last_seen_version = _hybrid_retriever.index_version
+    else:
+        _check_for_new_index()
     return _hybrid_retriever
 
 
-def retrieve_context(query: str, k: int = 4, alpha: float = 0.5):
+def _check_for_new_index():
+    """Start a background reload if the published index changed (throttled)"""
+    global _last_reload_check, _reload_running
+    if not INDEX_RELOAD_INTERVAL or INDEX_RELOAD_INTERVAL <= 0:
+        return
+    now = time.monotonic()
+    if now - _last_reload_check < INDEX_RELOAD_INTERVAL:
+        return
+    _last_reload_check = now
+    
+    # One stat() of data/indexes/CURRENT
+    version = current_index_version()
+    with _retriever_lock:
+        # _last_seen_version only moves once a reload succeeded, so a failed
+        # one is retried at the next check
+        if version == _last_seen_version or _reload_running:
+            return
+        _reload_running = True
+    
+    threading.Thread(target=_reload_retriever, name="retriever-reload", daemon=True).start()
+
+
+def _reload_retriever():
+    """Load the newly published snapshot and swap it in between requests"""
+    global _hybrid_retriever, _last_seen_version, _reload_running
+    try:
+        fresh = HybridRetriever()
+    except Exception as e:
+        print(f"⚠️  Warning: Could not load new index snapshot, keeping the current one: {e}")
+        fresh = None
+    
+    if fresh is not None and not fresh._indexes_ready():
+        print("⚠️  Warning: New index snapshot is incomplete, keeping the current one")
+        fresh.close()
+        fresh = None
+    
+    with _retriever_lock:
+        _reload_running = False
+        if fresh is None:
+            return
+        previous, _hybrid_retriever = _hybrid_retriever, fresh
+        _last_seen_version = fresh.index_version
+    print(f"[DEBUG] Retriever reloaded from {fresh.index_paths.root}")
+    
+    # In-flight requests finish on the old indexes; then they are released
+    previous.retire()
+
+
+@contextmanager
+def _pinned_retriever():
+    """
+    The current retriever, kept open for the duration of the block even if
+    a reload swaps it out in the meantime.
+    """
+    get_hybrid_retriever()
+    with _retriever_lock:
+        retriever = _hybrid_retriever
+        retriever._pin()
+    try:
+        yield retriever
+    finally:
+        retriever._unpin()
+
+
+def retrieve_context(query: str, k: int = 4, alpha: float = 0.5, fusion: str | None = None):
     """
     Main retrieval function using hybrid search
     
@@ -349,9 +813,42 @@ def retrieve_context(query: str, k: int = 4, alpha: float = 0.5):
         query: User's query string
         k: Number of results to retrieve
         alpha: Semantic vs BM25 weight (0.5 = balanced, 0.7 = more semantic)
+        fusion: Fusion strategy ('rrf', 'normalized', 'convex'), default from config
+    
+    Returns:
+        tuple: (combined_context_string, list_of_sources)
+    """
+    with _pinned_retriever() as retriever:
+        return retriever.retrieve(query, k=k, alpha=alpha, fusion=fusion)
+
+
+async def aretrieve_context(query: str, k: int = 4, alpha: float = 0.5, fusion: str | None = None):
+    """
+    Async retrieve_context for ASGI views (AgentCore.arun_stream awaits
+    it); never blocks the event loop
     
     Returns:
         tuple: (combined_context_string, list_of_sources)
     """
-    retriever = get_hybrid_retriever()
-    return retriever.retrieve(query, k=k, alpha=alpha)
\ No newline at end of file
+    if _hybrid_retriever is None:
+        # First call loads the indexes; keep that off the event loop too
+        await asyncio.get_running_loop().run_in_executor(None, get_hybrid_retriever)
+    with _pinned_retriever() as retriever:
+        return await retriever.aretrieve(query, k=k, alpha=alpha, fusion=fusion)
+
+
+def retrieve_context_many(queries, k: int = 4, alpha: float = 0.5, fusion: str | None = None):
+    """
+    Batched version of retrieve_context for evaluation sets and bulk prompts
+    
+    Args:
+        queries: List of query strings
+        k: Number of results to retrieve per query
+        alpha: Semantic vs BM25 weight (0.5 = balanced, 0.7 = more semantic)
+        fusion: Fusion strategy ('rrf', 'normalized', 'convex'), default from config
+    
+    Returns:
+        list of (combined_context_string, list_of_sources) tuples
+    """
+    with _pinned_retriever() as retriever:
+        return retriever.retrieve_many(queries, k=k, alpha=alpha, fusion=fusion)
@@ -1,57 +1,456 @@
-from rag.loader import load_documents
-from rag.splitter import split_documents
-from rag.vector_store import build_vector_store
+from rag.loader import document_files, iter_documents, source_name, LoadStats
+from rag.splitter import iter_chunks
+from rag.vector_store import build_vector_store, delete_chunks
+from rag.bm25_index import BM25Index, PostingsBuilder, StringTableWriter, tokenize
+from rag.dense_index import BLOCK_ROWS, DenseIndex, QuantizedIndex, quantized_paths
+from rag.manifest import IndexPlan, load_manifest, index_fingerprint
+from rag.embeddings import embedding_model_id
+from rag.dedup import NearDuplicateFilter, alias_sources, load_aliases, save_aliases
+from rag.pipeline import prefetch
+from rag.build_report import BuildProfiler, path_size, save_report
+from rag.snapshot import current_snapshot, new_snapshot, publish_snapshot, discard_snapshot, prune_snapshots
+from config import (
+    INGEST_BATCH_SIZE,
+    INGEST_QUEUE_SIZE,
+    INDEX_SNAPSHOTS_KEPT,
+    EXACT_VECTOR_DTYPE,
+    EXACT_VECTOR_QUANTIZATION,
+    PQ_SUBSPACES,
+    DEDUP_THRESHOLD,
+    EMBED_WORKERS,
+    LOADER_WORKERS,
+)
+from datetime import datetime
 from pathlib import Path
+import json
+import shutil
+import numpy as np
 
 
-def setup_rag():
+class _ChunkCollector:
     """
-    Initialize the RAG system by:
-    1. Loading Django documentation files
-    2. Splitting into chunks
-    3. Building vector store with embeddings
+    Keeps what the keyword index and the embedding matrix need from the
+    chunk stream, so they are built from the same pass that fills ChromaDB
+    instead of reading every document back out of it.
+    
+    Nothing per chunk is kept in Python objects: texts, metadata and ids
+    are appended to blob files and embedding rows to a raw float32 file in
+    a spill directory inside the snapshot, and each batch's tokens are
+    reduced to compact postings arrays (see PostingsBuilder) as it arrives.
+    """
+    
+    def __init__(self, spill_dir, previous=None):
+        # (BM25Index, embedding matrix) of the snapshot being updated
+        self.previous = previous
+        self.spill_dir = Path(spill_dir)
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.postings = PostingsBuilder()
+        self.ids = StringTableWriter(self.spill_dir / "ids.bin")
+        self.documents = StringTableWriter(self.spill_dir / "documents.bin")
+        self.metadatas = StringTableWriter(self.spill_dir / "metadatas.bin")
+        self.embeddings_path = self.spill_dir / "embeddings.f32"
+        self._embeddings = open(self.embeddings_path, "wb")
+        self.dim = None
+        self.keep = []
+    
+    def add(self, chunks, embeddings):
+        for chunk in chunks:
+            self.ids.append(chunk["id"])
+            self.documents.append(chunk["text"])
+            self.metadatas.append(json.dumps(chunk["metadata"], ensure_ascii=False))
+        self.postings.add(tokenize(chunk["text"]) for chunk in chunks)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(embeddings):
+            self.dim = embeddings.shape[1]
+            self._embeddings.write(embeddings.tobytes())
+    
+    def build(self, stale_ids, also_in=None, profiler=None):
+        """
+        Args:
+            stale_ids: Chunk ids deleted from the vector store
+            also_in: {chunk id: sources of its near-duplicates}, stored in
+                     the BM25 metadata as 'also_in'
+            profiler: Optional BuildProfiler (bm25 stage)
+        
+        Returns:
+            BM25Index with one doc per chunk now in the vector store; its
+            payload is memory-mapped from the spill directory. Write the
+            matching embedding matrix with save_matrix().
+        """
+        profiler = profiler or BuildProfiler()
+        ids = self.ids.table()
+        documents = self.documents.table()
+        metadatas = self.metadatas.table(decode=json.loads)
+        
+        if self.previous is None:
+            with profiler.stage("bm25", items=len(ids)):
+                bm25 = BM25Index.build(self.postings)
+        else:
+            # Kept chunks reuse their postings and embedding rows
+            old_bm25, _ = self.previous
+            gone = set(stale_ids).union(ids)
+            self.keep = [i for i, doc_id in enumerate(old_bm25.doc_ids) if doc_id not in gone]
+            with profiler.stage("bm25", items=len(ids)):
+                bm25 = old_bm25.patched(self.keep, self.postings)
+                ids = self._merged("ids", old_bm25.doc_ids, ids)
+                documents = self._merged("documents", old_bm25.documents, documents)
+                metadatas = self._merged("metadatas", old_bm25.metadatas, metadatas)
+        
+        if also_in is not None:
+            with profiler.stage("bm25"):
+                writer = StringTableWriter(self.spill_dir / "metadatas.final.bin")
+                for meta, doc_id in zip(metadatas, ids):
+                    writer.append(json.dumps(_with_also_in(meta, also_in.get(doc_id)), ensure_ascii=False))
+                metadatas = writer.table(decode=json.loads)
+        
+        bm25.documents, bm25.metadatas, bm25.doc_ids = documents, metadatas, ids
+        return bm25
+    
+    def _merged(self, name, old_table, new_table):
+        """Kept entries of the previous index followed by the new ones, as one mapped table"""
+        writer = StringTableWriter(self.spill_dir / f"{name}.merged.bin")
+        writer.extend_from(old_table, self.keep)
+        writer.extend_from(new_table)
+        return writer.table(decode=new_table.decode)
+    
+    def save_matrix(self, path, dtype: str = "float32") -> int:
+        """
+        Write the embedding matrix (row i = BM25 doc i) block by block:
+        kept rows of the previous matrix, then the spilled new rows.
+        
+        Returns:
+            Size of the written file in bytes
+        """
+        self._embeddings.close()
+        old_matrix = self.previous[1] if self.previous is not None else None
+        dim = self.dim or (old_matrix.shape[1] if old_matrix is not None else 0)
+        rows = len(self.ids)
+        if rows:
+            new_rows = np.memmap(self.embeddings_path, dtype=np.float32, mode="r", shape=(rows, dim))
+        else:
+            new_rows = np.empty((0, dim), dtype=np.float32)
+        keep = np.asarray(self.keep, dtype=np.int64)
+        
+        def blocks():
+            for start in range(0, len(keep), BLOCK_ROWS):
+                yield np.asarray(old_matrix[keep[start:start + BLOCK_ROWS]], dtype=np.float32)
+            for start in range(0, rows, BLOCK_ROWS):
+                yield new_rows[start:start + BLOCK_ROWS]
+        
+        return DenseIndex.save_blocks(path, blocks(), (len(keep) + rows, dim), dtype=dtype)
+    
+    def discard(self):
+        """Remove the spill directory (it is never part of a published snapshot)"""
+        if not self._embeddings.closed:
+            self._embeddings.close()
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+def _with_also_in(meta, sources):
+    meta = {key: value for key, value in meta.items() if key != "also_in"}
+    if sources:
+        meta["also_in"] = sources
+    return meta
+
+
+def _seed_unchanged(dedup, bm25):
+    """on_unchanged callback: chunks of unchanged files become dedup targets"""
+    def seed(source, entry):
+        for chunk_id in entry["chunks"]:
+            i = bm25.ordinal(chunk_id)
+            # Chunks that were themselves near-duplicates are not in the index
+            if i is not None:
+                dedup.seed(chunk_id, bm25.documents[i])
+    return seed
+
+
+def _carry_over_aliases(previous_aliases, plan, stale_ids):
+    """
+    Alias map of the new build, minus the near-duplicates found in this one.
+    
+    Returns:
+        tuple: (aliases still valid, sources of unchanged files whose
+        near-duplicate chunks lost their indexed copy)
+    """
+    stale = set(stale_ids)
+    aliases, orphaned = {}, set()
+    for canonical, entries in previous_aliases.items():
+        # Aliases in changed files were deduplicated again in this build
+        entries = [alias for alias in entries if plan.is_unchanged(alias["source"])]
+        if canonical in stale:
+            orphaned.update(alias["source"] for alias in entries)
+        elif entries:
+            aliases[canonical] = entries
+    return aliases, orphaned
+
+
+def _load_previous(snapshot):
+    """
+    Keyword index and embedding matrix of a snapshot, or None if unusable.
+    
+    Chunk ids don't depend on the embedding model, so rows of a snapshot
+    built with another model (or other chunking) would all count as kept;
+    such snapshots are never patched, only rebuilt.
+    """
+    if load_manifest(snapshot.manifest).get("fingerprint") != index_fingerprint():
+        return None
+    try:
+        bm25 = BM25Index.load(snapshot.bm25)
+        matrix = DenseIndex.load(snapshot.embeddings).matrix
+    except Exception:
+        return None
+    if len(matrix) != bm25.corpus_size or not snapshot.chroma.is_dir():
+        return None
+    return bm25, matrix
+
+
+def _publish(snapshot, profiler) -> bool:
+    """
+    Step 5 of setup_rag. A snapshot that fails to publish is discarded; once
+    it is published, failing to prune older ones only warns.
+    """
+    try:
+        with profiler.stage("publish"):
+            publish_snapshot(snapshot)
+        print(f"   ✅ Now serving {snapshot.root.name}")
+        
+    except Exception as e:
+        print(f"   ❌ ERROR publishing snapshot: {e}")
+        discard_snapshot(snapshot)
+        return False
+    
+    try:
+        removed = prune_snapshots(keep=INDEX_SNAPSHOTS_KEPT)
+        if removed:
+            print(f"   🧹 Removed {len(removed)} old snapshot(s)")
+    except Exception as e:
+        print(f"⚠️  Warning: Could not remove old snapshots: {e}")
+    return True
+
+
+def setup_rag(full_rebuild: bool = False):
     """
+    Build every index in one pass and publish them together:
+    1. Finding Django documentation files
+    2. Starting a new snapshot directory from the current one
+    3. Streaming load → split → embed → store; the same chunk stream fills
+       ChromaDB and feeds the BM25 index and the embedding matrix. Files and
+       chunks unchanged since the last build are skipped; near-duplicate
+       chunks are indexed once (see rag/dedup.py).
+    4. Deleting stale chunks and writing the keyword index and matrix
+    5. Atomically pointing data/indexes/CURRENT at the new snapshot
+    
+    Each streaming stage runs in its own thread with a bounded queue in
+    between. Chunk texts and embedding rows are spilled to the snapshot
+    directory rather than kept in memory, so what grows with the corpus is
+    the BM25 postings (a few bytes per distinct term per chunk), per-chunk
+    offsets and the build manifest. Readers never see a half-built snapshot
+    or a vector / keyword index pair that don't match.
+    
+    Every build, failed ones included, writes a JSON report with per-stage
+    timings, throughput, peak memory and index sizes to
+    data/build_reports/ (see rag/build_report.py).
+    
+    Args:
+        full_rebuild: Ignore the previous snapshot and re-embed everything
+    """
+    profiler = BuildProfiler()
+    build = {"full_rebuild": full_rebuild}
+    success = _build_indexes(full_rebuild, profiler, build)
+    
+    try:
+        report_path = _save_build_report(profiler, build, success)
+        print(f"📈 Build report: {report_path}\n")
+    except Exception as e:
+        print(f"⚠️  Warning: Could not write build report: {e}")
+    
+    return success
+
+
+def _build_indexes(full_rebuild, profiler, build):
+    """setup_rag's build steps; fills `build` with what the report needs"""
     print("\n" + "="*60)
     print("🚀 INITIALIZING RAG SYSTEM")
     print("="*60 + "\n")
 
-    # Step 1: Load documents
-    print("📂 Step 1: Loading Django documentation files...")
+    # Step 1: Find documents
+    print("📂 Step 1: Finding Django documentation files...")
     try:
-        documents = load_documents()
-        print(f"   ✅ Loaded {len(documents)} documents")
-        
-        if len(documents) == 0:
-            print("   ❌ ERROR: No documents found!")
-            print("   Check that .txt files exist in data/django_docs/")
-            return False
+        doc_files = document_files()
+        build["files"] = len(doc_files)
+        print(f"   ✅ Found {len(doc_files)} documentation files")
             
     except Exception as e:
         print(f"   ❌ ERROR loading documents: {e}")
+        print("   Check that .txt, .rst or .md files exist in data/django_docs/")
         return False
 
-    # Step 2: Split documents
-    print("\n✂️  Step 2: Splitting documents into chunks...")
+    # Step 2: New snapshot, seeded with the current one for incremental builds
+    print("\n🗂️  Step 2: Preparing index snapshot...")
+    snapshot = None
     try:
-        chunks = split_documents(documents)
-        print(f"   ✅ Created {len(chunks)} chunks")
+        previous = None if full_rebuild else current_snapshot()
+        snapshot = new_snapshot()
+        build["snapshot"] = snapshot
+        print(f"   Snapshot: {snapshot.root}")
+        
+        plan = IndexPlan(load_manifest(previous.manifest) if previous else {"fingerprint": None, "files": {}})
+        reused = None
+        previous_aliases = {}
+        if not plan.full_rebuild:
+            reused = _load_previous(previous)
+            if reused is None:
+                plan = IndexPlan({}, full_rebuild=True)
+            else:
+                shutil.copytree(previous.chroma, snapshot.chroma)
+                previous_aliases = load_aliases(previous.aliases)
+                print(f"   ♻️  Updating snapshot {previous.root.name}")
+        if plan.full_rebuild:
+            print("   No matching previous snapshot, rebuilding everything")
+        build["full_rebuild"] = plan.full_rebuild
         
-        if len(chunks) == 0:
-            print("   ❌ ERROR: No chunks created!")
-            return False
-            
     except Exception as e:
-        print(f"   ❌ ERROR splitting documents: {e}")
+        print(f"   ❌ ERROR preparing snapshot: {e}")
+        if snapshot is not None:
+            discard_snapshot(snapshot)
         return False
 
-    # Step 3: Build vector store
+    # Step 3: Load → split → embed → store, as one streaming pass
     print("\n🔮 Step 3: Building vector store (this may take a few minutes)...")
+    collector = _ChunkCollector(snapshot.root / "spill", reused)
+    dedup = None
+    on_unchanged = None
+    if DEDUP_THRESHOLD:
+        # Chunks already stored in the snapshot stay indexed
+        dedup = NearDuplicateFilter(protected=reused[0].doc_ids if reused else ())
+        if reused:
+            on_unchanged = _seed_unchanged(dedup, reused[0])
+    
+    def stream(documents, full_rebuild=False):
+        # Chunks get content-derived ids; near-duplicates are dropped
+        # before they reach the embedding model
+        chunks = profiler.iterate(
+            "split",
+            lambda docs: plan.record_chunks(iter_chunks(docs)),
+            documents,
+            count=lambda _: 1
+        )
+        if dedup is not None:
+            chunks = profiler.iterate("dedup", dedup.filter, chunks, count=lambda _: 1)
+        return build_vector_store(
+            prefetch(chunks, maxsize=INGEST_QUEUE_SIZE * INGEST_BATCH_SIZE, name="ingest-split"),
+            snapshot.chroma,
+            full_rebuild=full_rebuild,
+            on_batch=collector.add,
+            profiler=profiler
+        )
+    
+    load_stats = LoadStats()
     try:
-        doc_count = build_vector_store(chunks)
-        print(f"   ✅ Vector store created successfully!")
+        # Only new or changed files are split
+        documents = prefetch(
+            profiler.iterate(
+                "load",
+                lambda docs: plan.changed_documents(docs, on_unchanged=on_unchanged),
+                iter_documents(doc_files, stats=load_stats),
+                count=lambda _: 0
+            ),
+            maxsize=INGEST_QUEUE_SIZE,
+            name="ingest-load"
+        )
+        chunk_count, doc_count = stream(documents, full_rebuild=plan.full_rebuild)
+        
+        # A read or decode error is not a deletion: keep those files' chunks
+        carried = plan.keep_previous(load_stats.failed_sources)
+        if carried:
+            print(f"   ⚠️  Kept the previous chunks of {carried} files that failed to load")
+        elif load_stats.failed and plan.full_rebuild:
+            print(f"   ⚠️  {load_stats.failed} files failed to load and are missing from this build")
+        
+        # Near-duplicates whose indexed copy was in a changed file have to
+        # be split again: one of them now gets indexed in its place
+        aliases, orphaned = _carry_over_aliases(previous_aliases, plan, plan.stale_ids())
+        if orphaned:
+            print(f"   Re-splitting {len(orphaned)} unchanged files with orphaned near-duplicates")
+            orphaned_files = [path for path in doc_files if source_name(path) in orphaned]
+            stored, doc_count = stream(plan.reprocess(iter_documents(orphaned_files)))
+            chunk_count += stored
+            aliases, _ = _carry_over_aliases(previous_aliases, plan, plan.stale_ids())
+        
+        # Reads and parsing happen on the loader threads
+        profiler.add("load", load_stats.busy_seconds(), load_stats.cpu_seconds, len(load_stats.files))
+        print(f"   📂 Loaded {load_stats.summary()}")
+        print(f"   {plan.unchanged} files unchanged, "
+              f"{plan.changed} new or changed, {len(plan.removed)} removed")
+        if dedup is not None:
+            for canonical, entries in dedup.aliases.items():
+                aliases.setdefault(canonical, []).extend(entries)
+            print(f"   ✂️  Dedup: {dedup.report()}")
+        
+        build["counts"] = {
+            "files_loaded": len(load_stats.files),
+            "files_changed": plan.changed,
+            "files_unchanged": plan.unchanged,
+            "files_removed": len(plan.removed),
+            "bytes_loaded": sum(size for _, size, _ in load_stats.files),
+            "chunks_embedded": chunk_count,
+            "near_duplicates_dropped": dedup.chunks_dropped if dedup is not None else 0,
+        }
         
     except Exception as e:
         print(f"   ❌ ERROR building vector store: {e}")
+        discard_snapshot(snapshot)
+        return False
+
+    # Step 4: Drop chunks of changed / removed files, write the other indexes
+    print("\n🔨 Step 4: Building keyword index and embedding matrix...")
+    try:
+        stale_ids = plan.stale_ids()
+        if stale_ids:
+            with profiler.stage("store"):
+                doc_count = delete_chunks(snapshot.chroma, stale_ids)
+        print(f"   ✅ Deleted {len(stale_ids)} stale chunks")
+        
+        if doc_count == 0:
+            print("   ❌ ERROR: No chunks created!")
+            discard_snapshot(snapshot)
+            return False
+        
+        bm25 = collector.build(stale_ids, also_in=alias_sources(aliases), profiler=profiler)
+        with profiler.stage("bm25"):
+            bm25_size = bm25.save(snapshot.bm25)
+        build["chunks_in_index"] = bm25.corpus_size
+        build["vocab_size"] = bm25.vocab_size
+        print(f"   ✅ BM25 index: {bm25.corpus_size} chunks, {bm25.vocab_size} terms "
+              f"({bm25_size / 1024:.2f} KB)")
+        
+        # Row i = BM25 doc i, for the exact vector backend
+        with profiler.stage("matrix", items=bm25.corpus_size):
+            matrix_size = collector.save_matrix(snapshot.embeddings, dtype=EXACT_VECTOR_DTYPE)
+        # Release the mapped spill files, then remove them
+        bm25 = None
+        collector.discard()
+        print(f"   ✅ Embedding matrix: {matrix_size / 1024:.2f} KB ({EXACT_VECTOR_DTYPE})")
+        
+        if EXACT_VECTOR_QUANTIZATION:
+            options = {"subspaces": PQ_SUBSPACES} if EXACT_VECTOR_QUANTIZATION == "pq" else {}
+            with profiler.stage("matrix"):
+                codes_size = QuantizedIndex.save(snapshot.embeddings, EXACT_VECTOR_QUANTIZATION, **options)
+            print(f"   ✅ {EXACT_VECTOR_QUANTIZATION} codes: {codes_size / 1024:.2f} KB")
+        
+        with profiler.stage("publish"):
+            plan.save(snapshot.manifest)
+            save_aliases(snapshot.aliases, aliases)
+        build["near_duplicates"] = sum(len(entries) for entries in aliases.values())
+        
+    except Exception as e:
+        print(f"   ❌ ERROR building indexes: {e}")
+        discard_snapshot(snapshot)
+        return False
+
+    # Step 5: Publish - one atomic rename switches readers to the new snapshot
+    print("\n🚚 Step 5: Publishing snapshot...")
+    if not _publish(snapshot, profiler):
         return False
 
     # Verification
@@ -59,16 +458,59 @@ def setup_rag():
     print("✅ RAG SETUP COMPLETE")
     print("="*60)
     print(f"\n📊 Summary:")
-    print(f"   • Documents loaded: {len(documents)}")
-    print(f"   • Chunks created: {len(chunks)}")
+    print(f"   • Documents loaded: {plan.changed + plan.unchanged}")
+    print(f"   • Chunks embedded: {chunk_count}")
     print(f"   • Documents in DB: {doc_count}")
-    print(f"   • Vector DB location: data/vector_db/")
+    print(f"   • Near-duplicate chunks folded: {build['near_duplicates']}")
+    print(f"   • Index snapshot: {snapshot.root}")
     print("\n💡 You can now use the agent to query Django documentation!")
     print("   Run: python verify_vector_db.py to verify\n")
     
     return True
 
 
+def _save_build_report(profiler, build, success):
+    """Write the JSON build report; returns its path"""
+    snapshot = build.get("snapshot")
+    index = {}
+    if success:
+        sizes = {
+            "chroma": path_size(snapshot.chroma),
+            "bm25": path_size(snapshot.bm25),
+            "embeddings": path_size(snapshot.embeddings),
+            "manifest": path_size(snapshot.manifest),
+            "aliases": path_size(snapshot.aliases),
+        }
+        if EXACT_VECTOR_QUANTIZATION:
+            sizes["quantized"] = sum(map(path_size, quantized_paths(snapshot.embeddings, EXACT_VECTOR_QUANTIZATION)))
+        sizes["total"] = path_size(snapshot.root)
+        index = {
+            "sizes_bytes": sizes,
+            "chunks": build.get("chunks_in_index"),
+            "vocab_size": build.get("vocab_size"),
+            "near_duplicates": build.get("near_duplicates"),
+        }
+    
+    name = snapshot.root.name if snapshot is not None else datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    report = profiler.report(
+        success=success,
+        snapshot=name,
+        full_rebuild=build.get("full_rebuild"),
+        counts=build.get("counts", {}),
+        index=index,
+        config={
+            "fingerprint": index_fingerprint(),
+            "embedding_model": embedding_model_id(),
+            "embed_workers": EMBED_WORKERS,
+            "loader_workers": LOADER_WORKERS,
+            "ingest_batch_size": INGEST_BATCH_SIZE,
+            "vector_dtype": EXACT_VECTOR_DTYPE,
+            "quantization": EXACT_VECTOR_QUANTIZATION,
+        },
+    )
+    return save_report(report, name if success else f"{name}-failed")
+
+
 def verify_setup():
     """
     Verify that RAG system is working correctly
@@ -0,0 +1,164 @@
+"""
+Versioned index snapshots
+
+A build writes every index into a fresh directory, data/indexes/<version>/:
+    vector_db/            ChromaDB collection
+    bm25_index.bin        keyword index
+    embeddings.npy        embedding matrix (+ quantized codes)
+    index_manifest.json   file / chunk hashes for the next incremental build
+    chunk_aliases.json    near-duplicate chunks folded into indexed ones
+and only then points data/indexes/CURRENT at it with an atomic rename.
+Readers resolve CURRENT once per load, so they always get a complete,
+matching set of indexes - never a half-written or mixed pair.
+
+A reader holds a shared lock on its snapshot's READERS file for as long
+as it serves from it (hold_snapshot), and prune_snapshots only deletes
+snapshots nobody holds - a long-running process that hasn't reloaded yet
+keeps its snapshot however many builds were published since. The lock
+goes away with the process. Without file locks (Windows) only the
+age-based `keep` protects readers.
+
+Trees without a CURRENT pointer (built before snapshots) are read from the
+old flat layout under data/.
+"""
+
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from rag.index_version import INDEX_VERSION_PATH, bump_index_version, read_index_version
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DATA_PATH = Path(__file__).parent.parent / "data"
+INDEXES_PATH = INDEX_VERSION_PATH.parent
+READERS_LOCK = "READERS"
+
+
+class IndexPaths(NamedTuple):
+    root: Path
+    chroma: Path
+    bm25: Path
+    embeddings: Path
+    manifest: Path
+    aliases: Path
+
+
+def snapshot_paths(root) -> IndexPaths:
+    root = Path(root)
+    return IndexPaths(
+        root=root,
+        chroma=root / "vector_db",
+        bm25=root / "bm25_index.bin",
+        embeddings=root / "embeddings.npy",
+        manifest=root / "index_manifest.json",
+        aliases=root / "chunk_aliases.json",
+    )
+
+
+LEGACY_PATHS = snapshot_paths(DATA_PATH)
+
+
+def current_snapshot():
+    """Paths of the published snapshot, or None if nothing was published"""
+    name = read_index_version()
+    if name is None or not (INDEXES_PATH / name).is_dir():
+        return None
+    return snapshot_paths(INDEXES_PATH / name)
+
+
+def current_index_paths() -> IndexPaths:
+    """Where readers should load indexes from right now"""
+    return current_snapshot() or LEGACY_PATHS
+
+
+def new_snapshot() -> IndexPaths:
+    """Create an empty, unpublished snapshot directory (names sort by age)"""
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:6]}"
+    paths = snapshot_paths(INDEXES_PATH / name)
+    paths.root.mkdir(parents=True)
+    return paths
+
+
+def publish_snapshot(paths: IndexPaths) -> str:
+    """Atomically point CURRENT at a fully built snapshot"""
+    return bump_index_version(paths.root.name)
+
+
+def discard_snapshot(paths: IndexPaths):
+    """Remove an unpublished (failed) build"""
+    shutil.rmtree(paths.root, ignore_errors=True)
+
+
+def hold_snapshot(paths: IndexPaths):
+    """
+    Keep prune_snapshots() away from a snapshot while reading from it.
+
+    Returns:
+        The lock to pass to release_snapshot(), or None if nothing was
+        locked (legacy layout, no file locks on this platform)
+    """
+    if fcntl is None or paths.root == DATA_PATH or not paths.root.is_dir():
+        return None
+    try:
+        lock = open(paths.root / READERS_LOCK, "ab")
+    except OSError:
+        # Read-only data directory
+        return None
+    try:
+        fcntl.flock(lock, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except OSError:
+        # Being pruned right now
+        lock.close()
+        return None
+    return lock
+
+
+def release_snapshot(lock):
+    """Drop a lock taken by hold_snapshot()"""
+    if lock is not None:
+        lock.close()
+
+
+def _remove_unless_held(root: Path) -> bool:
+    """Delete a snapshot unless a reader holds it; True if it was deleted"""
+    if fcntl is None:
+        shutil.rmtree(root, ignore_errors=True)
+        return True
+    try:
+        lock = open(root / READERS_LOCK, "ab")
+    except OSError:
+        return False
+    with lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        # Readers arriving now fail to take their shared lock
+        shutil.rmtree(root, ignore_errors=True)
+    return True
+
+
+def prune_snapshots(keep: int = 2):
+    """
+    Delete all but the `keep` newest snapshots. The published one is never
+    deleted, and neither is an older one a reader still holds (see
+    hold_snapshot); those are retried by the next build.
+
+    Returns:
+        Names of the removed snapshots
+    """
+    if not INDEXES_PATH.exists():
+        return []
+    current = read_index_version()
+    snapshots = sorted((p for p in INDEXES_PATH.iterdir() if p.is_dir()), key=lambda p: p.name)
+    removed = []
+    for path in snapshots[:-keep] if keep > 0 else snapshots:
+        if path.name != current and _remove_unless_held(path):
+            removed.append(path.name)
+    return removed
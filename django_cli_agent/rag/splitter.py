@@ -1,19 +1,251 @@
+"""
+Structure-aware splitter for the Django docs corpus
+
+The .txt files are structured with headings:
+    =========================
+    MIDDLEWARE OVERVIEW          banner
+    =========================
+    SECTION: ...                 section
+    CONCEPT: ... / COMMAND: ...  subsection
+and labelled blocks (PURPOSE:, CODE:, CODE EXAMPLE:, USE WHEN:, ...). The
+loader converts .rst / .md files to the same dialect, closing their code
+blocks with an END CODE line.
+
+A document is cut into blocks - headings, paragraphs, and CODE blocks kept
+whole up to the next label or END CODE - which are packed into chunks of
+at most CHUNK_TOKENS embedding-model tokens. Chunk boundaries fall on section
+headings: a section that doesn't fit in the current chunk starts a new one
+(short sections that fit whole share a chunk), and a block is only cut
+when it alone exceeds the budget. Every chunk carries its heading path
+("BANNER > SECTION > CONCEPT") in metadata['section']; a chunk that does
+not open with its section heading is prefixed with "[path]" so it still
+reads (and embeds) in context.
+"""
+
+import re
+
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-def split_documents(documents):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=100
-    )
+# Part of the index manifest fingerprint: changing these re-chunks everything.
+# all-MiniLM-L6-v2 truncates its input at 256 tokens (incl. [CLS]/[SEP]),
+# anything longer would not be embedded in full.
+CHUNK_TOKENS = 256
+# Only used where a single oversized block (a long code sample) is cut
+CHUNK_OVERLAP_TOKENS = 32
+SPLITTER_VERSION = "structure-2"
+
+_SPECIAL_TOKENS = 2
+_BANNER_RULE = re.compile(r"^={5,}\s*$")
+_SECTION = re.compile(r"^SECTION:\s*(.*)$")
+_SUBSECTION = re.compile(r"^(?:CONCEPT|COMMAND):\s*(.*)$")
+_CODE_LABEL = re.compile(r"^CODE(?: EXAMPLE)?:")
+_CODE_END = re.compile(r"^END CODE\s*$")
+_LABEL = re.compile(r"^[A-Z][A-Z0-9 ()/_-]*:")
+
+
+def model_token_counter():
+    """Token counter using the embedding model's own tokenizer"""
+    from rag.embeddings import get_embedding_model
+    tokenizer = get_embedding_model().tokenizer
+
+    def count_tokens(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return count_tokens
+
+
+def _heading(lines, i):
+    """
+    Returns:
+        (level, title, lines consumed) if a heading starts at lines[i], else None.
+        Levels: 0 banner, 1 SECTION, 2 CONCEPT / COMMAND
+    """
+    line = lines[i]
+    if (_BANNER_RULE.match(line) and i + 2 < len(lines)
+            and lines[i + 1].strip() and _BANNER_RULE.match(lines[i + 2])):
+        return 0, lines[i + 1].strip(), 3
+    match = _SECTION.match(line)
+    if match:
+        return 1, match.group(1).strip(), 1
+    match = _SUBSECTION.match(line)
+    if match:
+        return 2, match.group(1).strip(), 1
+    return None
+
+
+def parse_blocks(text: str):
+    """
+    Cut a document into blocks: a run of heading lines, a CODE block (up to
+    the next label or an END CODE line, which is dropped - code samples
+    contain blank lines of their own), or a paragraph.
+
+    Returns:
+        List of (text, section_path, new_section) tuples; new_section marks
+        heading blocks with a banner or SECTION, where a chunk must start.
+    """
+    lines = text.splitlines()
+    path = ["", "", ""]
+    blocks = []
+    current, kind, block_path, new_section = [], None, "", False
+
+    def flush():
+        nonlocal current, kind, new_section
+        if any(line.strip() for line in current):
+            blocks.append(("\n".join(current).strip("\n"), block_path, new_section))
+        current, kind, new_section = [], None, False
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        heading = _heading(lines, i)
+        if heading is not None:
+            level, title, consumed = heading
+            if kind != "heading":
+                flush()
+            path[level] = title
+            for deeper in range(level + 1, len(path)):
+                path[deeper] = ""
+            current.append(title if level == 0 else line.strip())
+            kind = "heading"
+            block_path = " > ".join(part for part in path if part)
+            new_section = new_section or level <= 1
+            i += consumed
+            continue
+
+        if kind == "heading":
+            flush()
+        if _CODE_END.match(line):
+            if kind == "code":
+                flush()
+            i += 1
+            continue
+        if _CODE_LABEL.match(line):
+            flush()
+            kind = "code"
+        elif kind == "code" and _LABEL.match(line):
+            flush()
+
+        if not line.strip() and kind != "code":
+            flush()
+        else:
+            if not current:
+                block_path = " > ".join(part for part in path if part)
+                kind = kind or "text"
+            current.append(line)
+        i += 1
+
+    flush()
+    return blocks
 
-    chunks = []
+
+class StructureSplitter:
+    """Token-budgeted, heading-aware chunking"""
+
+    def __init__(self, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                 count_tokens=None):
+        self.count_tokens = count_tokens or model_token_counter()
+        self.budget = max_tokens - _SPECIAL_TOKENS
+        self.overlap_tokens = overlap_tokens
+
+    def _cut(self, text: str, budget: int):
+        """Fallback for a single block over the budget"""
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=budget,
+            chunk_overlap=min(self.overlap_tokens, budget // 4),
+            length_function=self.count_tokens
+        )
+        return splitter.split_text(text)
+
+    def split_text(self, text: str):
+        """
+        Returns:
+            List of (chunk_text, section_path) pairs; a chunk holding several
+            whole sections lists their paths separated by " | "
+        """
+        chunks = []
+        parts, used, sections = [], 0, []
+
+        def flush():
+            nonlocal parts, used, sections
+            if parts:
+                chunks.append(("\n".join(parts), " | ".join(dict.fromkeys(sections))))
+            parts, used, sections = [], 0, []
+
+        def start(block_path, opens_section):
+            # Chunks that don't open with their section heading get the path
+            nonlocal parts, used
+            sections.append(block_path)
+            if block_path and not opens_section:
+                prefix = f"[{block_path}]"
+                parts, used = [prefix], self.count_tokens(prefix) + 1
+            return parts[:]
+
+        for section in _group_sections(parse_blocks(text)):
+            counted = [(block, path, opens, self.count_tokens(block)) for block, path, opens in section]
+            size = sum(tokens + 1 for *_, tokens in counted)
+            # Small sections share a chunk when they fit in it whole
+            if parts and counted[0][2] and used + size <= self.budget:
+                sections.append(counted[0][1])
+                parts.extend(block for block, *_ in counted)
+                used += size
+                continue
+            if counted[0][2]:
+                flush()
+
+            for block, block_path, opens, tokens in counted:
+                if parts and used + tokens > self.budget:
+                    flush()
+                opening = start(block_path, opens) if not parts else None
+
+                if used + tokens <= self.budget:
+                    parts.append(block)
+                    used += tokens + 1
+                    continue
+
+                # Block alone is over the budget: cut it, each piece that
+                # doesn't fit going to a new chunk (with the path prefix)
+                for piece in self._cut(block, self.budget - used):
+                    piece_tokens = self.count_tokens(piece)
+                    if parts != opening and used + piece_tokens > self.budget:
+                        flush()
+                        opening = start(block_path, False)
+                    parts.append(piece)
+                    used += piece_tokens + 1
+
+        flush()
+        return chunks
+
+
+def _group_sections(blocks):
+    """Group parse_blocks() output into sections (each opened by a new_section block)"""
+    section = []
+    for block in blocks:
+        if block[2] and section:
+            yield section
+            section = []
+        section.append(block)
+    if section:
+        yield section
+
+
+def iter_chunks(documents, splitter: StructureSplitter = None):
+    """Lazily split documents; yields one list of chunks per document"""
+    splitter = splitter or StructureSplitter()
 
     for doc in documents:
-        split_texts = splitter.split_text(doc["text"])
-        for chunk in split_texts:
-            chunks.append({
+        yield [
+            {
                 "text": chunk,
-                "metadata": doc["metadata"]
-            })
+                "metadata": {**doc["metadata"], "section": section}
+            }
+            for chunk, section in splitter.split_text(doc["text"])
+        ]
+
+
+def split_documents(documents):
+    chunks = []
+
+    for doc_chunks in iter_chunks(documents):
+        chunks.extend(doc_chunks)
 
     return chunks
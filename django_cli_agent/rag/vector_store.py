@@ -1,70 +1,135 @@
 import chromadb
 from chromadb.config import Settings
-from rag.embeddings import embed_texts
+from rag.embeddings import embed_batches
+from rag.pipeline import batched, prefetch
+from rag.build_report import BuildProfiler, children_cpu_seconds
+from config import INGEST_BATCH_SIZE, INGEST_QUEUE_SIZE, EMBED_WORKERS
 from pathlib import Path
+import time
 
-# Use relative path from the rag module
-CHROMA_PATH = Path(__file__).parent.parent / "data" / "vector_db"
 
-
-def build_vector_store(chunks):
-    """
-    Build ChromaDB vector store from document chunks.
-    
-    Args:
-        chunks: List of chunk dictionaries with 'text' and 'metadata'
-    """
+def _get_collection(chroma_path, full_rebuild=False):
     # Ensure directory exists
-    CHROMA_PATH.mkdir(parents=True, exist_ok=True)
-    
-    print(f"   Vector DB path: {CHROMA_PATH}")
+    chroma_path = Path(chroma_path)
+    chroma_path.mkdir(parents=True, exist_ok=True)
     
     # Create persistent client with explicit settings
     client = chromadb.PersistentClient(
-        path=str(CHROMA_PATH)
+        path=str(chroma_path)
     )
 
     # Delete existing collection if it exists
-    try:
-        client.delete_collection(name="django_docs")
-        print(f"   Deleted existing collection")
-    except:
-        pass
+    if full_rebuild:
+        try:
+            client.delete_collection(name="django_docs")
+            print(f"   Deleted existing collection")
+        except:
+            pass
 
     # Create new collection with explicit distance function
-    collection = client.get_or_create_collection(
+    return client.get_or_create_collection(
         name="django_docs",
         metadata={"hnsw:space": "cosine"}
     )
 
-    # Extract data
-    texts = [c["text"] for c in chunks]
-    metadatas = [c["metadata"] for c in chunks]
+
+def _new_batches(chunks, collection, skip_existing):
+    """
+    Micro-batches of (chunks, texts) still to embed.
+    Chunks whose content-derived id is already stored are skipped.
+    """
+    for batch in batched(chunks, INGEST_BATCH_SIZE):
+        if skip_existing:
+            existing = set(collection.get(ids=[c["id"] for c in batch], include=[])["ids"])
+            batch = [c for c in batch if c["id"] not in existing]
+        if batch:
+            yield batch, [c["text"] for c in batch]
+
+
+def build_vector_store(chunks, chroma_path, full_rebuild=True, on_batch=None, profiler=None):
+    """
+    Build or incrementally update the ChromaDB vector store.
     
-    print(f"   Generating embeddings for {len(texts)} chunks...")
+    Chunks are consumed as a stream: they are embedded in micro-batches of
+    INGEST_BATCH_SIZE while earlier batches are being written, with at most
+    INGEST_QUEUE_SIZE batches in flight, so memory does not grow with the
+    corpus. With EMBED_WORKERS > 1 the batches are embedded by a process
+    pool.
     
-    # Generate embeddings (this takes time)
-    embeddings = embed_texts(texts)
+    Args:
+        chunks: Iterable of chunk dictionaries with 'text', 'metadata' and 'id'
+                (see rag.manifest.assign_chunk_ids). Chunks whose id is
+                already in the collection are not embedded again.
+        chroma_path: ChromaDB directory (inside the snapshot being built)
+        full_rebuild: Drop the collection first and embed every chunk
+        on_batch: Optional callback(chunks, embeddings) for every stored
+                  batch, so other indexes can be built from the same stream
+        profiler: Optional BuildProfiler; records the embed and store
+                  stages (on_batch is timed as bm25)
     
-    print(f"   Storing in vector database...")
-
-    # Add to collection in batches to avoid memory issues
-    batch_size = 100
-    for i in range(0, len(texts), batch_size):
-        end_idx = min(i + batch_size, len(texts))
-        
-        collection.add(
-            documents=texts[i:end_idx],
-            metadatas=metadatas[i:end_idx],
-            embeddings=embeddings[i:end_idx],
-            ids=[str(j) for j in range(i, end_idx)]
-        )
-        
-        print(f"   Stored {end_idx}/{len(texts)} chunks")
+    Returns:
+        tuple: (chunks stored, collection count)
+    """
+    print(f"   Vector DB path: {chroma_path}")
+    collection = _get_collection(chroma_path, full_rebuild)
+    
+    print(f"   Streaming chunks: embed → store in batches of {INGEST_BATCH_SIZE} "
+          f"({EMBED_WORKERS} embedding worker{'s' if EMBED_WORKERS > 1 else ''})...")
+    
+    profiler = profiler or BuildProfiler()
+    stored = 0
+    started = time.perf_counter()
+    workers_cpu = children_cpu_seconds()
+    # Chunks bypass the query embedding cache
+    batches = prefetch(
+        profiler.iterate(
+            "embed",
+            embed_batches,
+            _new_batches(chunks, collection, skip_existing=not full_rebuild),
+            count=lambda item: len(item[0])
+        ),
+        maxsize=INGEST_QUEUE_SIZE,
+        name="ingest-embed"
+    )
+    for batch, embeddings in batches:
+        with profiler.stage("store", items=len(batch)):
+            collection.upsert(
+                documents=[c["text"] for c in batch],
+                metadatas=[c["metadata"] for c in batch],
+                embeddings=embeddings,
+                ids=[c["id"] for c in batch]
+            )
+        if on_batch is not None:
+            with profiler.stage("bm25"):
+                on_batch(batch, embeddings)
+        stored += len(batch)
+        rate = stored / max(time.perf_counter() - started, 1e-9)
+        print(f"   Stored {stored} chunks ({rate:.1f} chunks/sec)")
+    
+    # Embedding worker processes (EMBED_WORKERS > 1) have exited by now
+    profiler.add("embed", cpu=children_cpu_seconds() - workers_cpu)
+    
+    elapsed = time.perf_counter() - started
+    if stored:
+        print(f"   ⚡ Embedded {stored} chunks in {elapsed:.1f}s ({stored / elapsed:.1f} chunks/sec)")
     
     # Verify collection was created
     final_count = collection.count()
     print(f"   Persisting to disk...")
     print(f"   ✅ Final collection count: {final_count} documents")
     
-    return final_count
\ No newline at end of file
+    return stored, final_count
+
+
+def delete_chunks(chroma_path, chunk_ids):
+    """
+    Delete chunks (by id) from the vector store.
+    
+    Returns:
+        Collection count after the delete
+    """
+    collection = _get_collection(chroma_path)
+    chunk_ids = list(chunk_ids)
+    for i in range(0, len(chunk_ids), INGEST_BATCH_SIZE):
+        collection.delete(ids=chunk_ids[i:i + INGEST_BATCH_SIZE])
+    return collection.count()
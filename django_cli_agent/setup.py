@@ -4,4 +4,5 @@ setup(
     name="django_cli_agent",
     version="0.1",
     packages=find_packages(),
+    py_modules=["config"],
 )
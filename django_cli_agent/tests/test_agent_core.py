@@ -0,0 +1,87 @@
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("httpx")
+pytest.importorskip("requests")
+
+import agent.agent_core as agent_core
+from llm.model import GenerationChunk
+from rag.retriever import RetrievalResult
+
+
+def fake_stream(text):
+    async def generate_stream(prompt, **kwargs):
+        yield GenerationChunk(text)
+        yield GenerationChunk("", done=True, text=text, stats={})
+    return generate_stream
+
+
+class AsyncAgentTests(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.agent = agent_core.AgentCore(workspace_root=tmp.name)
+        # The sync retrieval path must not be used by arun_stream
+        patcher = mock.patch.object(agent_core, "retrieve_context", side_effect=AssertionError("sync retrieval"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_stream(self, question):
+        async def collect():
+            return [chunk async for chunk in self.agent.arun_stream(question)]
+        return asyncio.run(collect())
+
+    def test_retrieval_is_awaited(self):
+        async def aretrieve_context(query, k=4):
+            return RetrievalResult("Models are defined in models.py", ["models.txt"], degraded={"bm25": "timeout"})
+
+        self.agent.async_llm.generate_stream = fake_stream("Use a ForeignKey.")
+        with mock.patch.object(agent_core, "aretrieve_context", aretrieve_context):
+            chunks = self.run_stream("what is a model?")
+
+        self.assertEqual(chunks[0].delta, "Use a ForeignKey.")
+        self.assertTrue(chunks[-1].done)
+        self.assertIn("models.txt", chunks[-1].text)
+        self.assertIn("keyword (BM25) search did not respond in time", chunks[-1].text)
+
+    def test_cancelling_the_stream_cancels_retrieval(self):
+        started, cancelled = asyncio.Event(), []
+
+        async def aretrieve_context(query, k=4):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(query)
+                raise
+
+        async def cancel_during_retrieval():
+            stream = self.agent.arun_stream("what is a model?")
+            task = asyncio.ensure_future(stream.__anext__())
+            await started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch.object(agent_core, "aretrieve_context", aretrieve_context):
+            asyncio.run(asyncio.wait_for(cancel_during_retrieval(), 5))
+        self.assertEqual(cancelled, ["what is a model?"])
+
+    def test_retrieval_failure_still_answers(self):
+        async def aretrieve_context(query, k=4):
+            raise RuntimeError("index missing")
+
+        self.agent.async_llm.generate_stream = fake_stream("Answer without context.")
+        with mock.patch.object(agent_core, "aretrieve_context", aretrieve_context):
+            chunks = self.run_stream("what is a model?")
+        self.assertEqual(chunks[-1].text, "Answer without context.")
+
+
+if __name__ == "__main__":
+    unittest.main()
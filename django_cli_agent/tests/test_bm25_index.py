@@ -0,0 +1,139 @@
+import math
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from rag.bm25_index import BM25Index, tokenize
+
+VOCABULARY = [
+    "django", "model", "view", "queryset", "form", "template", "url",
+    "admin", "migration", "field", "signal", "cache", "middleware", "test",
+]
+
+
+def random_corpus(rng, n_docs, max_len=30):
+    """Small Zipf-ish corpus: a few terms in most documents, many rare ones"""
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    return [
+        rng.choices(VOCABULARY, weights=weights, k=rng.randint(1, max_len))
+        for _ in range(n_docs)
+    ]
+
+
+def reference_scores(corpus, query, k1=1.5, b=0.75, epsilon=0.25):
+    """BM25Okapi as rank_bm25 computes it, in plain Python"""
+    n = len(corpus)
+    avgdl = sum(len(doc) for doc in corpus) / n
+    doc_freqs = {}
+    for doc in corpus:
+        for term in set(doc):
+            doc_freqs[term] = doc_freqs.get(term, 0) + 1
+    idf = {term: math.log(n - df + 0.5) - math.log(df + 0.5) for term, df in doc_freqs.items()}
+    eps = max(epsilon * sum(idf.values()) / len(idf), 0.0)
+    idf = {term: (value if value >= 0 else eps) for term, value in idf.items()}
+
+    scores = []
+    for doc in corpus:
+        score = 0.0
+        for term in query:
+            tf = doc.count(term)
+            if tf:
+                score += idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avgdl))
+        scores.append(score)
+    return np.array(scores)
+
+
+class BM25IndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(7)
+
+    def assertMatchesExhaustive(self, index, query, k, docs, scores):
+        """top_k results are a best-k of get_scores (ties may be broken either way)"""
+        exhaustive = index.get_scores(query)
+        expected = np.sort(exhaustive[exhaustive > 0])[::-1][:k]
+        np.testing.assert_allclose(scores, expected, rtol=1e-5)
+        np.testing.assert_allclose(exhaustive[docs], scores, rtol=1e-5)
+        self.assertEqual(len(set(docs.tolist())), len(docs))
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_scores_match_bm25okapi(self):
+        corpus = random_corpus(self.rng, 40)
+        index = BM25Index.build(corpus)
+        for query in (["django"], ["model", "view", "view"], ["cache", "unknown"]):
+            np.testing.assert_allclose(
+                index.get_scores(query), reference_scores(corpus, query), rtol=1e-5, atol=1e-6
+            )
+
+    def test_top_k_matches_exhaustive_search(self):
+        for n_docs in (1, 5, 30, 120):
+            corpus = random_corpus(self.rng, n_docs)
+            index = BM25Index.build(corpus)
+            for _ in range(25):
+                query = self.rng.choices(VOCABULARY + ["unknown"], k=self.rng.randint(1, 6))
+                for k in (1, 3, 10, n_docs + 5):
+                    with self.subTest(n_docs=n_docs, query=query, k=k):
+                        docs, scores = index.top_k(query, k)
+                        self.assertMatchesExhaustive(index, query, k, docs, scores)
+
+    def test_top_k_many_matches_top_k(self):
+        corpus = random_corpus(self.rng, 60)
+        index = BM25Index.build(corpus)
+        queries = [self.rng.choices(VOCABULARY, k=self.rng.randint(1, 5)) for _ in range(20)]
+        # One query touches little of the corpus (sparse path), many queries
+        # touch most of it (dense path)
+        for batch in (queries[:1], queries, [["django", "model"]] * 5):
+            for k in (1, 4, 100):
+                for query, (docs, scores) in zip(batch, index.top_k_many(batch, k)):
+                    with self.subTest(query=query, k=k):
+                        self.assertMatchesExhaustive(index, query, k, docs, scores)
+
+    def test_no_matches(self):
+        index = BM25Index.build(random_corpus(self.rng, 10))
+        for docs, scores in [index.top_k(["unknown"], 5), index.top_k(["django"], 0),
+                             *index.top_k_many([["unknown"], []], 5)]:
+            self.assertEqual(len(docs), 0)
+            self.assertEqual(len(scores), 0)
+
+    def test_save_and_load(self):
+        corpus = random_corpus(self.rng, 50)
+        documents = [" ".join(doc) for doc in corpus]
+        index = BM25Index.build(
+            [tokenize(text) for text in documents],
+            documents=documents,
+            metadatas=[{"source": f"doc{i}.txt"} for i in range(len(corpus))],
+            doc_ids=[f"chunk-{i}" for i in range(len(corpus))],
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bm25_index.bin"
+            index.save(path)
+            loaded = BM25Index.load(path)
+
+            query = ["model", "field", "admin"]
+            docs, scores = index.top_k(query, 5)
+            loaded_docs, loaded_scores = loaded.top_k(query, 5)
+            np.testing.assert_array_equal(loaded_docs, docs)
+            np.testing.assert_allclose(loaded_scores, scores)
+            self.assertEqual(loaded.documents[3], documents[3])
+            self.assertEqual(loaded.metadatas[3], {"source": "doc3.txt"})
+            self.assertEqual(loaded.ordinal("chunk-42"), 42)
+
+    def test_load_rejects_other_files(self):
+        index = BM25Index.build([["django", "model"]], documents=["django model"],
+                                metadatas=[{}], doc_ids=["chunk-0"])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bm25_index.bin"
+            index.save(path)
+            data = path.read_bytes()
+            for name, content in (("pickle", b"\x80\x04\x95" + data[3:]), ("truncated", data[:200])):
+                with self.subTest(name):
+                    path.write_bytes(content)
+                    with self.assertRaises(ValueError):
+                        BM25Index.load(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+
+from rag.cache import TTLCache
+
+
+class TTLCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch("rag.cache.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        self.now += 59.9
+        self.assertEqual(cache.get("a"), 1)
+        self.now += 0.1
+        self.assertEqual(cache.get("a", "missing"), "missing")
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_set_refreshes_the_ttl(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        self.now += 50
+        cache.set("a", 2)
+        self.now += 50
+        self.assertEqual(cache.get("a"), 2)
+
+    def test_zero_size_disables_the_cache(self):
+        cache = TTLCache(maxsize=0, ttl=60)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_stats(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+        cache.clear()
+        stats = cache.stats()
+        self.assertEqual((stats["size"], stats["hits"], stats["misses"]), (0, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import json
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from rag.dedup import (
+    LSHIndex,
+    MinHasher,
+    NearDuplicateFilter,
+    alias_sources,
+    load_aliases,
+    save_aliases,
+)
+
+WORDS = [f"w{i}" for i in range(500)]
+
+
+def random_text(rng, length=120):
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def edited(rng, text, edits):
+    """text with `edits` words replaced"""
+    words = text.split()
+    for i in rng.sample(range(len(words)), edits):
+        words[i] = "changed"
+    return " ".join(words)
+
+
+def chunk(chunk_id, text, source="a.txt"):
+    return {"id": chunk_id, "text": text, "metadata": {"source": source, "section": "S"}}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+class MinHasherTests(unittest.TestCase):
+
+    def test_signature_estimates_jaccard(self):
+        rng = random.Random(0)
+        hasher = MinHasher()
+        for edits in (0, 2, 10, 40):
+            with self.subTest(edits=edits):
+                a = random_text(rng)
+                b = edited(rng, a, edits)
+                estimate = float(np.mean(hasher.signature(a) == hasher.signature(b)))
+                self.assertAlmostEqual(estimate, jaccard(hasher.shingles(a), hasher.shingles(b)), delta=0.15)
+
+    def test_case_and_punctuation_are_ignored(self):
+        hasher = MinHasher()
+        np.testing.assert_array_equal(
+            hasher.signature("Use the Model.save() method, then commit."),
+            hasher.signature("use the model save method then commit"),
+        )
+
+    def test_short_text_is_one_shingle(self):
+        self.assertEqual(MinHasher().shingles("Only three words"), {"only three words"})
+
+    def test_same_seed_same_signature(self):
+        text = random_text(random.Random(1))
+        np.testing.assert_array_equal(MinHasher().signature(text), MinHasher().signature(text))
+
+
+class LSHIndexTests(unittest.TestCase):
+
+    def test_bands_must_divide_num_perm(self):
+        with self.assertRaises(ValueError):
+            LSHIndex(num_perm=128, bands=30)
+
+    def test_most_similar(self):
+        rng = random.Random(2)
+        hasher = MinHasher()
+        index = LSHIndex()
+        texts = [random_text(rng) for _ in range(20)]
+        for i, text in enumerate(texts):
+            index.add(i, hasher.signature(text))
+        key, similarity = index.most_similar(hasher.signature(edited(rng, texts[7], 1)))
+        self.assertEqual(key, 7)
+        self.assertGreater(similarity, 0.85)
+
+    def test_no_candidate(self):
+        hasher = MinHasher()
+        index = LSHIndex()
+        index.add("a", hasher.signature(random_text(random.Random(3))))
+        self.assertEqual(index.most_similar(hasher.signature(random_text(random.Random(4)))), (None, 0.0))
+
+
+class NearDuplicateFilterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(5)
+        self.text = random_text(self.rng)
+
+    def test_near_duplicates_become_aliases(self):
+        dedup = NearDuplicateFilter(threshold=0.85)
+        chunks = [
+            chunk("a", self.text),
+            chunk("b", edited(self.rng, self.text, 1), source="b.txt"),
+            chunk("c", random_text(self.rng)),
+        ]
+        kept = list(dedup.filter(chunks))
+        self.assertEqual([c["id"] for c in kept], ["a", "c"])
+        self.assertEqual(dedup.aliases, {"a": [{"id": "b", "source": "b.txt", "section": "S"}]})
+        self.assertEqual((dedup.chunks_seen, dedup.chunks_dropped), (3, 1))
+        self.assertEqual(dedup.chars_dropped, len(chunks[1]["text"]))
+        self.assertIn("1 of 3 chunks (33.3%)", dedup.report())
+
+    def test_dissimilar_chunks_are_kept(self):
+        dedup = NearDuplicateFilter(threshold=0.85)
+        chunks = [chunk("a", self.text), chunk("b", edited(self.rng, self.text, 40))]
+        self.assertEqual(len(list(dedup.filter(chunks))), 2)
+        self.assertEqual(dedup.aliases, {})
+
+    def test_seeded_chunks_are_targets(self):
+        dedup = NearDuplicateFilter(threshold=0.85)
+        dedup.seed("old", self.text)
+        self.assertEqual(list(dedup.filter([chunk("new", self.text)])), [])
+        self.assertEqual([alias["id"] for alias in dedup.aliases["old"]], ["new"])
+        # A seeded chunk coming past again is not its own duplicate
+        self.assertEqual(len(list(dedup.filter([chunk("old", self.text)]))), 1)
+
+    def test_protected_chunks_are_kept(self):
+        dedup = NearDuplicateFilter(threshold=0.85, protected={"stored"})
+        kept = list(dedup.filter([chunk("a", self.text), chunk("stored", self.text)]))
+        self.assertEqual([c["id"] for c in kept], ["a", "stored"])
+        self.assertEqual(dedup.aliases, {})
+
+    def test_report_without_chunks(self):
+        self.assertEqual(NearDuplicateFilter().report(), "no new chunks")
+
+
+class AliasFileTests(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "chunk_aliases.json"
+
+    def test_save_and_load(self):
+        aliases = {
+            "a": [{"id": "b", "source": "y.txt", "section": ""}, {"id": "c", "source": "x.txt", "section": ""}],
+            "d": [],
+        }
+        save_aliases(self.path, aliases)
+        self.assertEqual(load_aliases(self.path), {"a": aliases["a"]})
+        self.assertEqual(alias_sources(aliases), {"a": ["x.txt", "y.txt"]})
+
+    def test_missing_or_corrupt_file(self):
+        self.assertEqual(load_aliases(self.path), {})
+        self.path.write_text("{not json", encoding="utf-8")
+        self.assertEqual(load_aliases(self.path), {})
+
+    def test_save_leaves_no_temporary_file(self):
+        save_aliases(self.path, {"a": [{"id": "b", "source": "x.txt", "section": ""}]})
+        self.assertEqual(list(self.path.parent.iterdir()), [self.path])
+        self.assertIn("a", json.loads(self.path.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    unittest.main()
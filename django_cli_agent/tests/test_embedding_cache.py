@@ -0,0 +1,113 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import rag.embeddings as embeddings
+from rag.embedding_cache import TOUCH_INTERVAL, EmbeddingCache
+
+
+def vector(seed, dim=8):
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+class EmbeddingCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "embedding_cache.sqlite3"
+        self.now = 1_000_000.0
+        patcher = mock.patch("rag.embedding_cache.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cache(self, max_entries=100):
+        cache = EmbeddingCache(self.path, max_entries=max_entries)
+        self.addCleanup(cache._conn.close)
+        return cache
+
+    def last_used(self, cache):
+        return [row[0] for row in cache._conn.execute("SELECT last_used FROM embeddings")]
+
+    def test_round_trip_per_model(self):
+        cache = self.cache()
+        cache.put_many("model-a", ["x", "y"], [vector(1), vector(2)])
+        found = cache.get_many("model-a", ["x", "y", "z"])
+        self.assertEqual(set(found), {"x", "y"})
+        np.testing.assert_array_equal(found["x"], vector(1))
+        self.assertEqual(cache.get_many("model-b", ["x"]), {})
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_persists_across_instances(self):
+        self.cache().put_many("model", ["x"], [vector(1)])
+        np.testing.assert_array_equal(self.cache().get_many("model", ["x"])["x"], vector(1))
+
+    def test_fresh_hits_do_not_write(self):
+        cache = self.cache()
+        cache.put_many("model", ["x"], [vector(1)])
+        changes = cache._conn.total_changes
+        self.now += TOUCH_INTERVAL
+        cache.get_many("model", ["x"])
+        self.assertEqual(cache._conn.total_changes, changes)
+        self.assertEqual(self.last_used(cache), [1_000_000.0])
+
+    def test_stale_hits_refresh_recency(self):
+        cache = self.cache()
+        cache.put_many("model", ["x"], [vector(1)])
+        self.now += TOUCH_INTERVAL + 1
+        cache.get_many("model", ["x"])
+        self.assertEqual(self.last_used(cache), [self.now])
+
+    def test_evicts_least_recently_used(self):
+        cache = self.cache(max_entries=10)
+        for i in range(15):
+            self.now += 1
+            cache.put_many("model", [f"text {i}"], [vector(i)])
+        self.assertLessEqual(cache.stats()["size"], 10)
+        found = cache.get_many("model", [f"text {i}" for i in range(15)])
+        self.assertIn("text 14", found)
+        self.assertNotIn("text 0", found)
+
+    def test_clear(self):
+        cache = self.cache()
+        cache.put_many("model", ["x"], [vector(1)])
+        cache.clear()
+        self.assertEqual(cache.stats()["size"], 0)
+        self.assertEqual(cache._count, 0)
+
+
+class EmbedTextsTests(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = EmbeddingCache(Path(tmp.name) / "embedding_cache.sqlite3")
+        self.addCleanup(cache._conn.close)
+        self.model = mock.Mock()
+        self.model.encode.side_effect = lambda texts: np.array([vector(len(t)) for t in texts])
+        for name, value in (("_embedding_model", self.model), ("_embedding_cache", cache),
+                            ("EMBEDDING_CACHE_ENABLED", True)):
+            patcher = mock.patch.object(embeddings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_only_misses_reach_the_model(self):
+        first = embeddings.embed_texts(["a", "bb", "a"])
+        self.model.encode.assert_called_once_with(["a", "bb"])
+        second = embeddings.embed_texts(["bb", "ccc", "a"])
+        self.model.encode.assert_called_with(["ccc"])
+        np.testing.assert_array_equal(second[[0, 2]], first[[1, 0]])
+        self.assertEqual(second.dtype, np.float32)
+
+    def test_use_cache_false_bypasses_the_cache(self):
+        embeddings.embed_texts(["a"])
+        embeddings.embed_texts(["a"], use_cache=False)
+        self.assertEqual(self.model.encode.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from rag.fusion import RRF_CONSTANT, fuse
+
+
+class FuseTests(unittest.TestCase):
+
+    def test_rrf_sums_reciprocal_ranks(self):
+        semantic = (np.array([10, 20, 30]), np.array([0.9, 0.8, 0.7]))
+        bm25 = (np.array([30, 40]), np.array([12.0, 3.0]))
+        ids, scores = fuse([semantic, bm25], [0.6, 0.4], k=10)
+
+        expected = {
+            10: 0.6 / RRF_CONSTANT,
+            20: 0.6 / (RRF_CONSTANT + 1),
+            30: 0.6 / (RRF_CONSTANT + 2) + 0.4 / RRF_CONSTANT,
+            40: 0.4 / (RRF_CONSTANT + 1),
+        }
+        self.assertEqual(ids.tolist(), sorted(expected, key=expected.get, reverse=True))
+        np.testing.assert_allclose(scores, [expected[i] for i in ids.tolist()])
+
+    def test_top_k(self):
+        legs = [(np.arange(50), np.linspace(1, 0, 50)), (np.arange(50)[::-1], np.linspace(1, 0, 50))]
+        for strategy in ("rrf", "normalized", "convex"):
+            ids, scores = fuse(legs, [0.7, 0.3], k=5, strategy=strategy)
+            with self.subTest(strategy=strategy):
+                all_ids, all_scores = fuse(legs, [0.7, 0.3], k=50, strategy=strategy)
+                self.assertEqual(ids.tolist(), all_ids[:5].tolist())
+                np.testing.assert_allclose(scores, all_scores[:5])
+                self.assertTrue(np.all(np.diff(all_scores) <= 0))
+
+    def test_ties_keep_first_seen_order(self):
+        # Same rank in legs of equal weight: equal RRF scores
+        ids, _ = fuse([(np.array([7, 3]), np.ones(2)), (np.array([5, 1]), np.ones(2))], [0.5, 0.5], k=4)
+        self.assertEqual(ids.tolist(), [7, 5, 3, 1])
+
+    def test_convex_is_min_max_normalized(self):
+        semantic = (np.array([1, 2, 3]), np.array([0.9, 0.5, 0.1]))
+        bm25 = (np.array([3, 1]), np.array([20.0, 10.0]))
+        ids, scores = fuse([semantic, bm25], [0.5, 0.5], k=3, strategy="convex")
+        self.assertEqual(ids.tolist(), [1, 3, 2])
+        np.testing.assert_allclose(scores, [0.5, 0.5, 0.25])
+
+    def test_constant_scores_do_not_divide_by_zero(self):
+        for strategy in ("normalized", "convex"):
+            ids, scores = fuse([(np.array([4, 2]), np.array([1.0, 1.0]))], [0.8], k=2, strategy=strategy)
+            with self.subTest(strategy=strategy):
+                self.assertEqual(ids.tolist(), [4, 2])
+                np.testing.assert_allclose(scores, [0.8, 0.8])
+
+    def test_empty_legs(self):
+        empty = (np.array([], dtype=np.int64), np.array([]))
+        for legs, k in (([empty, empty], 5), ([(np.array([1]), np.array([1.0]))], 0)):
+            ids, scores = fuse(legs, [0.5, 0.5], k=k)
+            self.assertEqual(len(ids), 0)
+            self.assertEqual(len(scores), 0)
+        ids, _ = fuse([empty, (np.array([9]), np.array([2.0]))], [0.5, 0.5], k=5)
+        self.assertEqual(ids.tolist(), [9])
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            fuse([(np.array([1]), np.array([1.0]))], [1.0], k=1, strategy="borda")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from llm.generation_cache import EVICT_TO, TOUCH_INTERVAL, GenerationCache, generation_key
+
+
+def payload(prompt, **fields):
+    return {
+        "model": "codellama:7b",
+        "messages": [{"role": "user", "content": prompt}],
+        "options": {"temperature": 0.1},
+        **fields,
+    }
+
+
+class GenerationKeyTests(unittest.TestCase):
+
+    def test_only_model_options_and_messages_count(self):
+        key = generation_key(payload("q"))
+        self.assertEqual(key, generation_key(payload("q", stream=True, keep_alive="30m")))
+        self.assertNotEqual(key, generation_key(payload("other")))
+        self.assertNotEqual(key, generation_key({**payload("q"), "options": {"temperature": 0.7}}))
+        self.assertNotEqual(key, generation_key({**payload("q"), "model": "llama3"}))
+
+
+class GenerationCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "generation_cache.sqlite3"
+        self.now = 1_000_000.0
+        patcher = mock.patch("llm.generation_cache.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cache(self, max_entries=100, max_bytes=1024 * 1024):
+        cache = GenerationCache(self.path, max_entries=max_entries, max_bytes=max_bytes)
+        self.addCleanup(cache._conn.close)
+        return cache
+
+    def trace(self, cache):
+        """SQL statements the cache runs from now on"""
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+        return statements
+
+    def last_used(self, cache):
+        return [row[0] for row in cache._conn.execute("SELECT last_used FROM generations")]
+
+    def test_round_trip(self):
+        cache = self.cache()
+        cache.put(b"k", "Use a ForeignKey.", {"eval_count": 3})
+        self.assertEqual(cache.get(b"k"), ("Use a ForeignKey.", {"eval_count": 3}))
+        self.assertIsNone(cache.get(b"missing"))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_persists_across_instances(self):
+        self.cache().put(b"k", "text")
+        self.assertEqual(self.cache().get(b"k"), ("text", {}))
+
+    def test_fresh_hits_do_not_write(self):
+        cache = self.cache()
+        cache.put(b"k", "text")
+        changes = cache._conn.total_changes
+        self.now += TOUCH_INTERVAL
+        cache.get(b"k")
+        self.assertEqual(cache._conn.total_changes, changes)
+        self.assertEqual(self.last_used(cache), [1_000_000.0])
+
+    def test_stale_hits_refresh_recency(self):
+        cache = self.cache()
+        cache.put(b"k", "text")
+        self.now += TOUCH_INTERVAL + 1
+        cache.get(b"k")
+        self.assertEqual(self.last_used(cache), [self.now])
+
+    def test_puts_under_the_limits_do_not_recount(self):
+        cache = self.cache(max_entries=10)
+        statements = self.trace(cache)
+        for i in range(10):
+            cache.put(b"k%d" % i, "text")
+        self.assertFalse([sql for sql in statements if "COUNT(*)" in sql])
+        cache.put(b"k10", "text")
+        self.assertEqual(len([sql for sql in statements if "COUNT(*)" in sql]), 1)
+
+    def test_evicts_least_recently_used_by_count(self):
+        cache = self.cache(max_entries=10)
+        for i in range(11):
+            self.now += 1
+            cache.put(b"k%d" % i, "text")
+        # Down to EVICT_TO of the limit, oldest first
+        self.assertEqual(cache.stats()["size"], int(10 * EVICT_TO))
+        self.assertIsNone(cache.get(b"k0"))
+        self.assertIsNotNone(cache.get(b"k10"))
+        self.assertEqual(cache.stats()["evictions"], 2)
+
+    def test_evicts_by_size(self):
+        cache = self.cache(max_bytes=1000)
+        for i in range(5):
+            self.now += 1
+            cache.put(b"k%d" % i, "x" * 198)
+        self.assertEqual(cache.stats()["size"], 5)
+        cache.put(b"k5", "x" * 198)
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 1000 * EVICT_TO)
+        self.assertIsNone(cache.get(b"k0"))
+        self.assertIsNotNone(cache.get(b"k5"))
+
+    def test_running_totals_are_upper_bounds(self):
+        cache = self.cache(max_entries=5)
+        for _ in range(5):
+            cache.put(b"same", "text")
+        # Replacing a key counts again until a recount shows otherwise
+        self.assertEqual(cache._count, 5)
+        self.assertEqual(cache.stats()["size"], 1)
+        # Rows another process adds are found by the next recount
+        other = self.cache(max_entries=5)
+        for i in range(5):
+            other.put(b"o%d" % i, "text")
+        cache.put(b"k", "text")
+        self.assertLessEqual(cache.stats()["size"], 5)
+
+    def test_oversized_generation_is_not_stored(self):
+        cache = self.cache(max_bytes=100)
+        cache.put(b"k", "x" * 200)
+        self.assertIsNone(cache.get(b"k"))
+
+    def test_clear(self):
+        cache = self.cache()
+        cache.put(b"k", "text")
+        cache.clear()
+        self.assertEqual(cache.stats()["size"], 0)
+        self.assertEqual((cache._count, cache._bytes), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
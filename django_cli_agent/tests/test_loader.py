@@ -0,0 +1,171 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from rag.loader import (
+    LoadStats,
+    _parse_markdown,
+    _parse_rst,
+    document_files,
+    iter_documents,
+    source_name,
+)
+
+RST = """\
+======
+Models
+======
+
+.. _models-intro:
+
+Fields
+======
+
+A model looks like this::
+
+    class Person(models.Model):
+
+        name = models.CharField(max_length=30)
+
+Each field is a :class:`~django.db.models.Field <Field>` instance.
+
+Options
+-------
+
+.. code-block:: python
+    :caption: models.py
+
+    class Meta:
+        ordering = ["name"]
+
+Use ``ordering`` sparingly.
+"""
+
+MARKDOWN = """\
+# Views
+
+## Function views
+
+```python
+def index(request):
+
+    return HttpResponse("ok")
+```
+A view returns a response.
+
+### Decorators ###
+
+~~~
+@login_required
+~~~
+"""
+
+
+class RstTests(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = _parse_rst(RST).splitlines()
+
+    def test_headings_by_order_of_adornment_style(self):
+        self.assertEqual(self.lines[:3], ["=" * 25, "MODELS", "=" * 25])
+        self.assertIn("SECTION: Fields", self.lines)
+        self.assertIn("CONCEPT: Options", self.lines)
+
+    def test_literal_block_is_closed_at_dedent(self):
+        start = self.lines.index("A model looks like this:")
+        self.assertEqual(self.lines[start + 1], "CODE:")
+        end = self.lines.index("END CODE", start)
+        self.assertIn("        name = models.CharField(max_length=30)", self.lines[start:end])
+        self.assertEqual(self.lines[end + 1], "Each field is a ~django.db.models.Field instance.")
+
+    def test_code_directive_is_closed_at_dedent(self):
+        start = self.lines.index("CONCEPT: Options")
+        code = self.lines.index("CODE:", start)
+        end = self.lines.index("END CODE", code)
+        self.assertIn('        ordering = ["name"]', self.lines[code:end])
+        self.assertEqual(self.lines[end + 1], "Use ordering sparingly.")
+
+    def test_targets_are_dropped(self):
+        self.assertFalse(any("_models-intro" in line for line in self.lines))
+
+    def test_code_block_at_end_of_file(self):
+        self.assertEqual(_parse_rst("Example::\n\n    x = 1").splitlines(), ["Example:", "CODE:", "", "    x = 1"])
+
+
+class MarkdownTests(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = _parse_markdown(MARKDOWN).splitlines()
+
+    def test_headings(self):
+        self.assertEqual(self.lines[:3], ["=" * 25, "VIEWS", "=" * 25])
+        self.assertIn("SECTION: Function views", self.lines)
+        self.assertIn("CONCEPT: Decorators", self.lines)
+
+    def test_fences_become_closed_code_blocks(self):
+        code = self.lines.index("CODE:")
+        end = self.lines.index("END CODE", code)
+        self.assertEqual(self.lines[code + 1:end], ["def index(request):", "", '    return HttpResponse("ok")'])
+        self.assertEqual(self.lines[end + 1], "A view returns a response.")
+        self.assertEqual(self.lines[-3:], ["CODE:", "@login_required", "END CODE"])
+
+    def test_no_headings_inside_fences(self):
+        lines = _parse_markdown("```\n# a comment\n```").splitlines()
+        self.assertEqual(lines, ["CODE:", "# a comment", "END CODE"])
+
+
+class LoadingTests(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        (self.root / "guide").mkdir()
+        (self.root / ".hidden").mkdir()
+        (self.root / "a.txt").write_text("SECTION: A\ntext", encoding="utf-8")
+        (self.root / "guide" / "b.md").write_text("# B\n", encoding="utf-8")
+        (self.root / "guide" / "c.rst").write_text("C\n=\n", encoding="utf-8")
+        (self.root / "guide" / "empty.txt").write_text("  \n", encoding="utf-8")
+        (self.root / "notes.pdf").write_bytes(b"%PDF")
+        (self.root / ".hidden" / "d.txt").write_text("hidden", encoding="utf-8")
+
+    def test_document_files(self):
+        files = document_files(self.root)
+        self.assertEqual(
+            [source_name(f, self.root) for f in files],
+            ["a.txt", "guide/b.md", "guide/c.rst", "guide/empty.txt"],
+        )
+
+    def test_document_files_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            document_files(self.root / "missing")
+        unsupported = self.root / "pdf"
+        unsupported.mkdir()
+        (unsupported / "notes.pdf").write_bytes(b"%PDF")
+        (unsupported / ".notes.txt").write_text("hidden", encoding="utf-8")
+        with self.assertRaises(FileNotFoundError):
+            document_files(unsupported)
+
+    def test_iter_documents_in_order(self):
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                stats = LoadStats()
+                docs = list(iter_documents(workers=workers, stats=stats, root=self.root))
+                self.assertEqual([d["metadata"]["source"] for d in docs], ["a.txt", "guide/b.md", "guide/c.rst"])
+                self.assertEqual(docs[1]["text"], "=" * 25 + "\nB\n" + "=" * 25)
+                self.assertEqual(len(stats.files), 4)
+                self.assertEqual(stats.failed, 0)
+
+    def test_unreadable_file_is_skipped(self):
+        (self.root / "bad.txt").write_bytes(b"\xff\xfe invalid utf-8 \xff")
+        stats = LoadStats()
+        with mock.patch("builtins.print"):
+            docs = list(iter_documents(stats=stats, root=self.root))
+        self.assertNotIn("bad.txt", [d["metadata"]["source"] for d in docs])
+        self.assertEqual(stats.failed_sources, ["bad.txt"])
+        self.assertIn("1 failed", stats.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+
+from rag.manifest import IndexPlan, assign_chunk_ids, index_fingerprint, load_manifest
+
+
+def doc(source, text):
+    return {"text": text, "metadata": {"source": source}}
+
+
+def chunks_of(document):
+    """One chunk per paragraph"""
+    return [
+        {"text": paragraph, "metadata": dict(document["metadata"])}
+        for paragraph in document["text"].split("\n\n")
+    ]
+
+
+def build(plan, documents):
+    """Run documents through a plan like setup_rag does; returns the new chunks"""
+    changed = plan.changed_documents(documents)
+    return list(plan.record_chunks(chunks_of(document) for document in changed))
+
+
+class AssignChunkIdsTests(unittest.TestCase):
+
+    def test_ids_are_content_derived(self):
+        first = assign_chunk_ids(chunks_of(doc("a.txt", "one\n\ntwo")))
+        again = assign_chunk_ids(chunks_of(doc("a.txt", "zero\n\none\n\ntwo")))
+        self.assertEqual([c["id"] for c in first], [c["id"] for c in again[1:]])
+        other = assign_chunk_ids(chunks_of(doc("b.txt", "one")))
+        self.assertNotEqual(other[0]["id"], first[0]["id"])
+
+    def test_repeated_texts_get_distinct_ids(self):
+        ids = [c["id"] for c in assign_chunk_ids(chunks_of(doc("a.txt", "same\n\nsame\n\nsame")))]
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual(ids[1], ids[0] + "-1")
+
+
+class IndexPlanTests(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.manifest_path = Path(tmp.name) / "index_manifest.json"
+
+        plan = IndexPlan(load_manifest(self.manifest_path))
+        self.assertTrue(plan.full_rebuild)
+        self.first = build(plan, [
+            doc("keep.txt", "kept one\n\nkept two"),
+            doc("edit.txt", "unchanged part\n\nold part"),
+            doc("gone.txt", "removed"),
+        ])
+        plan.save(self.manifest_path)
+
+    def ids(self, source):
+        return [c["id"] for c in self.first if c["metadata"]["source"] == source]
+
+    def test_only_changed_files_are_rebuilt(self):
+        plan = IndexPlan(load_manifest(self.manifest_path))
+        self.assertFalse(plan.full_rebuild)
+        skipped = []
+        changed = plan.changed_documents(
+            [doc("keep.txt", "kept one\n\nkept two"), doc("edit.txt", "unchanged part\n\nnew part"),
+             doc("new.txt", "brand new")],
+            on_unchanged=lambda source, entry: skipped.append(source)
+        )
+        new_chunks = list(plan.record_chunks(chunks_of(document) for document in changed))
+
+        self.assertEqual(skipped, ["keep.txt"])
+        self.assertEqual((plan.changed, plan.unchanged), (2, 1))
+        self.assertEqual(plan.removed, ["gone.txt"])
+        self.assertTrue(plan.is_unchanged("keep.txt"))
+        self.assertFalse(plan.is_unchanged("edit.txt"))
+        # The unchanged paragraph of edit.txt keeps its id and is not stale
+        self.assertEqual(new_chunks[0]["id"], self.ids("edit.txt")[0])
+        self.assertEqual(sorted(plan.stale_ids()), sorted([self.ids("edit.txt")[1], *self.ids("gone.txt")]))
+        self.assertEqual(plan.files["keep.txt"]["chunks"], self.ids("keep.txt"))
+
+    def test_unloadable_files_keep_their_chunks(self):
+        plan = IndexPlan(load_manifest(self.manifest_path))
+        build(plan, [doc("keep.txt", "kept one\n\nkept two")])
+        self.assertEqual(plan.keep_previous(["edit.txt", "unknown.txt"]), 1)
+        self.assertEqual(plan.removed, ["gone.txt"])
+        self.assertEqual(plan.stale_ids(), self.ids("gone.txt"))
+
+    def test_other_fingerprint_forces_a_full_rebuild(self):
+        manifest = load_manifest(self.manifest_path)
+        self.assertEqual(manifest["fingerprint"], index_fingerprint())
+        manifest["fingerprint"] = "v0:splitter=old"
+        plan = IndexPlan(manifest)
+        self.assertTrue(plan.full_rebuild)
+        self.assertEqual(len(build(plan, [doc("keep.txt", "kept one\n\nkept two")])), 2)
+        self.assertEqual(plan.stale_ids(), [])
+        self.assertTrue(IndexPlan(load_manifest(self.manifest_path), full_rebuild=True).full_rebuild)
+
+    def test_unreadable_manifest_means_a_full_build(self):
+        self.manifest_path.write_text("{not json", encoding="utf-8")
+        self.assertEqual(load_manifest(self.manifest_path), {"fingerprint": None, "files": {}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,314 @@
+import asyncio
+import contextlib
+import json
+import select
+import socket
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("requests")
+
+import llm.model as model
+from llm.generation_cache import GenerationCache
+from llm.model import LLM, AsyncLLM, GenerationChunk, OllamaError, _StreamReader
+from llm.transport import AsyncHTTPTransport, CircuitBreaker, HTTPTransport
+
+
+def message(content, **fields):
+    return {"message": {"role": "assistant", "content": content}, **fields}
+
+
+FINAL = {"done": True, "eval_count": 3, "eval_duration": 1_500_000_000, "prompt_eval_duration": 200_000_000}
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """
+    /api/chat answering with the server's `lines`: one chunked-encoding
+    chunk per NDJSON line when streaming, their merged message otherwise
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if not body["stream"]:
+            text = "".join(line.get("message", {}).get("content", "") for line in self.server.lines)
+            payload = json.dumps(message(text, **FINAL)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for line in self.server.lines:
+            data = (json.dumps(line) + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+            if self.server.hold:
+                # Stall after the first line until the client hangs up
+                self.server.disconnected = self._wait_for_hangup(5)
+                return
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _wait_for_hangup(self, timeout) -> bool:
+        readable, _, _ = select.select([self.connection], [], [], timeout)
+        return bool(readable) and self.connection.recv(1, socket.MSG_PEEK) == b""
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(test):
+    """A FakeOllama on a free port; returns the server"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    server.daemon_threads = True
+    server.requests = []
+    server.status = 200
+    server.hold = False
+    server.disconnected = None
+    server.lines = [message(" Use"), message(" a ForeignKey."), message("", **FINAL)]
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    patcher = mock.patch.object(model, "OLLAMA_HOST", f"http://127.0.0.1:{server.server_address[1]}")
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return server
+
+
+class StreamReaderTests(unittest.TestCase):
+
+    def test_deltas_and_final_text(self):
+        reader = _StreamReader()
+        chunks = [reader.feed(json.dumps(line)) for line in (message("  Hello"), message(""), message(" world "))]
+        self.assertEqual(chunks, [GenerationChunk("Hello"), None, GenerationChunk(" world ")])
+        self.assertFalse(reader.done)
+        self.assertIsNone(reader.feed(json.dumps(message("", **FINAL))))
+        self.assertTrue(reader.done)
+        final = reader.final()
+        self.assertEqual((final.done, final.text), (True, "Hello world"))
+        self.assertEqual(final.stats["tokens_per_s"], 2.0)
+        self.assertEqual(final.stats["ttft_s"], 0.2)
+        self.assertIn("first_token_s", final.stats)
+
+    def test_error_line(self):
+        reader = _StreamReader()
+        reader.feed(json.dumps(message("Partial")))
+        with self.assertRaises(OllamaError):
+            reader.feed(json.dumps({"error": "model not found"}))
+        failed = reader.failed("model not found")
+        self.assertTrue(failed.done)
+        self.assertEqual(failed.delta, "\n\n[ERROR] LLM request failed: model not found")
+        self.assertEqual(failed.text, "Partial\n\n[ERROR] LLM request failed: model not found")
+
+    def test_failure_before_any_text(self):
+        failed = _StreamReader().failed("refused")
+        self.assertEqual(failed.delta, failed.text)
+        self.assertEqual(failed.text, "[ERROR] LLM request failed: refused")
+
+
+class LLMStreamTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = start_server(self)
+        self.transport = HTTPTransport(breaker=CircuitBreaker(failure_threshold=100), retries=0)
+        self.addCleanup(self.transport.close)
+        self.llm = LLM(transport=self.transport)
+
+    def test_stream_matches_generate(self):
+        chunks = list(self.llm.generate_stream("what is a model?", system="Be brief."))
+        self.assertEqual([chunk.delta for chunk in chunks[:-1]], ["Use", " a ForeignKey."])
+        final = chunks[-1]
+        self.assertTrue(final.done)
+        self.assertEqual(final.text, "Use a ForeignKey.")
+        self.assertEqual(final.text, self.llm.generate("what is a model?", system="Be brief."))
+        self.assertEqual(final.stats["eval_count"], 3)
+
+        streamed, generated = self.server.requests
+        self.assertTrue(streamed["stream"])
+        self.assertFalse(generated["stream"])
+        self.assertEqual(streamed["messages"], generated["messages"])
+        self.assertEqual(streamed["messages"][0], {"role": "system", "content": "Be brief."})
+
+    def test_stops_at_the_final_line(self):
+        self.server.lines.append(message(" ignored"))
+        chunks = list(self.llm.generate_stream("q"))
+        self.assertEqual(chunks[-1].text, "Use a ForeignKey.")
+
+    def test_error_in_stream_keeps_partial_text(self):
+        self.server.lines[1:] = [{"error": "out of memory"}]
+        chunks = list(self.llm.generate_stream("q"))
+        self.assertEqual(chunks[0].delta, "Use")
+        self.assertTrue(chunks[-1].done)
+        self.assertEqual(chunks[-1].text, "Use\n\n[ERROR] LLM request failed: out of memory")
+
+    def test_server_error(self):
+        self.server.status = 500
+        chunks = list(self.llm.generate_stream("q"))
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0].text.startswith("[ERROR] LLM request failed: 500 Server Error"))
+        self.assertEqual(self.transport.stats()["server_errors"], 1)
+
+    def test_truncated_stream_ends_with_what_arrived(self):
+        self.server.lines.pop()
+        chunks = list(self.llm.generate_stream("q"))
+        self.assertTrue(chunks[-1].done)
+        self.assertEqual(chunks[-1].text, "Use a ForeignKey.")
+        self.assertEqual(chunks[-1].stats, {})
+
+
+class CachedGenerationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = start_server(self)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = GenerationCache(Path(tmp.name) / "generation_cache.sqlite3")
+        self.addCleanup(self.cache._conn.close)
+        patcher = mock.patch.object(model, "_generation_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.transport = HTTPTransport(breaker=CircuitBreaker(failure_threshold=100), retries=0)
+        self.addCleanup(self.transport.close)
+        self.llm = LLM(transport=self.transport)
+
+    def test_completed_stream_is_cached(self):
+        first = list(self.llm.generate_stream("q", use_cache=True))
+        again = list(self.llm.generate_stream("q", use_cache=True))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(again[0].delta, "Use a ForeignKey.")
+        self.assertEqual(again[-1].text, first[-1].text)
+        self.assertTrue(again[-1].stats["cached"])
+        self.assertEqual(again[-1].stats["eval_count"], 3)
+        # generate() shares the entry: the key ignores "stream"
+        self.assertEqual(self.llm.generate("q", use_cache=True), "Use a ForeignKey.")
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_truncated_stream_is_not_cached(self):
+        self.server.lines.pop()
+        list(self.llm.generate_stream("q", use_cache=True))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_failed_stream_is_not_cached(self):
+        self.server.lines[1:] = [{"error": "out of memory"}]
+        list(self.llm.generate_stream("q", use_cache=True))
+        self.server.status = 500
+        self.llm.generate("q", use_cache=True)
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_use_cache_false_bypasses_the_cache(self):
+        list(self.llm.generate_stream("q", use_cache=True))
+        list(self.llm.generate_stream("q"))
+        self.assertEqual(len(self.server.requests), 2)
+
+
+class AsyncLLMTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = start_server(self)
+        self.transport = None
+
+    def run_with_llm(self, coroutine_function):
+        """Run coroutine_function(llm) on a fresh loop with its own transport"""
+        async def main():
+            # An httpx client belongs to the loop it is created on
+            self.transport = AsyncHTTPTransport(breaker=CircuitBreaker(failure_threshold=100), retries=0)
+            try:
+                return await coroutine_function(AsyncLLM(transport=self.transport))
+            finally:
+                await self.transport.aclose()
+        return asyncio.run(asyncio.wait_for(main(), 10))
+
+    def test_same_chunks_as_sync(self):
+        async def collect(llm):
+            chunks = [chunk async for chunk in llm.generate_stream("what is a model?", system="Be brief.")]
+            return chunks, await llm.generate("what is a model?", system="Be brief.")
+
+        chunks, text = self.run_with_llm(collect)
+        sync = HTTPTransport(breaker=CircuitBreaker(failure_threshold=100), retries=0)
+        self.addCleanup(sync.close)
+        expected = list(LLM(transport=sync).generate_stream("what is a model?", system="Be brief."))
+
+        self.assertEqual([chunk.delta for chunk in chunks], [chunk.delta for chunk in expected])
+        self.assertEqual(chunks[-1].text, expected[-1].text)
+        self.assertEqual(text, "Use a ForeignKey.")
+        self.assertEqual(self.server.requests[0], self.server.requests[2])
+
+    def test_errors_end_the_stream(self):
+        self.server.lines[1:] = [{"error": "out of memory"}]
+
+        async def collect(llm):
+            return [chunk async for chunk in llm.generate_stream("q")]
+
+        chunks = self.run_with_llm(collect)
+        self.assertEqual(chunks[-1].text, "Use\n\n[ERROR] LLM request failed: out of memory")
+
+        self.server.status = 503
+        self.assertTrue(self.run_with_llm(lambda llm: llm.generate("q")).startswith("[ERROR] LLM request failed"))
+
+    def test_cancelling_closes_the_connection(self):
+        self.server.hold = True
+
+        async def cancel_after_first_chunk(llm):
+            first = asyncio.Event()
+
+            async def consume():
+                async for chunk in llm.generate_stream("q"):
+                    first.set()
+
+            task = asyncio.ensure_future(consume())
+            await first.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # Before the transport (and its pool) is closed
+            await asyncio.to_thread(self.wait_for_server)
+            return self.transport.stats()
+
+        stats = self.run_with_llm(cancel_after_first_chunk)
+        self.assertTrue(self.server.disconnected)
+        self.assertEqual(stats["cancelled"], 1)
+        self.assertEqual(stats["circuit_state"], "closed")
+
+    def test_breaking_out_with_aclosing_closes_the_connection(self):
+        self.server.hold = True
+
+        async def first_chunk(llm):
+            async with contextlib.aclosing(llm.generate_stream("q")) as stream:
+                async for chunk in stream:
+                    break
+            await asyncio.to_thread(self.wait_for_server)
+            return chunk
+
+        self.assertEqual(self.run_with_llm(first_chunk).delta, "Use")
+        self.assertTrue(self.server.disconnected)
+
+    def wait_for_server(self):
+        """Until the stalled handler saw the client hang up (or gave up)"""
+        for _ in range(200):
+            if self.server.disconnected is not None:
+                return
+            threading.Event().wait(0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+import zlib
+from unittest import mock
+
+import numpy as np
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+
+import rag.retriever as retriever_module
+from chromadb.api.shared_system_client import SharedSystemClient
+from rag import index_version, snapshot
+from rag.bm25_index import BM25Index, tokenize
+from rag.cache import TTLCache
+from rag.dense_index import DenseIndex
+from rag.retriever import HybridRetriever
+
+DOCUMENTS = [
+    "A model is the single source of information about your data",
+    "Each view function takes a web request and returns a web response",
+    "The admin site reads metadata from your models",
+    "URL patterns map paths to views",
+    "A form validates submitted data and renders widgets",
+    "Templates render context variables into html",
+]
+
+
+def bare_retriever(index_version=("v1",)):
+    """A HybridRetriever without loaded indexes, for its pure helpers"""
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    retriever.index_version = index_version
+    return retriever
+
+
+def fake_embed_texts(texts, use_cache=True):
+    """Hashed bag of words: texts sharing words are similar"""
+    vectors = np.zeros((len(texts), 64), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in tokenize(text):
+            vectors[row, zlib.crc32(token.encode()) % 64] += 1
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+def in_memory_retriever(documents=DOCUMENTS):
+    """A HybridRetriever over in-memory BM25 and exact indexes"""
+    retriever = bare_retriever()
+    retriever.chroma_client = None
+    retriever.chroma_collection = None
+    retriever.bm25 = BM25Index.build(
+        [tokenize(text) for text in documents],
+        documents=documents,
+        metadatas=[{"source": f"doc{i}.txt"} for i in range(len(documents))],
+        doc_ids=[f"chunk-{i}" for i in range(len(documents))],
+    )
+    retriever.documents = retriever.bm25.documents
+    retriever.metadatas = retriever.bm25.metadatas
+    retriever.dense_index = DenseIndex(fake_embed_texts(documents))
+    retriever._result_cache = TTLCache(maxsize=16, ttl=60)
+    retriever._in_flight = 0
+    retriever._retired = False
+    retriever._state_lock = threading.Lock()
+    retriever._snapshot_lock = None
+    return retriever
+
+
+def write_snapshot(documents):
+    """Build and return a snapshot with a ChromaDB collection and a BM25 index"""
+    paths = snapshot.new_snapshot()
+    metadatas = [{"source": f"{paths.root.name}-{i}.txt"} for i in range(len(documents))]
+    ids = [f"chunk-{i}" for i in range(len(documents))]
+    client = chromadb.PersistentClient(path=str(paths.chroma))
+    client.create_collection("django_docs", metadata={"hnsw:space": "cosine"}).add(
+        ids=ids, embeddings=fake_embed_texts(documents), documents=documents, metadatas=metadatas
+    )
+    retriever_module._stop_chroma_client(client)
+    BM25Index.build(
+        [tokenize(text) for text in documents], documents=documents, metadatas=metadatas, doc_ids=ids
+    ).save(paths.bm25)
+    return paths
+
+
+class CacheKeyTests(unittest.TestCase):
+
+    def test_normalizes_case_and_whitespace(self):
+        retriever = bare_retriever()
+        self.assertEqual(
+            retriever._cache_key("  How do I  use\tModels? ", 4, 0.5, "rrf"),
+            retriever._cache_key("how do i use models?", 4, 0.5, "rrf"),
+        )
+
+    def test_parameters_and_index_version_are_part_of_the_key(self):
+        key = bare_retriever()._cache_key("models", 4, 0.5, "rrf")
+        self.assertNotEqual(key, bare_retriever()._cache_key("models", 5, 0.5, "rrf"))
+        self.assertNotEqual(key, bare_retriever()._cache_key("models", 4, 0.6, "rrf"))
+        self.assertNotEqual(key, bare_retriever()._cache_key("models", 4, 0.5, "convex"))
+        self.assertNotEqual(key, bare_retriever(("v2",))._cache_key("models", 4, 0.5, "rrf"))
+
+    def test_does_not_stat_the_index_pointer(self):
+        with mock.patch("rag.retriever.current_index_version", side_effect=AssertionError):
+            bare_retriever()._cache_key("models", 4, 0.5, "rrf")
+
+
+class AsyncRetrievalTests(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(retriever_module, "embed_texts", fake_embed_texts)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_aretrieve_matches_retrieve(self):
+        for query in ("how does a view return a response", "admin models", "render html templates"):
+            with self.subTest(query=query):
+                expected = in_memory_retriever().retrieve(query, k=2)
+                result = asyncio.run(in_memory_retriever().aretrieve(query, k=2))
+                self.assertEqual(result[0], expected[0])
+                self.assertEqual(sorted(result[1]), sorted(expected[1]))
+                self.assertEqual(result.degraded, {})
+
+    def test_failed_leg_degrades_and_is_not_cached(self):
+        retriever = in_memory_retriever()
+        with mock.patch.object(retriever, "_bm25_search_many", side_effect=RuntimeError("broken index")):
+            result = asyncio.run(retriever.aretrieve("admin models", k=2))
+        self.assertEqual(result.degraded, {"bm25": "error"})
+        self.assertTrue(result[0])
+        self.assertEqual(len(retriever._result_cache), 0)
+
+    def test_aretrieve_context_pins_the_current_retriever(self):
+        retriever = in_memory_retriever()
+        pinned = []
+        aretrieve = retriever.aretrieve
+
+        async def spy(*args, **kwargs):
+            pinned.append(retriever._in_flight)
+            return await aretrieve(*args, **kwargs)
+
+        retriever.aretrieve = spy
+        with mock.patch.object(retriever_module, "_hybrid_retriever", retriever), \
+                mock.patch.object(retriever_module, "INDEX_RELOAD_INTERVAL", 0):
+            context, sources = asyncio.run(retriever_module.aretrieve_context("admin models", k=2))
+        self.assertIn("admin site", context)
+        self.assertEqual(pinned, [1])
+        self.assertEqual(retriever._in_flight, 0)
+
+
+class HotReloadTests(unittest.TestCase):
+    """Swapping in a newly published snapshot while requests are in flight"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        indexes = tempfile.mkdtemp(dir=tmp.name)
+        for patcher in (
+            mock.patch.object(snapshot, "INDEXES_PATH", snapshot.Path(indexes)),
+            mock.patch.object(index_version, "INDEX_VERSION_PATH", snapshot.Path(indexes) / "CURRENT"),
+            mock.patch.object(retriever_module, "VECTOR_BACKEND", "chroma"),
+            mock.patch.object(retriever_module, "embed_texts", fake_embed_texts),
+            mock.patch.object(retriever_module, "warm_up_embedding_model", lambda: None),
+            mock.patch.object(retriever_module, "_hybrid_retriever", None),
+            mock.patch.object(retriever_module, "_last_seen_version", None),
+            mock.patch.object(retriever_module, "INDEX_RELOAD_INTERVAL", 0),
+            mock.patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: retriever_module._hybrid_retriever and retriever_module._hybrid_retriever.close())
+        self.first = write_snapshot(DOCUMENTS)
+        snapshot.publish_snapshot(self.first)
+
+    def test_reload_swaps_and_retires_after_in_flight_requests(self):
+        _, sources = retriever_module.retrieve_context("admin models", k=1)
+        self.assertEqual(sources, [f"{self.first.root.name}-2.txt"])
+
+        second = write_snapshot(DOCUMENTS[::-1])
+        snapshot.publish_snapshot(second)
+        with retriever_module._pinned_retriever() as old:
+            retriever_module._reload_retriever()
+            self.assertIsNot(retriever_module._hybrid_retriever, old)
+            # The request still in flight keeps working on the old snapshot
+            self.assertIsNotNone(old.chroma_client)
+            self.assertEqual(old.retrieve("admin models", k=1)[1], [f"{self.first.root.name}-2.txt"])
+            self.assertEqual(snapshot.prune_snapshots(keep=0), [])
+        identifier = str(self.first.chroma)
+        self.assertIsNone(old.chroma_client)
+        self.assertNotIn(identifier, SharedSystemClient._identifier_to_system)
+
+        _, sources = retriever_module.retrieve_context("admin models", k=1)
+        self.assertEqual(sources, [f"{second.root.name}-3.txt"])
+        self.assertEqual(snapshot.prune_snapshots(keep=0), [self.first.root.name])
+
+    def test_prune_skips_snapshot_of_idle_reader(self):
+        retriever_module.get_hybrid_retriever()
+        newer = [write_snapshot(DOCUMENTS[:2]) for _ in range(3)]
+        snapshot.publish_snapshot(newer[-1])
+        self.assertEqual(snapshot.prune_snapshots(keep=1), [newer[0].root.name, newer[1].root.name])
+        self.assertTrue(self.first.root.is_dir())
+
+        retriever_module._hybrid_retriever.close()
+        self.assertEqual(snapshot.prune_snapshots(keep=1), [self.first.root.name])
+
+    def test_incomplete_snapshot_is_not_swapped_in(self):
+        current = retriever_module.get_hybrid_retriever()
+        broken = snapshot.new_snapshot()
+        snapshot.publish_snapshot(broken)
+        retriever_module._reload_retriever()
+        self.assertIs(retriever_module._hybrid_retriever, current)
+        # The rejected instance let go of the snapshot
+        snapshot.publish_snapshot(self.first)
+        self.assertEqual(snapshot.prune_snapshots(keep=0), [broken.root.name])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from rag import index_version, snapshot
+
+
+class SnapshotTestCase(unittest.TestCase):
+    """Points data/indexes at a temporary directory"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.indexes = Path(tmp.name) / "indexes"
+        for patcher in (
+            mock.patch.object(snapshot, "INDEXES_PATH", self.indexes),
+            mock.patch.object(index_version, "INDEX_VERSION_PATH", self.indexes / "CURRENT"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def snapshots(self):
+        return sorted(p.name for p in self.indexes.iterdir() if p.is_dir())
+
+
+class SnapshotTests(SnapshotTestCase):
+
+    def test_new_snapshot_is_unpublished(self):
+        paths = snapshot.new_snapshot()
+        self.assertTrue(paths.root.is_dir())
+        self.assertEqual(paths.root.parent, self.indexes)
+        self.assertIsNone(snapshot.current_snapshot())
+        self.assertEqual(snapshot.current_index_paths(), snapshot.LEGACY_PATHS)
+
+    def test_publish_switches_readers(self):
+        first = snapshot.new_snapshot()
+        snapshot.publish_snapshot(first)
+        self.assertEqual(snapshot.current_snapshot(), first)
+        before = index_version.current_index_version()
+
+        second = snapshot.new_snapshot()
+        self.assertEqual(snapshot.current_snapshot(), first)
+        snapshot.publish_snapshot(second)
+        self.assertEqual(snapshot.current_index_paths(), second)
+        self.assertNotEqual(index_version.current_index_version(), before)
+        self.assertEqual(list(self.indexes.glob("*.tmp")), [])
+
+    def test_pointer_to_missing_snapshot(self):
+        paths = snapshot.new_snapshot()
+        snapshot.publish_snapshot(paths)
+        snapshot.discard_snapshot(paths)
+        self.assertFalse(paths.root.exists())
+        self.assertIsNone(snapshot.current_snapshot())
+
+    def test_new_snapshots_sort_by_age(self):
+        names = [snapshot.new_snapshot().root.name for _ in range(3)]
+        self.assertEqual(self.snapshots(), names)
+
+    def test_prune_keeps_newest_and_current(self):
+        paths = [snapshot.new_snapshot() for _ in range(5)]
+        snapshot.publish_snapshot(paths[0])
+        removed = snapshot.prune_snapshots(keep=2)
+        self.assertEqual(removed, [p.root.name for p in paths[1:3]])
+        self.assertEqual(self.snapshots(), [p.root.name for p in (paths[0], paths[3], paths[4])])
+
+    def test_prune_without_snapshots(self):
+        self.assertEqual(snapshot.prune_snapshots(keep=2), [])
+
+
+class PublishStepTests(SnapshotTestCase):
+    """setup_rag discards the snapshot it was building when a step fails"""
+
+    def setUp(self):
+        super().setUp()
+        # rag.setup pulls in ChromaDB and the text splitter
+        pytest.importorskip("chromadb")
+        pytest.importorskip("langchain_text_splitters")
+        from rag import setup
+        self.setup = setup
+        self.profiler = self.setup.BuildProfiler()
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failed_publish_discards_snapshot(self):
+        previous = snapshot.new_snapshot()
+        snapshot.publish_snapshot(previous)
+        paths = snapshot.new_snapshot()
+        with mock.patch.object(self.setup, "publish_snapshot", side_effect=OSError("disk full")):
+            self.assertFalse(self.setup._publish(paths, self.profiler))
+        self.assertFalse(paths.root.exists())
+        self.assertEqual(snapshot.current_snapshot(), previous)
+
+    def test_failed_prune_keeps_published_snapshot(self):
+        paths = snapshot.new_snapshot()
+        with mock.patch.object(self.setup, "prune_snapshots", side_effect=OSError("busy")):
+            self.assertTrue(self.setup._publish(paths, self.profiler))
+        self.assertEqual(snapshot.current_snapshot(), paths)
+
+    def test_failed_preparation_discards_snapshot(self):
+        with mock.patch.object(self.setup, "document_files", return_value=[]), \
+             mock.patch.object(self.setup, "IndexPlan", side_effect=OSError("unreadable")):
+            self.assertFalse(self.setup._build_indexes(True, self.profiler, {}))
+        self.assertEqual(self.snapshots(), [])
+
+    def test_failure_before_snapshot_is_created(self):
+        published = snapshot.new_snapshot()
+        snapshot.publish_snapshot(published)
+        with mock.patch.object(self.setup, "document_files", return_value=[]), \
+             mock.patch.object(self.setup, "new_snapshot", side_effect=OSError("read-only")):
+            self.assertFalse(self.setup._build_indexes(False, self.profiler, {}))
+        self.assertEqual(self.snapshots(), [published.root.name])
+
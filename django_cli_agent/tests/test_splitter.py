@@ -0,0 +1,192 @@
+import unittest
+
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+
+from rag.loader import _parse_markdown, _parse_rst
+from rag.splitter import StructureSplitter, iter_chunks, parse_blocks
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def splitter(max_tokens):
+    """Counts whitespace-separated words instead of model tokens"""
+    return StructureSplitter(max_tokens=max_tokens, overlap_tokens=4, count_tokens=count_words)
+
+
+DOCUMENT = """=========================
+MIDDLEWARE OVERVIEW
+=========================
+SECTION: Activating middleware
+PURPOSE: Middleware hooks into request and response processing.
+
+CONCEPT: Ordering
+Middleware runs in the order of the MIDDLEWARE setting.
+
+CODE EXAMPLE:
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+
+    "django.contrib.sessions.middleware.SessionMiddleware",
+]
+USE WHEN: you need request-wide behaviour.
+
+SECTION: Writing middleware
+A middleware factory takes get_response and returns a callable.
+"""
+
+
+class ParseBlocksTests(unittest.TestCase):
+
+    def test_heading_paths(self):
+        blocks = parse_blocks(DOCUMENT)
+        paths = {text.splitlines()[0]: path for text, path, _ in blocks}
+        self.assertEqual(
+            paths["MIDDLEWARE OVERVIEW"], "MIDDLEWARE OVERVIEW > Activating middleware"
+        )
+        self.assertEqual(
+            paths["Middleware runs in the order of the MIDDLEWARE setting."],
+            "MIDDLEWARE OVERVIEW > Activating middleware > Ordering",
+        )
+        self.assertEqual(
+            paths["A middleware factory takes get_response and returns a callable."],
+            "MIDDLEWARE OVERVIEW > Writing middleware",
+        )
+
+    def test_consecutive_headings_form_one_block(self):
+        text, path, new_section = parse_blocks(DOCUMENT)[0]
+        self.assertEqual(text, "MIDDLEWARE OVERVIEW\nSECTION: Activating middleware")
+        self.assertTrue(new_section)
+
+    def test_only_banners_and_sections_start_a_section(self):
+        flags = {text.splitlines()[0]: new_section for text, _, new_section in parse_blocks(DOCUMENT)}
+        self.assertTrue(flags["SECTION: Writing middleware"])
+        self.assertFalse(flags["CONCEPT: Ordering"])
+        self.assertFalse(flags["PURPOSE: Middleware hooks into request and response processing."])
+
+    def test_code_block_keeps_blank_lines_up_to_next_label(self):
+        code = [text for text, _, _ in parse_blocks(DOCUMENT) if text.startswith("CODE EXAMPLE:")]
+        self.assertEqual(len(code), 1)
+        self.assertIn("\n\n", code[0])
+        self.assertTrue(code[0].endswith("]"))
+        self.assertNotIn("USE WHEN", code[0])
+
+    def test_end_code_closes_code_block_and_is_dropped(self):
+        blocks = [text for text, _, _ in parse_blocks("CODE:\nx = 1\n\ny = 2\nEND CODE\nProse.\nEND CODE")]
+        self.assertEqual(blocks, ["CODE:\nx = 1\n\ny = 2", "Prose."])
+
+    def test_paragraphs_end_at_blank_lines(self):
+        blocks = [text for text, _, _ in parse_blocks("first line\nsecond line\n\n\nthird")]
+        self.assertEqual(blocks, ["first line\nsecond line", "third"])
+
+    def test_empty_document(self):
+        self.assertEqual(parse_blocks(""), [])
+        self.assertEqual(parse_blocks("\n\n  \n"), [])
+
+
+class StructureSplitterTests(unittest.TestCase):
+
+    def test_small_sections_share_a_chunk(self):
+        chunks = splitter(256).split_text(DOCUMENT)
+        self.assertEqual(len(chunks), 1)
+        text, sections = chunks[0]
+        self.assertEqual(
+            sections,
+            "MIDDLEWARE OVERVIEW > Activating middleware | MIDDLEWARE OVERVIEW > Writing middleware",
+        )
+        self.assertTrue(text.startswith("MIDDLEWARE OVERVIEW"))
+
+    def test_chunks_stay_within_budget(self):
+        for max_tokens in (12, 20, 40):
+            with self.subTest(max_tokens=max_tokens):
+                for text, _ in splitter(max_tokens).split_text(DOCUMENT):
+                    self.assertLessEqual(count_words(text), max_tokens - 2)
+
+    def test_no_text_is_lost(self):
+        words = set(DOCUMENT.split()) - {"=" * 25}
+        for max_tokens in (12, 20, 256):
+            with self.subTest(max_tokens=max_tokens):
+                chunked = set()
+                for text, _ in splitter(max_tokens).split_text(DOCUMENT):
+                    chunked.update(text.split())
+                self.assertLessEqual(words, chunked)
+
+    def test_section_that_does_not_fit_starts_a_chunk(self):
+        chunks = splitter(30).split_text(DOCUMENT)
+        openings = [text.splitlines()[0] for text, _ in chunks]
+        self.assertEqual(openings[0], "MIDDLEWARE OVERVIEW")
+        self.assertEqual(openings[-1], "SECTION: Writing middleware")
+        self.assertEqual(chunks[-1][1], "MIDDLEWARE OVERVIEW > Writing middleware")
+
+        # With room left, it joins the previous chunk whole
+        text, sections = splitter(40).split_text(DOCUMENT)[-1]
+        self.assertTrue(text.endswith("SECTION: Writing middleware\n"
+                                      "A middleware factory takes get_response and returns a callable."))
+        self.assertEqual(sections.split(" | ")[-1], "MIDDLEWARE OVERVIEW > Writing middleware")
+
+    def test_continuation_chunks_carry_the_path(self):
+        chunks = splitter(20).split_text(DOCUMENT)
+        self.assertGreater(len(chunks), 2)
+        for text, section in chunks:
+            first = text.splitlines()[0]
+            if not (first.startswith("SECTION:") or first == "MIDDLEWARE OVERVIEW"):
+                self.assertEqual(first, f"[{section}]")
+
+    def test_oversized_block_is_cut(self):
+        paragraph = " ".join(f"word{i}" for i in range(100))
+        chunks = splitter(30).split_text(f"SECTION: Long\n{paragraph}")
+        self.assertGreater(len(chunks), 3)
+        for text, section in chunks:
+            self.assertEqual(section, "Long")
+            self.assertLessEqual(count_words(text), 28)
+        self.assertIn("word99", chunks[-1][0])
+
+
+class LoadedFormatsTests(unittest.TestCase):
+    """Prose after a code block stays out of it for every source format"""
+
+    def assertProseAfterCode(self, text, code_line, prose):
+        blocks = [block for block, _, _ in parse_blocks(text)]
+        code = [block for block in blocks if code_line in block]
+        self.assertEqual(len(code), 1)
+        self.assertTrue(code[0].startswith("CODE:"))
+        self.assertNotIn(prose, code[0])
+        self.assertIn(prose, blocks)
+
+    def test_markdown_fence(self):
+        text = _parse_markdown("## Views\n```python\ndef index(request):\n\n    pass\n```\nA view returns a response.\n")
+        self.assertProseAfterCode(text, "def index(request):", "A view returns a response.")
+
+    def test_markdown_fence_before_blank_line(self):
+        text = _parse_markdown("```\nx = 1\n```\n\nAfter the fence.\n")
+        self.assertProseAfterCode(text, "x = 1", "After the fence.")
+
+    def test_rst_literal_block(self):
+        text = _parse_rst("Views\n=====\n\nExample::\n\n    def index(request):\n\n        pass\n\nA view returns a response.\n")
+        self.assertProseAfterCode(text, "def index(request):", "A view returns a response.")
+
+    def test_rst_code_directive(self):
+        text = _parse_rst(".. code-block:: python\n\n    x = 1\n\n    y = 2\nAfter the directive.\n")
+        self.assertProseAfterCode(text, "y = 2", "After the directive.")
+
+
+class IterChunksTests(unittest.TestCase):
+
+    def test_one_list_per_document_with_metadata(self):
+        documents = [
+            {"text": DOCUMENT, "metadata": {"source": "middleware.txt"}},
+            {"text": "SECTION: Other\nshort", "metadata": {"source": "other.txt"}},
+        ]
+        chunk_lists = list(iter_chunks(documents, splitter(256)))
+        self.assertEqual(len(chunk_lists), 2)
+        self.assertEqual(chunk_lists[1], [
+            {"text": "SECTION: Other\nshort", "metadata": {"source": "other.txt", "section": "Other"}}
+        ])
+        self.assertEqual(chunk_lists[0][0]["metadata"]["source"], "middleware.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("requests")
+
+from llm.transport import CircuitBreaker, CircuitOpenError, HTTPTransport
+
+
+class CircuitBreakerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("llm.transport.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0)
+
+    def open_circuit(self):
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            opened = self.breaker.record_failure()
+        self.assertTrue(opened)
+        self.assertEqual(self.breaker.state, "open")
+
+    def test_opens_after_consecutive_failures(self):
+        self.assertFalse(self.breaker.record_failure())
+        self.assertFalse(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertTrue(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertFalse(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_half_open_allows_a_single_trial(self):
+        self.open_circuit()
+        self.now += 29.9
+        self.assertFalse(self.breaker.allow())
+        self.now += 0.1
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, "half-open")
+        self.assertFalse(self.breaker.allow())
+
+    def test_trial_success_closes(self):
+        self.open_circuit()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+
+    def test_trial_failure_reopens(self):
+        self.open_circuit()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.allow())
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+
+    def test_release_frees_the_trial_slot(self):
+        self.open_circuit()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, "half-open")
+        self.assertTrue(self.breaker.allow())
+
+
+class HTTPTransportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+        self.transport = HTTPTransport(breaker=self.breaker, retries=0)
+        self.addCleanup(self.transport.close)
+
+    def test_open_circuit_fails_fast(self):
+        self.breaker.reset_timeout = 60.0
+        self.breaker.record_failure()
+        with mock.patch.object(self.transport.session, "post") as post:
+            with self.assertRaises(CircuitOpenError):
+                self.transport.post("http://localhost:11434/api/chat", json={})
+        post.assert_not_called()
+        self.assertEqual(self.transport.stats()["short_circuited"], 1)
+
+    def test_unexpected_error_frees_the_trial_slot(self):
+        self.breaker.record_failure()
+        with mock.patch.object(self.transport.session, "post", side_effect=ValueError("bad body")):
+            with self.assertRaises(ValueError):
+                self.transport.post("http://localhost:11434/api/chat", json={})
+        self.assertEqual(self.breaker.state, "half-open")
+        self.assertTrue(self.breaker.allow())
+
+    def test_non_streamed_requests_get_the_generation_timeout(self):
+        with mock.patch.object(self.transport.session, "post") as post:
+            post.return_value.status_code = 200
+            self.transport.post("http://localhost:11434/api/chat", json={})
+            self.transport.post("http://localhost:11434/api/chat", json={}, stream=True)
+        timeouts = [call.kwargs["timeout"] for call in post.call_args_list]
+        self.assertEqual(timeouts, [
+            (self.transport.connect_timeout, self.transport.generate_timeout),
+            (self.transport.connect_timeout, self.transport.read_timeout),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,6 +14,7 @@ sys.path.insert(0, str(project_root))
 
 import chromadb
 from rag.embeddings import embed_texts
+from rag.snapshot import current_index_paths
 
 
 def verify_vector_db():
@@ -23,8 +24,8 @@ def verify_vector_db():
     print("🔍 VECTOR DATABASE VERIFICATION")
     print("="*60 + "\n")
     
-    # CORRECTED: Use project root, not rag module path
-    vector_db_path = project_root / "data" / "vector_db"
+    # Published index snapshot (data/indexes/CURRENT), or the old data/vector_db
+    vector_db_path = current_index_paths().chroma
     
     print(f"📁 Vector DB Path: {vector_db_path}")
     print(f"   Absolute path: {vector_db_path.resolve()}")
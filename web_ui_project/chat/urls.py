@@ -5,4 +5,5 @@ app_name = "chat"
 
 urlpatterns = [
     path("<int:project_id>/", views.chat_view, name="chat"),
+    path("<int:project_id>/stream/", views.chat_stream_view, name="chat_stream"),
 ]
@@ -35,8 +35,13 @@
 #         "messages": messages
 #     })
 
-from django.shortcuts import render, get_object_or_404, redirect
+import json
+
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 from .models import Project, ChatMessage
 from agent.agent_core import AgentCore
 
@@ -78,4 +83,84 @@ def chat_view(request, project_id):
     return render(request, "chat/chat.html", {
         "project": project,
         "messages": messages
-    })
\ No newline at end of file
+    })
+
+
+@login_required
+@require_POST
+async def chat_stream_view(request, project_id):
+    """
+    Same as posting to chat_view, but streams the answer as it is generated:
+    newline-delimited JSON, {"delta": "..."} per LLM token delta, then
+    {"done": true, "response": "..."} with the full formatted response
+    (the one saved to the chat history).
+
+    Async: under ASGI (uvicorn web_ui_project.asgi:application) a
+    generation in flight holds no thread, and when the browser disconnects
+    the stream is cancelled, which aborts the Ollama request (nothing is
+    saved for the agent then). Under WSGI (runserver) the answer is
+    streamed from the worker thread instead.
+    """
+    user = await request.auser()
+    project = await aget_object_or_404(Project, id=project_id, user=user)
+    user_input = request.POST.get("message")
+
+    # Validate input
+    if not user_input or not user_input.strip():
+        return HttpResponseBadRequest("Empty message")
+
+    # Save user message
+    await ChatMessage.objects.acreate(
+        project=project,
+        sender="user",
+        message=user_input
+    )
+
+    async def events():
+        # Initialize agent with project's root path (DYNAMIC WORKSPACE)
+        agent = AgentCore(workspace_root=project.root_path)
+        response = None
+        try:
+            async for chunk in agent.arun_stream(user_input):
+                if chunk.done:
+                    response = chunk.text
+                elif chunk.delta:
+                    yield json.dumps({"delta": chunk.delta}) + "\n"
+        except Exception as e:
+            response = f"❌ Error: {e}"
+
+        # Save agent response (FULL response = code + explanation)
+        await ChatMessage.objects.acreate(
+            project=project,
+            sender="agent",
+            message=response
+        )
+        yield json.dumps({"done": True, "response": response}) + "\n"
+
+    def sync_events():
+        # Same as events(), for WSGI: Django would read an async iterator to
+        # the end before sending anything
+        agent = AgentCore(workspace_root=project.root_path)
+        response = None
+        try:
+            for chunk in agent.run_stream(user_input):
+                if chunk.done:
+                    response = chunk.text
+                elif chunk.delta:
+                    yield json.dumps({"delta": chunk.delta}) + "\n"
+        except Exception as e:
+            response = f"❌ Error: {e}"
+
+        ChatMessage.objects.create(
+            project=project,
+            sender="agent",
+            message=response
+        )
+        yield json.dumps({"done": True, "response": response}) + "\n"
+
+    streaming_content = events() if isinstance(request, ASGIRequest) else sync_events()
+    stream = StreamingHttpResponse(streaming_content, content_type="application/x-ndjson")
+    # Flush every line to the browser: no caching, no proxy buffering
+    stream["Cache-Control"] = "no-cache"
+    stream["X-Accel-Buffering"] = "no"
+    return stream
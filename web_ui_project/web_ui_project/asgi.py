@@ -3,6 +3,14 @@ ASGI config for web_ui_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with uvicorn (in requirements.txt) so the chat stream runs on the
+event loop instead of a worker thread per generation:
+
+    uvicorn web_ui_project.asgi:application
+
+manage.py runserver serves the WSGI application; the chat still streams
+there, one thread per answer.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """